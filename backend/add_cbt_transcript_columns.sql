@@ -0,0 +1,12 @@
+-- CareBot AI - CBTセッショントランスクリプト列の追加スクリプト
+-- 対話ターンごとの行をやめ、セッション単位で1行（構造化されたターン）として保存する
+
+-- ========================================
+-- journals テーブル
+-- ========================================
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS session_id TEXT;
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS turns JSONB;
+
+-- セッション単位の取得とセッション一覧
+CREATE INDEX IF NOT EXISTS idx_journals_user_session ON journals (user_id, session_id)
+  WHERE session_id IS NOT NULL;
@@ -0,0 +1,17 @@
+-- CareBot AI - ジャーナル感情タグ列の追加スクリプト
+-- 保存時に算出した感情ラベルを集計で再利用するための列とインデックス
+
+-- ========================================
+-- journals テーブル
+-- ========================================
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS emotion TEXT;
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS emotion_scores JSONB;
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS sentiment_score REAL;
+ALTER TABLE journals ADD COLUMN IF NOT EXISTS crisis_detected BOOLEAN DEFAULT FALSE;
+
+-- 期間指定の感情推移（user_id + created_at）と感情別の絞り込み
+CREATE INDEX IF NOT EXISTS idx_journals_user_created ON journals (user_id, created_at)
+  INCLUDE (emotion, sentiment_score, crisis_detected);
+CREATE INDEX IF NOT EXISTS idx_journals_user_emotion_created ON journals (user_id, emotion, created_at);
+
+-- 既存のジャーナルは backfill_journal_emotions.py でタグ付けする
@@ -0,0 +1,18 @@
+-- CareBot AI - 気分記録の重複防止キー追加スクリプト
+-- POST /api/moods/batch の再送時に同じ記録が二重登録されないようにする
+
+-- ========================================
+-- moods テーブル
+-- ========================================
+ALTER TABLE moods ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+
+-- ユーザーごとにキーは一意（キーがNULLの行は制約の対象外、再実行時は追加済みの制約をそのまま使う）
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'moods_user_idempotency_key'
+  ) THEN
+    ALTER TABLE moods ADD CONSTRAINT moods_user_idempotency_key UNIQUE (user_id, idempotency_key);
+  END IF;
+END
+$$;
@@ -0,0 +1,14 @@
+-- CareBot AI - プロフィールのユーザー一意制約の追加スクリプト
+-- プロフィール作成時の存在確認と挿入を1回のupsert（ON CONFLICT DO NOTHING）で行うための制約
+
+-- ========================================
+-- profiles テーブル
+-- ========================================
+-- 重複しているプロフィールは最も古いものを残して削除
+DELETE FROM profiles p
+USING profiles older
+WHERE p.user_id = older.user_id
+  AND p.id > older.id;
+
+ALTER TABLE profiles DROP CONSTRAINT IF EXISTS profiles_user_id_key;
+ALTER TABLE profiles ADD CONSTRAINT profiles_user_id_key UNIQUE (user_id);
@@ -0,0 +1,27 @@
+-- CareBot AI - 使用回数のユーザー・機能一意制約の追加スクリプト
+-- PostgreSQL直接接続（POSTGRES_DSN）で使用回数を1文のupsert（ON CONFLICT DO UPDATE）で加算するための制約
+
+-- ========================================
+-- usage_counts テーブル
+-- ========================================
+ALTER TABLE usage_counts ADD COLUMN IF NOT EXISTS last_used TIMESTAMPTZ;
+
+-- 重複している使用回数は合算して最も古い行に集約
+UPDATE usage_counts u
+SET usage_count = d.total
+FROM (
+  SELECT MIN(id) AS id, SUM(usage_count) AS total
+  FROM usage_counts
+  GROUP BY user_id, feature_type
+  HAVING COUNT(*) > 1
+) d
+WHERE u.id = d.id;
+
+DELETE FROM usage_counts u
+USING usage_counts older
+WHERE u.user_id = older.user_id
+  AND u.feature_type = older.feature_type
+  AND u.id > older.id;
+
+ALTER TABLE usage_counts DROP CONSTRAINT IF EXISTS usage_counts_user_feature_key;
+ALTER TABLE usage_counts ADD CONSTRAINT usage_counts_user_feature_key UNIQUE (user_id, feature_type);
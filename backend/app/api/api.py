@@ -1,7 +1,9 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, journals, moods, cbt, meditation, sounds, pomodoro, admin, users, profiles, usage, analysis
+from app.utils.fast_json import FastJSONResponse
+from app.api.endpoints import auth, journals, moods, cbt, meditation, sounds, pomodoro, admin, users, profiles, usage, analysis, dashboard
 
-api_router = APIRouter()
+# orjsonがあれば全エンドポイントのレスポンスをorjsonでシリアライズ
+api_router = APIRouter(default_response_class=FastJSONResponse)
 
 # 各エンドポイントを追加
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -15,4 +17,5 @@ api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
 api_router.include_router(usage.router, prefix="/usage", tags=["usage"])
-api_router.include_router(analysis.router, prefix="/analysis", tags=["analysis"]) 
\ No newline at end of file
+api_router.include_router(analysis.router, prefix="/analysis", tags=["analysis"]) 
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Request
+from app.utils.meditation_guide import MeditationGuide
+from app.utils.relaxation_sounds import RelaxationSounds
+from app.utils.audio_files import build_audio_catalog, audio_file_response
+
+router = APIRouter(tags=["audio"])
+
+# 配信可能な音声ファイル（瞑想セッションとサウンドのaudio_url）
+audio_catalog = build_audio_catalog(
+    [session["audio_url"] for session in MeditationGuide().get_all_sessions()]
+    + [sound["audio_url"] for sound in RelaxationSounds().get_all_sounds()]
+)
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+def get_audio_file(file_path: str, request: Request):
+    """音声ファイルを配信（Range・ETag・Cache-Control対応）"""
+    # カタログに登録されたファイルのみ配信（パストラバーサル防止）
+    path = audio_catalog.get(file_path)
+    if not path:
+        raise HTTPException(status_code=404, detail="音声ファイルが見つかりません")
+
+    response = audio_file_response(path, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="音声ファイルが見つかりません")
+
+    return response
@@ -2,14 +2,16 @@
 CBT対話APIエンドポイント
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 from app.schemas.cbt import (
     CBTRequest, CBTResponse, CBTSessionRequest, CBTSessionResponse,
-    CBTConversationHistory, CBTQualityReport
+    CBTSessionEndResponse, CBTConversationHistory, CBTQualityReport
 )
 from app.utils.auth import get_current_user
 from app.utils.ai_engine import LightweightAIEngine, AIQualityMonitor
+from app.utils.cbt_transcripts import cbt_transcript_buffer, summarize_turns
 from app.utils.logger import logger
 from app.utils.error_handler import (
     ValidationError, DatabaseError,
@@ -51,6 +53,14 @@ async def start_cbt_session(
         if request.initial_message:
             ai_response = ai_engine.process_message(request.initial_message, current_user['id'])
             welcome_message += f"\n\nあなた: {request.initial_message}\n\n私: {ai_response['response']}"
+            if not ai_response['crisis_detected']:
+                await record_cbt_conversation(
+                    user_id=current_user['id'],
+                    message=request.initial_message,
+                    response=ai_response['response'],
+                    emotion=ai_response['emotion'],
+                    session_id=session_id
+                )
         
         logger.log_user_action(
             user_id=current_user['id'],
@@ -70,6 +80,118 @@ async def start_cbt_session(
         else:
             raise HTTPException(status_code=500, detail="セッションの開始に失敗しました")
 
+@router.post("/session/{session_id}/end", response_model=CBTSessionEndResponse)
+async def end_cbt_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user),
+    request_obj: Request = None
+):
+    """CBTセッションを終了し、対話をトランスクリプトとして保存"""
+    try:
+        if request_obj:
+            log_request_info(request_obj, current_user['id'])
+        
+        result = await run_in_threadpool(cbt_transcript_buffer.end_session, current_user['id'], session_id)
+        journal = result["journal"]
+        
+        logger.log_user_action(
+            user_id=current_user['id'],
+            action="end_cbt_session",
+            details={"session_id": session_id, "turn_count": len(result["turns"])}
+        )
+        
+        return CBTSessionEndResponse(
+            session_id=session_id,
+            message="セッションを終了しました。お話しいただきありがとうございました。",
+            summary=summarize_turns(result["turns"]),
+            turn_count=len(result["turns"]),
+            journal_id=journal.get("id") if journal else None,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except Exception as e:
+        logger.error("CBTセッション終了エラー", e, {"user_id": current_user['id']})
+        if request_obj:
+            raise create_error_response(e, request_obj)
+        else:
+            raise HTTPException(status_code=500, detail="セッションの終了に失敗しました")
+
+@router.get("/sessions")
+async def list_cbt_sessions(
+    limit: int = Query(20, ge=1, le=100, description="取得件数"),
+    offset: int = Query(0, ge=0, description="取得開始位置"),
+    current_user: dict = Depends(get_current_user),
+    request_obj: Request = None
+):
+    """保存済みのCBTセッション一覧を取得"""
+    try:
+        if request_obj:
+            log_request_info(request_obj, current_user['id'])
+        
+        transcripts = await run_in_threadpool(
+            SupabaseDB.get_cbt_transcripts, current_user['id'], None, limit, offset
+        )
+        
+        return {
+            "sessions": [
+                {
+                    "journal_id": transcript["id"],
+                    "session_id": transcript["session_id"],
+                    "turn_count": len(transcript.get("turns") or []),
+                    "emotion": transcript.get("emotion"),
+                    "created_at": transcript.get("created_at")
+                }
+                for transcript in transcripts
+            ],
+            "count": len(transcripts)
+        }
+        
+    except Exception as e:
+        logger.error("CBTセッション一覧取得エラー", e, {"user_id": current_user['id']})
+        if request_obj:
+            raise create_error_response(e, request_obj)
+        else:
+            raise HTTPException(status_code=500, detail="セッション一覧の取得に失敗しました")
+
+@router.get("/sessions/{session_id}", response_model=CBTConversationHistory)
+async def get_cbt_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user),
+    request_obj: Request = None
+):
+    """CBTセッションの対話履歴を取得（未保存のターンを含む）"""
+    try:
+        if request_obj:
+            log_request_info(request_obj, current_user['id'])
+        
+        # ターン数の上限で分割保存された場合は複数行になる
+        transcripts = await run_in_threadpool(
+            SupabaseDB.get_cbt_transcripts, current_user['id'], session_id, 100, 0
+        )
+        transcripts.reverse()
+        turns = [turn for transcript in transcripts for turn in transcript.get("turns") or []]
+        turns += cbt_transcript_buffer.get_turns(current_user['id'], session_id)
+        
+        if not turns:
+            raise HTTPException(status_code=404, detail="セッションが見つかりません")
+        
+        return CBTConversationHistory(
+            session_id=session_id,
+            conversations=turns,
+            summary=summarize_turns(turns),
+            created_at=turns[0]["timestamp"],
+            updated_at=turns[-1]["timestamp"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("CBTセッション取得エラー", e, {"user_id": current_user['id']})
+        if request_obj:
+            raise create_error_response(e, request_obj)
+        else:
+            raise HTTPException(status_code=500, detail="セッションの取得に失敗しました")
+
 @router.post("/conversation", response_model=CBTResponse)
 async def cbt_conversation(
     request: CBTRequest,
@@ -201,17 +323,18 @@ async def record_cbt_conversation(
     emotion: str,
     session_id: str = None
 ):
-    """CBT対話をジャーナルとして記録"""
+    """CBT対話を記録（セッション単位でバッファし、終了時に1件のジャーナルとして保存）"""
     try:
-        # ジャーナルテーブルに記録
-        journal_data = {
-            "user_id": user_id,
-            "content": f"【CBT対話】\nユーザー: {message}\nAI: {response}\n感情: {emotion}",
-            "cbt_session_id": session_id,
-            "emotion": emotion
-        }
-        
-        SupabaseDB.create_journal(journal_data)
+        if session_id:
+            cbt_transcript_buffer.add_turn(user_id, session_id, message, response, emotion)
+        else:
+            # セッションIDが無い対話はその場で1ターンのトランスクリプトとして保存
+            SupabaseDB.create_cbt_transcript(user_id, None, [{
+                "message": message,
+                "response": response,
+                "emotion": emotion,
+                "timestamp": datetime.now().isoformat()
+            }])
         
     except Exception as e:
         logger.error("CBT対話記録エラー", e, {"user_id": user_id})
@@ -0,0 +1,41 @@
+"""
+ダッシュボードAPIエンドポイント
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.utils.auth import get_current_user
+from app.utils.dashboard import dashboard_cache, build_dashboard_summary
+from app.utils.logger import logger
+from app.utils.error_handler import create_error_response, log_request_info
+
+router = APIRouter(tags=["dashboard"])
+
+@router.get("/summary")
+async def get_dashboard_summary(
+    current_user: dict = Depends(get_current_user),
+    request: Request = None
+):
+    """ダッシュボード表示用の集計（直近の記録・気分の推移・件数・使用回数）を取得"""
+    try:
+        if request:
+            log_request_info(request, current_user['id'])
+        
+        user_id = current_user['id']
+        plan_type = current_user.get('plan_type', 'free')
+        summary = await dashboard_cache.get_or_load(
+            user_id, lambda: build_dashboard_summary(user_id, plan_type)
+        )
+        
+        logger.log_user_action(
+            user_id=user_id,
+            action="get_dashboard_summary"
+        )
+        
+        return summary
+        
+    except Exception as e:
+        logger.error("ダッシュボード取得エラー", e, {"user_id": current_user['id']})
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=500, detail="ダッシュボードの取得に失敗しました")
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from app.schemas.journal import JournalCreate, JournalResponse
 from app.utils.auth import get_current_user
 from app.utils.usage_limits import can_use_feature, increment_usage
+from app.utils.dashboard import dashboard_cache
 from app.database.supabase_db import SupabaseDB
 from app.utils.logger import logger
+from app.utils.journal_search import journal_search_index
+from app.utils.journal_emotion import TIMELINE_INTERVALS, build_emotion_timeline
+from app.utils.journal_transfer import (
+    JOURNAL_IMPORT_BATCH_SIZE, JOURNAL_IMPORT_MAX_ERRORS,
+    iter_ndjson_lines, parse_import_line, iter_user_journals, export_ndjson, export_csv
+)
 from app.utils.error_handler import (
-    ValidationError, DatabaseError, UsageLimitError,
+    CareBotError, ValidationError, DatabaseError, UsageLimitError, ConflictError,
     create_error_response, log_request_info, validate_required_fields
 )
 
@@ -89,8 +99,13 @@ def create_journal(
         if not db_journal:
             raise DatabaseError("ジャーナルの作成に失敗しました")
         
+        # 重複（再送など）の場合は既存のジャーナルを返し、使用回数は増やさない
+        if db_journal.get("duplicate"):
+            return db_journal
+        
         # 使用回数を増加
         increment_usage(current_user['id'], "journal")
+        dashboard_cache.invalidate(current_user['id'])
         
         # 成功ログ
         logger.log_user_action(
@@ -111,6 +126,11 @@ def create_journal(
             raise create_error_response(e, request)
         else:
             raise HTTPException(status_code=429, detail=str(e))
+    except ConflictError as e:
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=409, detail=str(e))
     except DatabaseError as e:
         if request:
             raise create_error_response(e, request)
@@ -123,6 +143,185 @@ def create_journal(
         else:
             raise HTTPException(status_code=500, detail="ジャーナルの作成に失敗しました")
 
+@router.get("/search")
+def search_journals(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user),
+    request: Request = None
+):
+    """ジャーナルを全文検索（空白区切りはAND、関連度順・ハイライト付き）"""
+    try:
+        if request:
+            log_request_info(request, current_user['id'])
+        
+        indexed = journal_search_index.ensure_user_indexed(current_user['id'])
+        result = journal_search_index.search(current_user['id'], q, limit=limit, offset=offset)
+        
+        return {
+            "query": q,
+            "results": result["results"],
+            "total_count": result["total_count"],
+            "limit": limit,
+            "offset": offset,
+            # 履歴の取り込み中は古いジャーナルが結果に含まれない場合がある
+            "indexing": not indexed
+        }
+        
+    except Exception as e:
+        logger.error("ジャーナル検索エラー", e, {"user_id": current_user['id']})
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=500, detail="ジャーナルの検索に失敗しました")
+
+@router.get("/emotions")
+def get_journal_emotion_timeline(
+    interval: str = "day",
+    emotion: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+    request: Request = None
+):
+    """保存済みの感情タグから期間ごとの感情推移を取得"""
+    try:
+        if request:
+            log_request_info(request, current_user['id'])
+        
+        if interval not in TIMELINE_INTERVALS:
+            raise ValidationError("intervalはday・week・monthのいずれかを指定してください")
+        
+        rows = SupabaseDB.get_journal_emotions(
+            current_user['id'],
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None,
+            emotion=emotion
+        )
+        
+        return {
+            "interval": interval,
+            "emotion": emotion,
+            "timeline": build_emotion_timeline(rows, interval),
+            "total_count": len(rows)
+        }
+        
+    except ValidationError as e:
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("感情推移取得エラー", e, {"user_id": current_user['id']})
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=500, detail="感情推移の取得に失敗しました")
+
+@router.post("/import")
+async def import_journals(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """NDJSON形式でジャーナルを一括インポート（1行1件: {"content": ..., "created_at": ...}）"""
+    user_id = current_user['id']
+    imported = 0
+    
+    try:
+        log_request_info(request, user_id)
+        
+        # 使用回数制限は最初に一度だけ確認し、残り回数までをインポート
+        usage_check = await run_in_threadpool(can_use_feature, user_id, "journal")
+        remaining = max(0, usage_check["limit"] - usage_check["current_usage"])
+        if remaining == 0:
+            raise UsageLimitError(
+                "使用回数制限に達しました",
+                {
+                    "current_usage": usage_check["current_usage"],
+                    "limit": usage_check["limit"],
+                    "plan_type": usage_check["plan_type"],
+                    "upgrade_required": True
+                }
+            )
+        
+        errors = []
+        failed = 0
+        skipped = 0
+        batch = []
+        
+        async for line_number, line in iter_ndjson_lines(request.stream()):
+            try:
+                entry = parse_import_line(line, validate_journal_content)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < JOURNAL_IMPORT_MAX_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            
+            if imported + len(batch) >= remaining:
+                skipped += 1
+                continue
+            
+            batch.append(entry)
+            if len(batch) >= JOURNAL_IMPORT_BATCH_SIZE:
+                imported += len(await run_in_threadpool(SupabaseDB.create_journals, user_id, batch))
+                batch = []
+        
+        if batch:
+            imported += len(await run_in_threadpool(SupabaseDB.create_journals, user_id, batch))
+        
+        logger.log_user_action(
+            user_id=user_id,
+            action="import_journals",
+            details={"imported": imported, "failed": failed, "skipped": skipped}
+        )
+        
+        return {
+            "imported": imported,
+            "failed": failed,
+            "skipped_over_limit": skipped,
+            "errors": errors
+        }
+        
+    except CareBotError as e:
+        raise create_error_response(e, request)
+    except Exception as e:
+        logger.error("ジャーナルインポートエラー", e, {"user_id": user_id, "imported": imported})
+        raise create_error_response(DatabaseError("ジャーナルのインポートに失敗しました", {"imported": imported}), request)
+    finally:
+        # 途中で失敗しても挿入済みの件数は使用回数に反映
+        if imported:
+            await run_in_threadpool(increment_usage, user_id, "journal", imported)
+            dashboard_cache.invalidate(user_id)
+
+@router.get("/export")
+def export_journals(
+    format: str = "ndjson",
+    current_user: dict = Depends(get_current_user),
+    request: Request = None
+):
+    """ジャーナルをNDJSONまたはCSVでエクスポート（ページ単位で読み出してストリーミング）"""
+    if request:
+        log_request_info(request, current_user['id'])
+    
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="formatはndjsonまたはcsvを指定してください")
+    
+    journals = iter_user_journals(current_user['id'])
+    filename = f"journals_{datetime.now().strftime('%Y%m%d')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    logger.log_user_action(
+        user_id=current_user['id'],
+        action="export_journals",
+        details={"format": format}
+    )
+    
+    if format == "csv":
+        return StreamingResponse(export_csv(journals), media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(export_ndjson(journals), media_type="application/x-ndjson", headers=headers)
+
 @router.delete("/{journal_id}")
 def delete_journal(
     journal_id: int,
@@ -142,6 +341,8 @@ def delete_journal(
         if not success:
             raise HTTPException(status_code=404, detail="ジャーナルが見つかりません")
         
+        dashboard_cache.invalidate(current_user['id'])
+        
         # 成功ログ
         logger.log_user_action(
             user_id=current_user['id'],
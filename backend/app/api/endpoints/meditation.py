@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Dict, Any, Optional
 from app.utils.auth import get_current_user
 from app.utils.meditation_guide import MeditationGuide
+from app.utils.static_responses import PrecomputedResponse
 from app.utils.usage_limits import can_use_feature, increment_usage
 from app.database.supabase_db import SupabaseDB
 
@@ -10,20 +11,52 @@ router = APIRouter(tags=["meditation"])
 # 瞑想ガイドの初期化
 meditation_guide = MeditationGuide()
 
+# カテゴリ一覧（カタログは読み取り専用のため起動時に一度だけ構築）
+meditation_categories = {
+    "beginner": {
+        "name": "初心者向け",
+        "description": "瞑想を始めたばかりの方におすすめ",
+        "sessions": meditation_guide.get_sessions_by_category("beginner")
+    },
+    "intermediate": {
+        "name": "中級者向け", 
+        "description": "ある程度瞑想に慣れた方におすすめ",
+        "sessions": meditation_guide.get_sessions_by_category("intermediate")
+    }
+}
+
+# 公開カタログのレスポンス（起動時にシリアライズ）
+all_sessions_response = PrecomputedResponse({
+    "sessions": meditation_guide.get_all_sessions(),
+    "total_count": len(meditation_guide.get_all_sessions())
+})
+categories_response = PrecomputedResponse({"categories": meditation_categories})
+
 @router.get("/sessions")
 def get_meditation_sessions(
+    request: Request,
     category: Optional[str] = None,
     max_duration: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
+    min_duration: Optional[int] = None,
+    duration_bucket: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0)
 ):
-    """瞑想セッション一覧を取得"""
+    """瞑想セッション一覧を取得（条件はすべてAND、認証不要）"""
+    if not request.query_params:
+        return all_sessions_response.respond(request)
+    
     try:
-        if category:
-            sessions = meditation_guide.get_sessions_by_category(category)
-        elif max_duration:
-            sessions = meditation_guide.get_sessions_by_duration(max_duration)
-        else:
-            sessions = meditation_guide.get_all_sessions()
+        sessions = meditation_guide.search_sessions(
+            category=category,
+            tags=tags,
+            min_duration=min_duration,
+            max_duration=max_duration,
+            duration_bucket=duration_bucket,
+            limit=limit,
+            offset=offset
+        )
         
         return {
             "sessions": sessions,
@@ -151,23 +184,6 @@ def get_meditation_history(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"瞑想履歴取得エラー: {str(e)}")
 
 @router.get("/categories")
-def get_meditation_categories():
+def get_meditation_categories(request: Request):
     """瞑想カテゴリ一覧を取得"""
-    try:
-        categories = {
-            "beginner": {
-                "name": "初心者向け",
-                "description": "瞑想を始めたばかりの方におすすめ",
-                "sessions": meditation_guide.get_sessions_by_category("beginner")
-            },
-            "intermediate": {
-                "name": "中級者向け", 
-                "description": "ある程度瞑想に慣れた方におすすめ",
-                "sessions": meditation_guide.get_sessions_by_category("intermediate")
-            }
-        }
-        
-        return {"categories": categories}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"カテゴリ取得エラー: {str(e)}") 
\ No newline at end of file
+    return categories_response.respond(request) 
\ No newline at end of file
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List
-from app.schemas.mood import MoodCreate, MoodResponse
+from app.schemas.mood import MoodCreate, MoodResponse, MoodBatchCreate
 from app.utils.auth import get_current_user
 from app.utils.usage_limits import can_use_feature, increment_usage
+from app.utils.dashboard import dashboard_cache
 from app.database.supabase_db import SupabaseDB
 from app.utils.logger import logger
 from app.utils.error_handler import (
@@ -97,6 +98,7 @@ def create_mood(
         
         # 使用回数を増加
         increment_usage(current_user['id'], "mood")
+        dashboard_cache.invalidate(current_user['id'])
         
         # 成功ログ
         logger.log_user_action(
@@ -129,6 +131,115 @@ def create_mood(
         else:
             raise HTTPException(status_code=500, detail="気分記録の作成に失敗しました")
 
+@router.post("/batch")
+def create_moods_batch(
+    batch: MoodBatchCreate,
+    current_user: dict = Depends(get_current_user),
+    request: Request = None
+):
+    """気分記録を一括作成（オフライン中に記録した分の再送用、結果は項目ごとに返す）"""
+    user_id = current_user['id']
+    try:
+        if request:
+            log_request_info(request, user_id)
+        
+        results = [None] * len(batch.moods)
+        pending = []
+        batch_keys = {}
+        
+        # 各項目の検証（バッチ内で同じキーが重複している場合は最初の1件のみ）
+        for index, item in enumerate(batch.moods):
+            if not validate_mood_score(item.mood):
+                results[index] = {"index": index, "status": "invalid", "error": "気分スコアは1から5の間である必要があります"}
+                continue
+            if not validate_mood_note(item.note):
+                results[index] = {"index": index, "status": "invalid", "error": "メモは1,000文字以下である必要があります"}
+                continue
+            key = item.idempotency_key
+            if key is not None and key in batch_keys:
+                results[index] = {"index": index, "status": "duplicate", "duplicate_of": batch_keys[key]}
+                continue
+            if key is not None:
+                batch_keys[key] = index
+            
+            entry = {"mood": item.mood, "note": item.note, "idempotency_key": key}
+            if item.recorded_at is not None:
+                entry["recorded_at"] = item.recorded_at.isoformat()
+            pending.append((index, entry))
+        
+        # 前回の送信で記録済みのものを除外
+        existing = {
+            mood["idempotency_key"]: mood
+            for mood in SupabaseDB.get_moods_by_idempotency_keys(user_id, list(batch_keys))
+        }
+        new_entries = []
+        for index, entry in pending:
+            if entry["idempotency_key"] in existing:
+                results[index] = {"index": index, "status": "duplicate", "mood": existing[entry["idempotency_key"]]}
+            else:
+                new_entries.append((index, entry))
+        
+        created = 0
+        if new_entries:
+            # 使用回数制限はバッチ全体で一度だけ確認
+            usage_check = can_use_feature(user_id, "mood")
+            remaining = max(0, usage_check["limit"] - usage_check["current_usage"])
+            if remaining == 0:
+                raise UsageLimitError(
+                    "使用回数制限に達しました",
+                    {
+                        "current_usage": usage_check["current_usage"],
+                        "limit": usage_check["limit"],
+                        "plan_type": usage_check["plan_type"],
+                        "upgrade_required": True
+                    }
+                )
+            
+            accepted = new_entries[:remaining]
+            for index, _ in new_entries[remaining:]:
+                results[index] = {"index": index, "status": "rejected", "error": "使用回数制限に達しました"}
+            
+            # 1回のリクエストでまとめて挿入
+            inserted = SupabaseDB.create_moods(user_id, [entry for _, entry in accepted])
+            
+            # 挿入結果は送信順に返る（同時再送で重複した行のみ欠ける）
+            position = 0
+            for index, entry in accepted:
+                if position < len(inserted) and inserted[position].get("idempotency_key") == entry["idempotency_key"]:
+                    results[index] = {"index": index, "status": "created", "mood": inserted[position]}
+                    position += 1
+                else:
+                    results[index] = {"index": index, "status": "duplicate"}
+            created = position
+            
+            if created:
+                increment_usage(user_id, "mood", created)
+                dashboard_cache.invalidate(user_id)
+        
+        summary = {status: 0 for status in ("created", "duplicate", "invalid", "rejected")}
+        for result in results:
+            summary[result["status"]] += 1
+        
+        logger.log_user_action(
+            user_id=user_id,
+            action="create_moods_batch",
+            details=summary
+        )
+        
+        return {"results": results, **summary}
+        
+    except UsageLimitError as e:
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logger.error("気分記録一括作成エラー", e, {"user_id": user_id})
+        if request:
+            raise create_error_response(e, request)
+        else:
+            raise HTTPException(status_code=500, detail="気分記録の作成に失敗しました")
+
 @router.delete("/{mood_id}")
 def delete_mood(
     mood_id: int,
@@ -148,6 +259,8 @@ def delete_mood(
         if not success:
             raise HTTPException(status_code=404, detail="気分記録が見つかりません")
         
+        dashboard_cache.invalidate(current_user['id'])
+        
         # 成功ログ
         logger.log_user_action(
             user_id=current_user['id'],
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Dict, Any, Optional
 from app.utils.auth import get_current_user
 from app.utils.pomodoro_timer import PomodoroTimer
+from app.utils.pomodoro_store import pomodoro_store, PomodoroSessionState, POMODORO_WAIT_TIMEOUT
+from app.utils.static_responses import PrecomputedResponse
+from app.schemas.pomodoro import PomodoroSessionCreate, PomodoroSessionAction
 from app.utils.usage_limits import can_use_feature, increment_usage
 from app.database.supabase_db import SupabaseDB
 
@@ -10,18 +13,32 @@ router = APIRouter(tags=["pomodoro"])
 # ポモドーロタイマーの初期化
 pomodoro_timer = PomodoroTimer()
 
+# 固定レスポンス（起動時にシリアライズ）
+default_settings_response = PrecomputedResponse({"settings": pomodoro_timer.default_settings})
+session_states_response = PrecomputedResponse({"states": pomodoro_timer.session_states})
+
+def get_user_session(session_id: str, current_user: dict) -> PomodoroSessionState:
+    """ログインユーザーのセッション状態をストアから取得"""
+    state = pomodoro_store.get(session_id)
+    if state is None or state.user_id != current_user['id']:
+        raise HTTPException(status_code=404, detail="ポモドーロセッションが見つかりません")
+    return state
+
 @router.post("/session/create")
 def create_pomodoro_session(
-    settings: Optional[Dict[str, Any]] = None,
+    request: Optional[PomodoroSessionCreate] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """ポモドーロセッションを作成"""
     try:
+        settings = request.settings if request else None
         session_data = pomodoro_timer.create_session(current_user['id'], settings)
+        pomodoro_store.create(session_data)
         
         return {
             "message": "ポモドーロセッションを作成しました",
-            "session_data": session_data
+            "session_data": session_data,
+            "schedule": pomodoro_timer.get_schedule(session_data)
         }
         
     except Exception as e:
@@ -29,10 +46,12 @@ def create_pomodoro_session(
 
 @router.post("/session/start-focus")
 def start_focus_session(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """集中セッションを開始"""
+    state = get_user_session(session.session_id, current_user)
+    
     # 使用制限チェック
     if not can_use_feature(current_user['id'], 'pomodoro_session'):
         raise HTTPException(
@@ -41,14 +60,17 @@ def start_focus_session(
         )
     
     try:
-        updated_session = pomodoro_timer.start_focus_session(session_data)
+        updated_session = pomodoro_timer.start_focus_session(state.to_dict())
+        state.update(updated_session)
+        pomodoro_store.save(state)
         
         # 使用回数を増加
         increment_usage(current_user['id'], 'pomodoro_session')
         
         return {
             "message": "集中セッションを開始しました",
-            "session_data": updated_session
+            "session_data": updated_session,
+            "schedule": pomodoro_timer.get_schedule(updated_session)
         }
         
     except Exception as e:
@@ -56,16 +78,21 @@ def start_focus_session(
 
 @router.post("/session/start-break")
 def start_break_session(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """休憩セッションを開始"""
+    state = get_user_session(session.session_id, current_user)
+    
     try:
-        updated_session = pomodoro_timer.start_break_session(session_data)
+        updated_session = pomodoro_timer.start_break_session(state.to_dict())
+        state.update(updated_session)
+        pomodoro_store.save(state)
         
         return {
             "message": "休憩セッションを開始しました",
-            "session_data": updated_session
+            "session_data": updated_session,
+            "schedule": pomodoro_timer.get_schedule(updated_session)
         }
         
     except Exception as e:
@@ -73,16 +100,21 @@ def start_break_session(
 
 @router.post("/session/pause")
 def pause_session(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """セッションを一時停止"""
+    state = get_user_session(session.session_id, current_user)
+    
     try:
-        updated_session = pomodoro_timer.pause_session(session_data)
+        updated_session = pomodoro_timer.pause_session(state.to_dict())
+        state.update(updated_session)
+        pomodoro_store.save(state)
         
         return {
             "message": "セッションを一時停止しました",
-            "session_data": updated_session
+            "session_data": updated_session,
+            "schedule": pomodoro_timer.get_schedule(updated_session)
         }
         
     except Exception as e:
@@ -90,16 +122,21 @@ def pause_session(
 
 @router.post("/session/resume")
 def resume_session(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """セッションを再開"""
+    state = get_user_session(session.session_id, current_user)
+    
     try:
-        updated_session = pomodoro_timer.resume_session(session_data)
+        updated_session = pomodoro_timer.resume_session(state.to_dict())
+        state.update(updated_session)
+        pomodoro_store.save(state)
         
         return {
             "message": "セッションを再開しました",
-            "session_data": updated_session
+            "session_data": updated_session,
+            "schedule": pomodoro_timer.get_schedule(updated_session)
         }
         
     except Exception as e:
@@ -107,12 +144,15 @@ def resume_session(
 
 @router.post("/session/complete")
 def complete_session(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """セッションを完了"""
+    state = get_user_session(session.session_id, current_user)
+    
     try:
-        completed_session = pomodoro_timer.complete_session(session_data)
+        completed_session = pomodoro_timer.complete_session(state.to_dict())
+        pomodoro_store.remove(state.session_id)
         
         return {
             "message": "ポモドーロセッションを完了しました",
@@ -124,21 +164,63 @@ def complete_session(
 
 @router.post("/session/progress")
 def get_session_progress(
-    session_data: Dict[str, Any],
+    session: PomodoroSessionAction,
     current_user: dict = Depends(get_current_user)
 ):
     """セッションの進行状況を取得"""
+    state = get_user_session(session.session_id, current_user)
+    
     try:
+        session_data = state.to_dict()
         progress = pomodoro_timer.get_session_progress(session_data)
         
         return {
             "progress": progress,
-            "session_data": session_data
+            "session_data": session_data,
+            "schedule": pomodoro_timer.get_schedule(session_data)
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"進行状況取得エラー: {str(e)}")
 
+@router.get("/session/active")
+def get_active_session(current_user: dict = Depends(get_current_user)):
+    """ログインユーザーのアクティブなセッションを取得"""
+    state = pomodoro_store.get_active_for_user(current_user['id'])
+    if state is None:
+        raise HTTPException(status_code=404, detail="アクティブなポモドーロセッションはありません")
+    
+    session_data = state.to_dict()
+    return {
+        "session_data": session_data,
+        "schedule": pomodoro_timer.get_schedule(session_data)
+    }
+
+@router.get("/session/wait")
+async def wait_for_session_change(
+    session_id: str,
+    version: int = Query(..., ge=0, description="クライアントが保持しているスケジュールのバージョン"),
+    timeout: int = Query(POMODORO_WAIT_TIMEOUT, ge=1, le=60, description="最大待機秒数"),
+    current_user: dict = Depends(get_current_user)
+):
+    """状態が変わるまで待機して新しいスケジュールを返す（ロングポーリング）"""
+    # 確認と待機の間の変更を取りこぼさないよう、先に待機を登録
+    change = pomodoro_store.watch(session_id)
+    try:
+        state = get_user_session(session_id, current_user)
+        if pomodoro_timer.get_schedule(state.to_dict())["version"] == version:
+            await pomodoro_store.wait(session_id, change, timeout)
+    finally:
+        pomodoro_store.unwatch(session_id, change)
+    
+    state = pomodoro_store.get(session_id)
+    if state is None or state.user_id != current_user['id']:
+        # 完了または期限切れで削除された
+        return {"changed": True, "ended": True, "schedule": None}
+    
+    schedule = pomodoro_timer.get_schedule(state.to_dict())
+    return {"changed": schedule["version"] != version, "ended": False, "schedule": schedule}
+
 @router.get("/statistics")
 def get_user_statistics(current_user: dict = Depends(get_current_user)):
     """ユーザーのポモドーロ統計を取得"""
@@ -172,23 +254,11 @@ def get_pomodoro_history(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"履歴取得エラー: {str(e)}")
 
 @router.get("/settings/default")
-def get_default_settings():
+def get_default_settings(request: Request):
     """デフォルト設定を取得"""
-    try:
-        return {
-            "settings": pomodoro_timer.default_settings
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"設定取得エラー: {str(e)}")
+    return default_settings_response.respond(request)
 
 @router.get("/states")
-def get_session_states():
+def get_session_states(request: Request):
     """セッション状態一覧を取得"""
-    try:
-        return {
-            "states": pomodoro_timer.session_states
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"状態取得エラー: {str(e)}") 
\ No newline at end of file
+    return session_states_response.respond(request)
\ No newline at end of file
@@ -52,15 +52,10 @@ def create_my_profile(
         if request:
             log_request_info(request, current_user['id'])
 
-        # 既存のプロフィールをチェック
-        existing_profile = SupabaseDB.get_user_profile(current_user['id'])
-        if existing_profile:
-            raise ValidationError("プロフィールは既に存在します")
-
-        # プロフィール作成
+        # プロフィール作成（既に存在する場合は作成されない）
         profile = SupabaseDB.create_user_profile(current_user['id'], profile_data.dict())
         if not profile:
-            raise DatabaseError("プロフィールの作成に失敗しました")
+            raise ValidationError("プロフィールは既に存在します")
 
         logger.log_user_action(
             user_id=current_user['id'],
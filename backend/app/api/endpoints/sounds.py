@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Dict, Any, Optional
 from app.utils.auth import get_current_user
 from app.utils.relaxation_sounds import RelaxationSounds
+from app.utils.soundscape_mixer import soundscape_mixer
+from app.utils.audio_files import audio_file_response
+from app.utils.static_responses import PrecomputedResponse
 from app.utils.usage_limits import can_use_feature, increment_usage
 from app.database.supabase_db import SupabaseDB
 
@@ -10,17 +13,52 @@ router = APIRouter(tags=["sounds"])
 # リラックスサウンドシステムの初期化
 relaxation_sounds = RelaxationSounds()
 
+# カテゴリ一覧（カタログは読み取り専用のため起動時に一度だけ構築）
+sound_categories = {
+    "nature": {
+        "name": "自然音",
+        "description": "雨、波、森などの自然の音",
+        "sounds": relaxation_sounds.get_sounds_by_category("nature")
+    },
+    "ambient": {
+        "name": "環境音",
+        "description": "ホワイトノイズ、ピンクノイズなどの環境音",
+        "sounds": relaxation_sounds.get_sounds_by_category("ambient")
+    },
+    "instruments": {
+        "name": "楽器音",
+        "description": "ピアノ、フルートなどの楽器の音",
+        "sounds": relaxation_sounds.get_sounds_by_category("instruments")
+    }
+}
+
+# 公開カタログのレスポンス（起動時にシリアライズ）
+all_sounds_response = PrecomputedResponse({
+    "sounds": relaxation_sounds.get_all_sounds(),
+    "total_count": len(relaxation_sounds.get_all_sounds())
+})
+categories_response = PrecomputedResponse({"categories": sound_categories})
+presets_response = PrecomputedResponse({"presets": relaxation_sounds.get_presets()})
+
 @router.get("/")
 def get_all_sounds(
+    request: Request,
     category: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    tags: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0)
 ):
-    """サウンド一覧を取得"""
+    """サウンド一覧を取得（条件はすべてAND、認証不要）"""
+    if not request.query_params:
+        return all_sounds_response.respond(request)
+    
     try:
-        if category:
-            sounds = relaxation_sounds.get_sounds_by_category(category)
-        else:
-            sounds = relaxation_sounds.get_all_sounds()
+        sounds = relaxation_sounds.search_sounds(
+            category=category,
+            tags=tags,
+            limit=limit,
+            offset=offset
+        )
         
         return {
             "sounds": sounds,
@@ -30,60 +68,15 @@ def get_all_sounds(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"サウンド取得エラー: {str(e)}")
 
-@router.get("/{sound_id}")
-def get_sound(
-    sound_id: str,
-    current_user: dict = Depends(get_current_user)
-):
-    """特定のサウンド詳細を取得"""
-    try:
-        sound = relaxation_sounds.get_sound_by_id(sound_id)
-        if not sound:
-            raise HTTPException(status_code=404, detail="サウンドが見つかりません")
-        
-        return {"sound": sound}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"サウンド取得エラー: {str(e)}")
-
 @router.get("/categories")
-def get_sound_categories():
+def get_sound_categories(request: Request):
     """サウンドカテゴリ一覧を取得"""
-    try:
-        categories = {
-            "nature": {
-                "name": "自然音",
-                "description": "雨、波、森などの自然の音",
-                "sounds": relaxation_sounds.get_sounds_by_category("nature")
-            },
-            "ambient": {
-                "name": "環境音",
-                "description": "ホワイトノイズ、ピンクノイズなどの環境音",
-                "sounds": relaxation_sounds.get_sounds_by_category("ambient")
-            },
-            "instruments": {
-                "name": "楽器音",
-                "description": "ピアノ、フルートなどの楽器の音",
-                "sounds": relaxation_sounds.get_sounds_by_category("instruments")
-            }
-        }
-        
-        return {"categories": categories}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"カテゴリ取得エラー: {str(e)}")
+    return categories_response.respond(request)
 
 @router.get("/presets")
-def get_presets():
+def get_presets(request: Request):
     """プリセットサウンドスケープ一覧を取得"""
-    try:
-        presets = relaxation_sounds.get_presets()
-        return {"presets": presets}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"プリセット取得エラー: {str(e)}")
+    return presets_response.respond(request)
 
 @router.get("/presets/{preset_id}")
 def get_preset(
@@ -119,6 +112,57 @@ def create_custom_soundscape(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"サウンドスケープ作成エラー: {str(e)}")
 
+@router.post("/mix")
+def mix_custom_soundscape(
+    sound_ids: List[str],
+    volumes: Optional[List[float]] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """カスタムサウンドスケープを1本の音声にミックス"""
+    if not soundscape_mixer.is_available():
+        raise HTTPException(status_code=503, detail="サウンドミックス機能は現在利用できません")
+    
+    # 使用制限チェック（ミックスは再生と同じ回数制限）
+    if not can_use_feature(current_user['id'], 'sound_play')["can_use"]:
+        raise HTTPException(
+            status_code=429,
+            detail="サウンド再生の使用回数上限に達しました。プレミアムプランへのアップグレードをご検討ください。"
+        )
+    
+    try:
+        soundscape = relaxation_sounds.create_custom_soundscape(sound_ids, volumes)
+        if not soundscape["sounds"]:
+            raise HTTPException(status_code=400, detail="有効なサウンドが指定されていません")
+        
+        mix = soundscape_mixer.mix(soundscape["sounds"])
+        increment_usage(current_user['id'], 'sound_play')
+        soundscape["mix_id"] = mix["mix_id"]
+        soundscape["stream_url"] = f"/api/sounds/mix/{mix['mix_id']}"
+        soundscape["duration"] = mix["duration"]
+        soundscape["loop"] = True
+        
+        return {"soundscape": soundscape, "cached": mix["cached"]}
+        
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"サウンドミックスエラー: {str(e)}")
+
+@router.get("/mix/{mix_id}")
+def get_mixed_soundscape(mix_id: str, request: Request):
+    """ミックス済みサウンドスケープの音声を取得"""
+    path = soundscape_mixer.get_mix_path(mix_id)
+    response = audio_file_response(path, request, max_age=31536000, immutable=True) if path else None
+    if response is None:
+        raise HTTPException(status_code=404, detail="ミックス済みサウンドスケープが見つかりません")
+    
+    # 内容はmix_idから一意に決まるため長期キャッシュ可能
+    return response
+
 @router.get("/recommendations")
 def get_recommended_sounds(
     context: Optional[str] = None,
@@ -205,4 +249,23 @@ def play_sound(
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"再生エラー: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"再生エラー: {str(e)}") 
+
+# 固定パスのルートより後に定義する（/categories などを隠さないため）
+@router.get("/{sound_id}")
+def get_sound(
+    sound_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """特定のサウンド詳細を取得"""
+    try:
+        sound = relaxation_sounds.get_sound_by_id(sound_id)
+        if not sound:
+            raise HTTPException(status_code=404, detail="サウンドが見つかりません")
+        
+        return {"sound": sound}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"サウンド取得エラー: {str(e)}")
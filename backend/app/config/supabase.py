@@ -1,7 +1,9 @@
 import os
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
 
+from app.utils.http_client import create_http_client
+
 # 環境変数を読み込み
 load_dotenv()
 
@@ -18,8 +20,27 @@ if not SUPABASE_KEY:
 if not SUPABASE_SERVICE_KEY:
     raise ValueError("SUPABASE_SERVICE_KEY環境変数が設定されていません")
 
+class PooledClient(Client):
+    """PostgRESTへの通信に設定済みのHTTPクライアント（HTTP/2・keep-alive・再試行）を使うSupabaseクライアント"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, pool_name: str):
+        # PostgREST専用にする（共有するとstorage等の初期化でbase_urlが書き換えられる）
+        self._http_client = create_http_client(pool_name)
+        super().__init__(supabase_url, supabase_key)
+
+    @property
+    def postgrest(self):
+        if self._postgrest is None:
+            self._postgrest = self._init_postgrest_client(
+                rest_url=self.rest_url,
+                headers=self.options.headers,
+                schema=self.options.schema,
+                http_client=self._http_client
+            )
+        return self._postgrest
+
 # Supabaseクライアントの初期化（anon key）
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = PooledClient(SUPABASE_URL, SUPABASE_KEY, "supabase")
 
 # service_roleキーを使用してRLSをバイパスするクライアント
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY) 
\ No newline at end of file
+supabase_admin: Client = PooledClient(SUPABASE_URL, SUPABASE_SERVICE_KEY, "supabase_admin")
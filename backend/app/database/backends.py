@@ -0,0 +1,633 @@
+"""
+データバックエンド
+SupabaseDBが使うテーブル操作（PostgRESTのクエリビルダー相当）をSupabase・SQLite・インメモリで差し替え可能にする
+"""
+
+import contextlib
+import copy
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# 環境変数を読み込み
+load_dotenv()
+
+# データバックエンド設定
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase")  # "supabase", "sqlite" or "memory"
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "data/carebot.sqlite3")
+SQLITE_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# テーブル定義（Supabase上のスキーマと同じ列。SQLite・インメモリで使用）
+SCHEMA: Dict[str, Dict[str, Any]] = {
+    "users": {
+        "columns": {
+            "id": "INTEGER", "email": "TEXT", "name": "TEXT", "password": "TEXT", "plan_type": "TEXT",
+            "role": "TEXT", "last_login": "TIMESTAMP", "created_at": "TIMESTAMP", "updated_at": "TIMESTAMP"
+        },
+        "defaults": {"plan_type": "free", "role": "user"},
+        "unique": [("email",)],
+        "indexes": [("role",)]
+    },
+    "profiles": {
+        "columns": {
+            "id": "INTEGER", "user_id": "INTEGER", "display_name": "TEXT", "avatar_url": "TEXT", "bio": "TEXT",
+            "preferences": "JSON", "created_at": "TIMESTAMP", "updated_at": "TIMESTAMP"
+        },
+        "unique": [("user_id",)],
+        "indexes": []
+    },
+    "journals": {
+        "columns": {
+            "id": "INTEGER", "user_id": "INTEGER", "content": "TEXT", "created_at": "TIMESTAMP",
+            "emotion": "TEXT", "emotion_scores": "JSON", "sentiment_score": "REAL", "crisis_detected": "BOOLEAN",
+            "session_id": "TEXT", "turns": "JSON"
+        },
+        "defaults": {"crisis_detected": False},
+        "unique": [],
+        "indexes": [("user_id", "created_at"), ("user_id", "session_id"), ("user_id", "emotion", "created_at"), ("emotion",)]
+    },
+    "moods": {
+        "columns": {
+            "id": "INTEGER", "user_id": "INTEGER", "mood": "INTEGER", "note": "TEXT",
+            "recorded_at": "TIMESTAMP", "idempotency_key": "TEXT"
+        },
+        "unique": [("user_id", "idempotency_key")],
+        "indexes": [("user_id", "recorded_at")]
+    },
+    "usage_counts": {
+        "columns": {
+            "id": "INTEGER", "user_id": "INTEGER", "feature_type": "TEXT", "usage_count": "INTEGER",
+            "reset_date": "TIMESTAMP", "last_used": "TIMESTAMP", "created_at": "TIMESTAMP"
+        },
+        "defaults": {"usage_count": 0},
+        "unique": [("user_id", "feature_type")],
+        "indexes": []
+    },
+    "analyses": {
+        "columns": {
+            "id": "INTEGER", "user_id": "INTEGER", "analysis_type": "TEXT", "summary": "TEXT", "insights": "TEXT",
+            "recommendations": "TEXT", "mood_score": "REAL", "stress_level": "TEXT", "created_at": "TIMESTAMP"
+        },
+        "unique": [],
+        "indexes": [("user_id", "created_at")]
+    },
+    "feature_limits": {
+        "columns": {
+            "id": "INTEGER", "feature_name": "TEXT", "free_limit": "INTEGER", "premium_limit": "INTEGER",
+            "description": "TEXT", "created_at": "TIMESTAMP"
+        },
+        "unique": [("feature_name",)],
+        "indexes": []
+    }
+}
+
+# JSON列（返却時に複製する）
+JSON_COLUMNS = {
+    table: [column for column, kind in definition["columns"].items() if kind == "JSON"]
+    for table, definition in SCHEMA.items()
+}
+
+# 挿入時に現在時刻を設定する列
+TIMESTAMP_DEFAULTS = ("created_at", "recorded_at", "reset_date")
+
+class IntegrityError(Exception):
+    """一意制約違反（インメモリバックエンド）"""
+    pass
+
+class QueryResult:
+    """execute()の結果（postgrestのAPIResponse相当）"""
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+class TableQuery:
+    """テーブル操作のクエリビルダー（操作を記録し、execute()でバックエンドに渡す）"""
+
+    def __init__(self, backend: "DataBackend", table: str):
+        if table not in SCHEMA:
+            raise ValueError(f"テーブル {table} は定義されていません")
+        self.backend = backend
+        self.table = table
+        self.operation = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[Tuple[str, str, Any, bool]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.limit_count: Optional[int] = None
+        self.offset = 0
+        self.count_method: Optional[str] = None
+        self.head = False
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+        self._negate_next = False
+
+    # 操作
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None) -> "TableQuery":
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_method = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, rows, **kwargs) -> "TableQuery":
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, ignore_duplicates: bool = False, **kwargs) -> "TableQuery":
+        self.operation, self.payload = "upsert", rows
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any], **kwargs) -> "TableQuery":
+        self.operation, self.payload = "update", data
+        return self
+
+    def delete(self, **kwargs) -> "TableQuery":
+        self.operation = "delete"
+        return self
+
+    # フィルタ
+    @property
+    def not_(self) -> "TableQuery":
+        self._negate_next = True
+        return self
+
+    def _filter(self, operator: str, column: str, value: Any) -> "TableQuery":
+        self.filters.append((operator, column, value, self._negate_next))
+        self._negate_next = False
+        return self
+
+    def eq(self, column: str, value: Any): return self._filter("eq", column, value)
+    def neq(self, column: str, value: Any): return self._filter("neq", column, value)
+    def gt(self, column: str, value: Any): return self._filter("gt", column, value)
+    def gte(self, column: str, value: Any): return self._filter("gte", column, value)
+    def lt(self, column: str, value: Any): return self._filter("lt", column, value)
+    def lte(self, column: str, value: Any): return self._filter("lte", column, value)
+    def in_(self, column: str, values): return self._filter("in", column, list(values))
+
+    def is_(self, column: str, value: Any):
+        return self._filter("is", column, None if value in ("null", None) else value in (True, "true"))
+
+    # 並び順・件数
+    def order(self, column: str, desc: bool = False, **kwargs) -> "TableQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int, **kwargs) -> "TableQuery":
+        self.limit_count = count
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "TableQuery":
+        self.offset, self.limit_count = start, end - start + 1
+        return self
+
+    def execute(self) -> QueryResult:
+        return self.backend.execute(self)
+
+    # バックエンド共通の補助
+    def selected_columns(self) -> List[str]:
+        """取得する列（未定義の列はエラー）"""
+        if self.columns.strip() == "*":
+            return list(SCHEMA[self.table]["columns"])
+        columns = [column.strip() for column in self.columns.split(",") if column.strip()]
+        _check_columns(self.table, columns)
+        return columns
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """insert/upsertの行を列の既定値を補って返す"""
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        return [prepare_row(self.table, row) for row in rows]
+
+    def conflict_columns(self) -> Tuple[str, ...]:
+        columns = tuple(column.strip() for column in (self.on_conflict or "id").split(","))
+        _check_columns(self.table, columns)
+        return columns
+
+def _check_columns(table: str, columns) -> None:
+    unknown = [column for column in columns if column not in SCHEMA[table]["columns"]]
+    if unknown:
+        raise ValueError(f"テーブル {table} に列 {unknown} は存在しません")
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def normalize_value(value: Any) -> Any:
+    """'now()'と日時型を保存用の文字列に変換"""
+    if value == "now()":
+        return _now()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def prepare_row(table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """挿入する行に既定値（作成日時など）を設定"""
+    _check_columns(table, row)
+    definition = SCHEMA[table]
+    prepared = {key: normalize_value(value) for key, value in row.items()}
+    for column, value in definition.get("defaults", {}).items():
+        prepared.setdefault(column, value)
+    for column in TIMESTAMP_DEFAULTS:
+        if column in definition["columns"] and not prepared.get(column):
+            prepared[column] = _now()
+    return prepared
+
+class DataBackend:
+    """データバックエンドの基底クラス"""
+
+    name = "base"
+
+    def table(self, name: str) -> TableQuery:
+        """テーブル操作を開始"""
+        return TableQuery(self, name)
+
+    def execute(self, query: TableQuery) -> QueryResult:
+        """記録されたクエリを実行"""
+        raise NotImplementedError
+
+    def close(self):
+        """接続を閉じる"""
+        pass
+
+class SupabaseBackend(DataBackend):
+    """Supabase（PostgREST）経由。クライアントは最初の使用時に作成する"""
+
+    name = "supabase"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.config.supabase import supabase_admin
+            self._client = supabase_admin
+        return self._client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+class MemoryBackend(DataBackend):
+    """プロセス内メモリ（負荷試験・オフライン実行用、再起動で消える）"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {table: [] for table in SCHEMA}
+        self._ids: Dict[str, int] = {table: 0 for table in SCHEMA}
+        self._lock = threading.Lock()
+
+    def execute(self, query: TableQuery) -> QueryResult:
+        with self._lock:
+            return getattr(self, f"_{query.operation}")(query)
+
+    def _matches(self, filters: List[Tuple[str, str, Any, bool]], row: Dict[str, Any]) -> bool:
+        for operator, column, value, negate in filters:
+            if _compare(operator, row.get(column), value) == negate:
+                return False
+        return True
+
+    def _filters(self, query: TableQuery) -> List[Tuple[str, str, Any, bool]]:
+        _check_columns(query.table, [column for _, column, _, _ in query.filters])
+        return [(operator, column, normalize_value(value), negate) for operator, column, value, negate in query.filters]
+
+    def _select(self, query: TableQuery) -> QueryResult:
+        columns = query.selected_columns()
+        filters = self._filters(query)
+        rows = [row for row in self.tables[query.table] if self._matches(filters, row)]
+        # PostgreSQLと同様にNULLは昇順で末尾、降順で先頭
+        for column, desc in reversed(query.orders):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        count = len(rows) if query.count_method else None
+        if query.head:
+            return QueryResult([], count)
+        end = query.offset + query.limit_count if query.limit_count is not None else None
+        return QueryResult([_copy_row(query.table, row, columns) for row in rows[query.offset:end]], count)
+
+    def _insert(self, query: TableQuery) -> QueryResult:
+        rows = query.rows()
+        for row in rows:
+            self._check_unique(query.table, row)
+        return QueryResult([_copy_row(query.table, self._append(query.table, row)) for row in rows])
+
+    def _upsert(self, query: TableQuery) -> QueryResult:
+        keys = query.conflict_columns()
+        result = []
+        for row in query.rows():
+            existing = self._find(query.table, keys, row)
+            if existing is None:
+                self._check_unique(query.table, row)
+                result.append(_copy_row(query.table, self._append(query.table, row)))
+            elif not query.ignore_duplicates:
+                existing.update({key: value for key, value in row.items() if key != "id"})
+                result.append(_copy_row(query.table, existing))
+        return QueryResult(result)
+
+    def _update(self, query: TableQuery) -> QueryResult:
+        _check_columns(query.table, query.payload)
+        values = {key: normalize_value(value) for key, value in query.payload.items()}
+        filters = self._filters(query)
+        updated = []
+        for row in self.tables[query.table]:
+            if self._matches(filters, row):
+                row.update(values)
+                updated.append(_copy_row(query.table, row))
+        return QueryResult(updated)
+
+    def _delete(self, query: TableQuery) -> QueryResult:
+        filters = self._filters(query)
+        kept, deleted = [], []
+        for row in self.tables[query.table]:
+            (deleted if self._matches(filters, row) else kept).append(row)
+        self.tables[query.table] = kept
+        return QueryResult(deleted)
+
+    def _append(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        self._ids[table] = max(self._ids[table] + 1, row.get("id") or 0)
+        stored = {column: None for column in SCHEMA[table]["columns"]}
+        stored.update(copy.deepcopy(row))
+        stored["id"] = row.get("id") or self._ids[table]
+        self.tables[table].append(stored)
+        return stored
+
+    def _find(self, table: str, keys: Tuple[str, ...], row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # NULLを含むキーは一意制約の対象外（PostgreSQLと同じ）
+        if any(row.get(key) is None for key in keys):
+            return None
+        return next(
+            (current for current in self.tables[table] if all(current.get(key) == row.get(key) for key in keys)),
+            None
+        )
+
+    def _check_unique(self, table: str, row: Dict[str, Any]):
+        for keys in SCHEMA[table]["unique"]:
+            if self._find(table, keys, row) is not None:
+                raise IntegrityError(f"一意制約違反: {table}({', '.join(keys)})")
+
+def _copy_row(table: str, row: Dict[str, Any], columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """返却用のコピー（呼び出し側の変更が保存済みの行に影響しないよう、JSON列の値は複製）"""
+    copied = dict(row) if columns is None else {column: row[column] for column in columns}
+    for column in JSON_COLUMNS[table]:
+        if isinstance(copied.get(column), (dict, list)):
+            copied[column] = copy.deepcopy(copied[column])
+    return copied
+
+def _compare(operator: str, actual: Any, expected: Any) -> bool:
+    if operator == "eq":
+        return actual == expected
+    if operator == "neq":
+        return actual != expected
+    if operator == "in":
+        return actual in expected
+    if operator == "is":
+        return actual is expected if expected is None else bool(actual) == expected
+    if actual is None or expected is None:
+        return False
+    if operator == "gt":
+        return actual > expected
+    if operator == "gte":
+        return actual >= expected
+    if operator == "lt":
+        return actual < expected
+    return actual <= expected
+
+class SQLiteBackend(DataBackend):
+    """SQLite（WALモード・スレッドごとの接続・プリペアドステートメントのキャッシュ）"""
+
+    name = "sqlite"
+
+    SQL_TYPES = {"INTEGER": "INTEGER", "TEXT": "TEXT", "REAL": "REAL", "BOOLEAN": "INTEGER", "JSON": "TEXT", "TIMESTAMP": "TEXT"}
+    OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+    def __init__(self, path: str = SQLITE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # インメモリDBはスレッド間で共有できないため1接続をロックして使う
+        self._shared = path == ":memory:"
+        self._shared_lock = threading.RLock()
+        if not self._shared and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._shared and self._connections:
+            return self._connections[0]
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # 同じSQL文はcached_statementsの範囲でプリペアド済みの文を再利用する
+            connection = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=SQLITE_CACHED_STATEMENTS
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+            if not self._shared:
+                connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA temp_store = MEMORY")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextlib.contextmanager
+    def _session(self, write: bool = False):
+        """接続を取得（書き込み時はトランザクション内で実行）"""
+        if self._shared:
+            self._shared_lock.acquire()
+        try:
+            connection = self._connection()
+            if not write:
+                yield connection
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            if self._shared:
+                self._shared_lock.release()
+
+    def _create_schema(self):
+        with self._session(write=True) as connection:
+            for table, definition in SCHEMA.items():
+                columns = [
+                    '"id" INTEGER PRIMARY KEY AUTOINCREMENT' if column == "id" else f"{_quote(column)} {self.SQL_TYPES[kind]}"
+                    for column, kind in definition["columns"].items()
+                ]
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(columns)})")
+                for keys in definition["unique"]:
+                    connection.execute(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(f'uq_{table}_' + '_'.join(keys))} "
+                        f"ON {_quote(table)} ({_column_list(keys)})"
+                    )
+                for keys in definition["indexes"]:
+                    connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_' + '_'.join(keys))} "
+                        f"ON {_quote(table)} ({_column_list(keys)})"
+                    )
+
+    # 値の変換
+    def _encode(self, table: str, column: str, value: Any) -> Any:
+        value = normalize_value(value)
+        if value is None:
+            return None
+        kind = SCHEMA[table]["columns"][column]
+        if kind == "JSON":
+            return json.dumps(value, ensure_ascii=False)
+        if kind == "BOOLEAN":
+            return int(bool(value))
+        return value
+
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        columns = SCHEMA[table]["columns"]
+        decoded = {}
+        for column in row.keys():
+            value = row[column]
+            if value is not None and columns[column] == "JSON":
+                value = json.loads(value)
+            elif value is not None and columns[column] == "BOOLEAN":
+                value = bool(value)
+            decoded[column] = value
+        return decoded
+
+    # SQLの組み立て（埋め込む列名はスキーマで検証済みのもののみ）
+    def _where(self, query: TableQuery) -> Tuple[str, List[Any]]:
+        _check_columns(query.table, [column for _, column, _, _ in query.filters])
+        clauses, params = [], []
+        for operator, column, value, negate in query.filters:
+            if operator == "in":
+                if value:
+                    clause = f"{_quote(column)} IN ({', '.join('?' * len(value))})"
+                    params.extend(self._encode(query.table, column, item) for item in value)
+                else:
+                    clause = "0"
+            elif operator == "is":
+                clause = f"{_quote(column)} IS NULL" if value is None else f"{_quote(column)} IS {int(value)}"
+            else:
+                clause = f"{_quote(column)} {self.OPERATORS[operator]} ?"
+                params.append(self._encode(query.table, column, value))
+            clauses.append(f"NOT ({clause})" if negate else clause)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def execute(self, query: TableQuery) -> QueryResult:
+        return getattr(self, f"_{query.operation}")(query)
+
+    def _select(self, query: TableQuery) -> QueryResult:
+        columns = query.selected_columns()
+        where, params = self._where(query)
+        with self._session() as connection:
+            count = None
+            if query.count_method:
+                count = connection.execute(f"SELECT COUNT(*) FROM {_quote(query.table)}{where}", params).fetchone()[0]
+            if query.head:
+                return QueryResult([], count)
+
+            sql = f"SELECT {_column_list(columns)} FROM {_quote(query.table)}{where}"
+            if query.orders:
+                _check_columns(query.table, [column for column, _ in query.orders])
+                # PostgreSQLと同様にNULLは昇順で末尾、降順で先頭
+                sql += " ORDER BY " + ", ".join(
+                    f"{_quote(column)} DESC NULLS FIRST" if desc else f"{_quote(column)} ASC NULLS LAST"
+                    for column, desc in query.orders
+                )
+            if query.limit_count is not None or query.offset:
+                sql += " LIMIT ? OFFSET ?"
+                params = params + [query.limit_count if query.limit_count is not None else -1, query.offset]
+            rows = connection.execute(sql, params).fetchall()
+        return QueryResult([self._decode(query.table, row) for row in rows], count)
+
+    def _insert(self, query: TableQuery) -> QueryResult:
+        return self._write_rows(query, ())
+
+    def _upsert(self, query: TableQuery) -> QueryResult:
+        return self._write_rows(query, query.conflict_columns())
+
+    def _write_rows(self, query: TableQuery, conflict_keys: Tuple[str, ...]) -> QueryResult:
+        result = []
+        with self._session(write=True) as connection:
+            for row in query.rows():
+                columns = list(row)
+                sql = f"INSERT INTO {_quote(query.table)} ({_column_list(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                if conflict_keys:
+                    updates = [column for column in columns if column not in conflict_keys and column != "id"]
+                    if query.ignore_duplicates or not updates:
+                        sql += f" ON CONFLICT ({_column_list(conflict_keys)}) DO NOTHING"
+                    else:
+                        sql += f" ON CONFLICT ({_column_list(conflict_keys)}) DO UPDATE SET " + ", ".join(
+                            f"{_quote(column)} = excluded.{_quote(column)}" for column in updates
+                        )
+                params = [self._encode(query.table, column, row[column]) for column in columns]
+                rows = connection.execute(sql + " RETURNING *", params).fetchall()
+                result.extend(self._decode(query.table, item) for item in rows)
+        return QueryResult(result)
+
+    def _update(self, query: TableQuery) -> QueryResult:
+        _check_columns(query.table, query.payload)
+        where, params = self._where(query)
+        columns = list(query.payload)
+        values = [self._encode(query.table, column, query.payload[column]) for column in columns]
+        assignments = ", ".join(f"{_quote(column)} = ?" for column in columns)
+        with self._session(write=True) as connection:
+            rows = connection.execute(f"UPDATE {_quote(query.table)} SET {assignments}{where} RETURNING *", values + params).fetchall()
+        return QueryResult([self._decode(query.table, row) for row in rows])
+
+    def _delete(self, query: TableQuery) -> QueryResult:
+        where, params = self._where(query)
+        with self._session(write=True) as connection:
+            rows = connection.execute(f"DELETE FROM {_quote(query.table)}{where} RETURNING *", params).fetchall()
+        return QueryResult([self._decode(query.table, row) for row in rows])
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+def _quote(identifier: str) -> str:
+    return f'"{identifier}"'
+
+def _column_list(columns) -> str:
+    return ", ".join(_quote(column) for column in columns)
+
+def create_data_backend(name: str = DB_BACKEND) -> DataBackend:
+    """設定に応じたデータバックエンドを作成"""
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    if name != "supabase":
+        raise ValueError(f"不明なDB_BACKEND: {name}")
+    return SupabaseBackend()
+
+_data_backend: Optional[DataBackend] = None
+_backend_lock = threading.Lock()
+
+def get_data_backend() -> DataBackend:
+    """現在のデータバックエンド（最初の使用時に作成）"""
+    global _data_backend
+    if _data_backend is None:
+        with _backend_lock:
+            if _data_backend is None:
+                _data_backend = create_data_backend()
+    return _data_backend
+
+def set_data_backend(backend: DataBackend):
+    """データバックエンドを差し替え（ベンチマーク・オフライン実行用）"""
+    global _data_backend
+    with _backend_lock:
+        _data_backend = backend
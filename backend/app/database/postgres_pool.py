@@ -0,0 +1,199 @@
+"""
+PostgreSQL直接接続（ホットパス）
+頻繁に実行するクエリ（ユーザー取得・使用回数・直近の記録）をPostgREST経由ではなくasyncpgの接続プールで実行する
+POSTGRES_DSNが設定され、asyncpgがインストールされている場合のみ有効
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+try:
+    import asyncpg
+except ImportError:  # asyncpgが無い環境では常にPostgREST経由
+    asyncpg = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+# 接続プール設定
+POSTGRES_DSN = os.getenv("POSTGRES_DSN")
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2"))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10"))
+POSTGRES_STATEMENT_CACHE_SIZE = int(os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "100"))  # PgBouncer（トランザクションモード）経由の場合は0
+POSTGRES_COMMAND_TIMEOUT = float(os.getenv("POSTGRES_COMMAND_TIMEOUT", "5"))
+POSTGRES_ACQUIRE_TIMEOUT = float(os.getenv("POSTGRES_ACQUIRE_TIMEOUT", "2"))
+POSTGRES_MAX_INACTIVE_LIFETIME = float(os.getenv("POSTGRES_MAX_INACTIVE_LIFETIME", "300"))
+POSTGRES_RETRY_COOLDOWN = float(os.getenv("POSTGRES_RETRY_COOLDOWN", "30"))  # プール作成に失敗した後、再試行までPostgREST経由にする秒数
+
+# ホットパスのクエリ（asyncpgがプリペアドステートメントとして接続ごとにキャッシュ）
+SQL_USER_BY_ID = "SELECT * FROM users WHERE id = $1"
+SQL_USAGE_COUNT = "SELECT * FROM usage_counts WHERE user_id = $1 AND feature_type = $2"
+SQL_INCREMENT_USAGE = """
+    INSERT INTO usage_counts (user_id, feature_type, usage_count)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (user_id, feature_type)
+    DO UPDATE SET usage_count = usage_counts.usage_count + EXCLUDED.usage_count, last_used = now()
+    RETURNING *
+"""
+SQL_RECENT_JOURNALS = """
+    SELECT id, user_id, content, created_at, emotion, sentiment_score, crisis_detected
+    FROM journals WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2
+"""
+SQL_RECENT_MOODS = "SELECT * FROM moods WHERE user_id = $1 ORDER BY recorded_at DESC LIMIT $2"
+
+def _to_json_value(value: Any) -> Any:
+    """PostgRESTのJSONレスポンスと同じ形式に変換"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _record_to_dict(record) -> Dict[str, Any]:
+    return {key: _to_json_value(value) for key, value in record.items()}
+
+async def _init_connection(connection):
+    # json/jsonb列をPythonのdict・listとして扱う
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+class PostgresHotPath:
+    """asyncpgの接続プール（専用スレッドのイベントループ上で動作し、同期コードから呼び出す）"""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = POSTGRES_DSN,
+        min_size: int = POSTGRES_POOL_MIN_SIZE,
+        max_size: int = POSTGRES_POOL_MAX_SIZE
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        # ベンチマークなどで一時的にPostgREST経由に戻す場合はFalse
+        self.active = True
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """直接接続を使用するか（Supabaseバックエンドの場合のみ、プール作成の失敗後は一定時間無効）"""
+        if not (self.active and self.dsn and asyncpg is not None):
+            return False
+        if self._pool is None and time.monotonic() < self._retry_at:
+            return False
+        from app.database.backends import get_data_backend
+        return get_data_backend().name == "supabase"
+
+    def _ensure_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                return
+            if time.monotonic() < self._retry_at:
+                # 他のスレッドが作成に失敗した直後は待たずにPostgREST経由に戻す
+                raise ConnectionError("PostgreSQL接続プールの作成を待機中です")
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="postgres-pool", daemon=True).start()
+            try:
+                self._pool = asyncio.run_coroutine_threadsafe(asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=POSTGRES_STATEMENT_CACHE_SIZE,
+                    command_timeout=POSTGRES_COMMAND_TIMEOUT,
+                    max_inactive_connection_lifetime=POSTGRES_MAX_INACTIVE_LIFETIME,
+                    init=_init_connection
+                ), self._loop).result(timeout=POSTGRES_ACQUIRE_TIMEOUT + POSTGRES_COMMAND_TIMEOUT)
+            except Exception as e:
+                self._retry_at = time.monotonic() + POSTGRES_RETRY_COOLDOWN
+                logger.warning(f"PostgreSQL接続プールの作成に失敗しました（{POSTGRES_RETRY_COOLDOWN:.0f}秒間PostgREST経由で実行します）: {e}")
+                raise
+            logger.info(f"PostgreSQL接続プールを作成しました (min={self.min_size}, max={self.max_size})")
+
+    def _run(self, operation: Callable[[Any], Any]) -> Any:
+        """接続を1つ取得してoperation(connection)を実行し、結果を待つ"""
+        self._ensure_pool()
+
+        async def run():
+            async with self._pool.acquire(timeout=POSTGRES_ACQUIRE_TIMEOUT) as connection:
+                return await operation(connection)
+
+        future = asyncio.run_coroutine_threadsafe(run(), self._loop)
+        try:
+            return future.result(timeout=POSTGRES_ACQUIRE_TIMEOUT + POSTGRES_COMMAND_TIMEOUT)
+        except BaseException:
+            future.cancel()
+            raise
+
+    # ホットパスのクエリ
+    def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        record = self._run(lambda connection: connection.fetchrow(SQL_USER_BY_ID, user_id))
+        if record is None:
+            return None
+        user = _record_to_dict(record)
+        user.pop("password", None)
+        return user
+
+    def get_usage_count(self, user_id: int, feature: str) -> Optional[Dict[str, Any]]:
+        record = self._run(lambda connection: connection.fetchrow(SQL_USAGE_COUNT, user_id, feature))
+        return _record_to_dict(record) if record else None
+
+    def increment_usage(self, user_id: int, feature: str, count: int = 1) -> Optional[Dict[str, Any]]:
+        """使用回数を1文で加算（存在しない場合は作成）"""
+        record = self._run(lambda connection: connection.fetchrow(SQL_INCREMENT_USAGE, user_id, feature, count))
+        return _record_to_dict(record) if record else None
+
+    def get_recent_journals(self, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        records = self._run(lambda connection: connection.fetch(SQL_RECENT_JOURNALS, user_id, limit))
+        return [_record_to_dict(record) for record in records]
+
+    def get_recent_moods(self, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        records = self._run(lambda connection: connection.fetch(SQL_RECENT_MOODS, user_id, limit))
+        return [_record_to_dict(record) for record in records]
+
+    def stats(self) -> Dict[str, Any]:
+        """接続プールの状態"""
+        if self._pool is None:
+            return {
+                "enabled": self.enabled,
+                "size": 0,
+                "idle": 0,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "retry_in": round(max(0.0, self._retry_at - time.monotonic()), 1)
+            }
+        return {
+            "enabled": self.enabled,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "min_size": self.min_size,
+            "max_size": self.max_size
+        }
+
+    def close(self):
+        """接続プールを閉じる"""
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._pool is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._pool.close(), self._loop).result(timeout=POSTGRES_COMMAND_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f"PostgreSQL接続プールの終了エラー: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._pool = None
+            self._loop = None
+
+# グローバル接続プールインスタンス
+postgres_hot_path = PostgresHotPath()
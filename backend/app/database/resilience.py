@@ -0,0 +1,349 @@
+"""
+データ層の障害対策（サーキットブレーカー・バルクヘッド・縮退運転）
+データベースが遅延・停止した場合に呼び出しを早めに打ち切り、機能ごとの同時実行数を制限して
+ワーカーが待ち続けるのを防ぐ。読み取りは最後に成功した結果、使用回数の加算はキューで代替する。
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from app.utils.error_handler import ServiceUnavailableError
+from app.utils.logger import logger
+
+# 環境変数を読み込み
+load_dotenv()
+
+# サーキットブレーカー設定
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5"))
+DB_BREAKER_RESET_TIMEOUT = float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "30"))
+DB_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("DB_BREAKER_SLOW_CALL_SECONDS", "5"))
+
+# バルクヘッド設定（機能ごとの同時実行数、例: DB_BULKHEAD_SIZES=journals=12,usage=6）
+DB_BULKHEAD_SIZE = int(os.getenv("DB_BULKHEAD_SIZE", "10"))
+DB_BULKHEAD_SIZES = os.getenv("DB_BULKHEAD_SIZES", "")
+DB_BULKHEAD_TIMEOUT = float(os.getenv("DB_BULKHEAD_TIMEOUT", "0.5"))
+
+# 縮退運転設定
+DB_FALLBACK_CACHE_SIZE = int(os.getenv("DB_FALLBACK_CACHE_SIZE", "2000"))
+DB_USAGE_QUEUE_MAX = int(os.getenv("DB_USAGE_QUEUE_MAX", "10000"))
+DB_USAGE_REPLAY_INTERVAL = float(os.getenv("DB_USAGE_REPLAY_INTERVAL", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+def is_outage(error: Exception) -> bool:
+    """障害として数える例外か（一意制約違反・入力不正などデータベースが応答したエラーは数えない）"""
+    if type(error).__name__ == "IntegrityError":
+        return False
+    # PostgRESTのエラーはcode、asyncpgのエラーはsqlstateにSQLSTATEを持つ
+    code = str(getattr(error, "code", "") or getattr(error, "sqlstate", "") or "")
+    return not (code[:2] in ("22", "23", "42") or code.startswith("PGRST"))
+
+class CircuitBreaker:
+    """連続した障害で呼び出しを遮断し、一定時間後に1件だけ試行して復旧を確認する"""
+
+    def __init__(
+        self,
+        failure_threshold: int = DB_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = DB_BREAKER_RESET_TIMEOUT,
+        slow_call_seconds: float = DB_BREAKER_SLOW_CALL_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """呼び出し前の確認（遮断中はServiceUnavailableError）"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise ServiceUnavailableError(
+            "データベースが一時的に利用できません",
+            {"reason": "circuit_open", "retry_after": self.reset_timeout}
+        )
+
+    def abandon(self):
+        """実行しなかった試行呼び出しを取り消す"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, error: Optional[Exception], elapsed: float):
+        """呼び出し結果を記録（遅すぎる呼び出しも障害として数える）"""
+        failed = (error is not None and is_outage(error)) or elapsed >= self.slow_call_seconds
+        with self._lock:
+            self._probing = False
+            if not failed:
+                if self.state != CLOSED:
+                    logger.info("データベースの復旧を確認しました（サーキットブレーカーを閉じます）")
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"データベース障害を検知しました（サーキットブレーカーを開きます）: 連続{self.failures}件")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+def _parse_sizes(value: str) -> Dict[str, int]:
+    sizes = {}
+    for item in value.split(","):
+        if "=" in item:
+            feature, size = item.split("=", 1)
+            sizes[feature.strip()] = int(size)
+    return sizes
+
+class Bulkheads:
+    """機能ごとの同時実行数の上限（1つの機能の遅延で全ワーカーが埋まるのを防ぐ）"""
+
+    def __init__(self, default_size: int = DB_BULKHEAD_SIZE, sizes: str = DB_BULKHEAD_SIZES, timeout: float = DB_BULKHEAD_TIMEOUT):
+        self.default_size = default_size
+        self.sizes = _parse_sizes(sizes)
+        self.timeout = timeout
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_use: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, feature: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(feature)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.sizes.get(feature, self.default_size))
+                self._semaphores[feature] = semaphore
+                self._in_use[feature] = 0
+                self._rejected[feature] = 0
+            return semaphore
+
+    def acquire(self, feature: str):
+        """枠を1つ確保（timeout秒以内に空かなければServiceUnavailableError）"""
+        if not self._semaphore(feature).acquire(timeout=self.timeout):
+            with self._lock:
+                self._rejected[feature] += 1
+            raise ServiceUnavailableError(
+                "データベースが混雑しています",
+                {"reason": "bulkhead_full", "feature": feature}
+            )
+        with self._lock:
+            self._in_use[feature] += 1
+
+    def release(self, feature: str):
+        with self._lock:
+            self._in_use[feature] -= 1
+        self._semaphores[feature].release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                feature: {
+                    "in_use": self._in_use[feature],
+                    "size": self.sizes.get(feature, self.default_size),
+                    "rejected": self._rejected[feature]
+                }
+                for feature in self._semaphores
+            }
+
+class LastKnownResults:
+    """読み取りの最後に成功した結果（障害時の代替、件数上限付きLRU）"""
+
+    def __init__(self, max_size: int = DB_FALLBACK_CACHE_SIZE):
+        self.max_size = max_size
+        self.served = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        # 呼び出し側で行（dict）を書き換えても保存した結果に影響しないようにする
+        if isinstance(value, list):
+            return [dict(row) if isinstance(row, dict) else row for row in value]
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+
+    def store(self, key: Tuple, value: Any):
+        value = self._copy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self.served += 1
+            value = self._entries[key]
+        return True, self._copy(value)
+
+class UsageIncrementQueue:
+    """実行できなかった使用回数の加算（ユーザー・機能ごとに合算し、復旧後にまとめて反映）"""
+
+    def __init__(self, max_pending: int = DB_USAGE_QUEUE_MAX):
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, user_id: int, feature: str, count: int = 1) -> None:
+        key = (user_id, feature)
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                logger.error(f"使用回数の保留キューが上限に達したため破棄しました: ユーザーID {user_id}, {feature}")
+                return None
+            self._pending[key] = self._pending.get(key, 0) + count
+        logger.warning(f"使用回数の加算を保留しました: ユーザーID {user_id}, {feature} (+{count})")
+        return None
+
+    def pending_count(self, user_id: int, feature: str) -> int:
+        """保留中の加算数（制限判定で使用回数に含める）"""
+        with self._lock:
+            return self._pending.get((user_id, feature), 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def replay(self, increment: Callable[[int, str, int], Any]) -> int:
+        """保留中の加算を反映（失敗した場合は残りを戻して中断）"""
+        with self._lock:
+            pending = list(self._pending.items())
+            self._pending.clear()
+
+        replayed = 0
+        for index, ((user_id, feature), count) in enumerate(pending):
+            try:
+                increment(user_id, feature, count)
+            except Exception as e:
+                logger.warning(f"保留中の使用回数の反映に失敗しました: {e}")
+                for (retry_user_id, retry_feature), retry_count in pending[index:]:
+                    self.enqueue(retry_user_id, retry_feature, retry_count)
+                break
+            replayed += 1
+        if replayed:
+            logger.info(f"保留中の使用回数を反映しました: {replayed}件")
+        return replayed
+
+# グローバルサーキットブレーカー・バルクヘッドインスタンス
+db_circuit_breaker = CircuitBreaker()
+db_bulkheads = Bulkheads()
+last_known_results = LastKnownResults()
+usage_increment_queue = UsageIncrementQueue()
+
+_local = threading.local()
+
+def guarded(feature: str, remember: bool = False, fallback: Optional[Callable] = None) -> Callable:
+    """データベース呼び出しをサーキットブレーカーとfeatureのバルクヘッドで保護するデコレータ
+    remember=Trueは最後に成功した結果、fallbackは遮断された呼び出しと障害で失敗した呼び出しの代替
+    """
+    def decorator(func: Callable) -> Callable:
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "active", False):
+                # 保護済みの呼び出しからの入れ子呼び出しはそのまま実行
+                return func(*args, **kwargs)
+
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                db_circuit_breaker.before_call()
+                try:
+                    db_bulkheads.acquire(feature)
+                except ServiceUnavailableError:
+                    db_circuit_breaker.abandon()
+                    raise
+            except ServiceUnavailableError:
+                if remember:
+                    found, value = last_known_results.get(key)
+                    if found:
+                        return value
+                if fallback is not None:
+                    return fallback(*args, **kwargs)
+                raise
+
+            _local.active = True
+            start = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                db_circuit_breaker.record(e, time.monotonic() - start)
+                if is_outage(e):
+                    if remember:
+                        found, value = last_known_results.get(key)
+                        if found:
+                            logger.warning(f"データベースエラーのため前回の結果を返します: {name} ({e})")
+                            return value
+                    if fallback is not None:
+                        logger.warning(f"データベースエラーのため代替処理を実行します: {name} ({e})")
+                        return fallback(*args, **kwargs)
+                raise
+            finally:
+                _local.active = False
+                db_bulkheads.release(feature)
+
+            db_circuit_breaker.record(None, time.monotonic() - start)
+            if remember and result is not None:
+                last_known_results.store(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+def raise_if_unavailable(error: Exception):
+    """遮断や障害による例外をServiceUnavailableError（503）として送出（それ以外は何もしない）"""
+    if isinstance(error, ServiceUnavailableError):
+        raise error
+    if is_outage(error):
+        raise ServiceUnavailableError(
+            "データベースが一時的に利用できません",
+            {"reason": "database_error"}
+        ) from error
+
+def resilience_stats() -> Dict[str, Any]:
+    """サーキットブレーカー・バルクヘッド・縮退運転の状態"""
+    return {
+        "circuit_breaker": db_circuit_breaker.stats(),
+        "bulkheads": db_bulkheads.stats(),
+        "fallback_reads": last_known_results.served,
+        "pending_usage_increments": len(usage_increment_queue)
+    }
+
+async def run_usage_replayer(increment: Callable[[int, str, int], Any], interval: float = DB_USAGE_REPLAY_INTERVAL):
+    """保留中の使用回数を定期的に反映（サーキットブレーカーが開いている間は待機）"""
+    while True:
+        await asyncio.sleep(interval)
+        if len(usage_increment_queue) and not db_circuit_breaker.is_open:
+            try:
+                await asyncio.to_thread(usage_increment_queue.replay, increment)
+            except Exception as e:
+                logger.error("保留中の使用回数の反映エラー", e)
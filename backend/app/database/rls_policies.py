@@ -1,12 +1,14 @@
 from typing import Dict, List, Any
-from app.config.supabase import supabase
 from ..utils.logger import logger
 
 class RLSPolicyManager:
     """Supabase RLSポリシー管理クラス"""
     
-    def __init__(self):
-        self.supabase = supabase
+    @property
+    def supabase(self):
+        """Supabaseクライアント（使用時に初期化）"""
+        from app.config.supabase import supabase
+        return supabase
     
     def setup_all_policies(self):
         """すべてのRLSポリシーを設定"""
@@ -1,5 +1,4 @@
 from typing import List, Dict, Any, Optional
-from app.config.supabase import supabase, supabase_admin
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.journal import JournalCreate, JournalResponse
 from app.schemas.mood import MoodCreate, MoodResponse
@@ -9,15 +8,47 @@ import logging
 from datetime import datetime
 import bcrypt
 from app.utils.logger import logger
+from app.utils.journal_search import journal_search_index
+from app.utils.journal_emotion import with_emotion_tags
+from app.utils.journal_dedup import journal_dedup_index
+from app.utils.cbt_transcripts import format_transcript, dominant_emotion
+from app.utils.concurrency import gather_calls
+from app.utils.request_cache import request_cached, invalidates_request_cache
+from app.database.backends import get_data_backend
+from app.database.postgres_pool import postgres_hot_path
+from app.database.resilience import guarded, db_circuit_breaker, raise_if_unavailable, usage_increment_queue
+from app.utils.error_handler import ServiceUnavailableError
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
+def _table(name: str):
+    """設定されたデータバックエンド（DB_BACKEND）でテーブル操作を開始"""
+    return get_data_backend().table(name)
+
+_FALLBACK = object()
+
+def _hot_path_read(read):
+    """直接接続（POSTGRES_DSN）で読み取り、無効または失敗した場合は_FALLBACKを返す（PostgRESTで再実行）"""
+    if not postgres_hot_path.enabled:
+        return _FALLBACK
+    start = time.monotonic()
+    try:
+        return read()
+    except Exception as e:
+        # 直接接続の障害もサーキットブレーカーに数える（PostgRESTで成功すればそこで回復扱い）
+        db_circuit_breaker.record(e, time.monotonic() - start)
+        logger.warning(f"PostgreSQL直接接続の読み取りに失敗したためPostgRESTで実行します: {e}")
+        return _FALLBACK
+
 class SupabaseDB:
-    """Supabaseデータベース操作クラス"""
+    """データベース操作クラス（接続先はDB_BACKENDで選択、既定はSupabase。各操作はguardedで障害時に遮断・縮退）"""
     
     # ユーザー関連
     @staticmethod
+    @invalidates_request_cache
+    @guarded("users")
     def create_user(user_data) -> Dict[str, Any]:
         """ユーザーを作成"""
         try:
@@ -46,7 +77,7 @@ class SupabaseDB:
             
             # service_roleキーを使用してRLSをバイパス
             logger.info("Supabaseテーブルに挿入中（service_role使用）...")
-            response = supabase_admin.table('users').insert(insert_data).execute()
+            response = _table('users').insert(insert_data).execute()
             
             logger.info(f"Supabaseレスポンス: {response}")
             print(f"DEBUG: Supabaseレスポンス - {response}")
@@ -72,10 +103,11 @@ class SupabaseDB:
             raise
     
     @staticmethod
+    @guarded("users")
     def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         """メールアドレスでユーザーを取得"""
         try:
-            response = supabase_admin.table('users').select('*').eq('email', email).execute()
+            response = _table('users').select('*').eq('email', email).execute()
                 
             if response.data:
                 user = response.data[0]
@@ -87,13 +119,18 @@ class SupabaseDB:
                 
         except Exception as e:
             logger.error(f"ユーザー取得エラー: {e}")
-            return None
+            raise
 
     @staticmethod
+    @request_cached
+    @guarded("users", remember=True)
     def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
         """IDでユーザーを取得"""
         try:
-            response = supabase_admin.table('users').select('*').eq('id', user_id).execute()
+            user = _hot_path_read(lambda: postgres_hot_path.get_user_by_id(user_id))
+            if user is not _FALLBACK:
+                return user
+            response = _table('users').select('*').eq('id', user_id).execute()
                 
             if response.data:
                 user = response.data[0]
@@ -107,7 +144,7 @@ class SupabaseDB:
                 
         except Exception as e:
             logger.error(f"ユーザー取得エラー: {e}")
-            return None
+            raise
 
     @staticmethod
     def authenticate_user(email: str, password: str) -> Optional[Dict[str, Any]]:
@@ -116,8 +153,12 @@ class SupabaseDB:
             logger.info(f"認証開始: {email}")
             print(f"DEBUG: 認証開始 - email: {email}")
             
-            # メールアドレスでユーザーを検索
-            user = SupabaseDB.get_user_by_email(email)
+            # メールアドレスでユーザーを検索（障害時は認証失敗ではなく503で応答）
+            try:
+                user = SupabaseDB.get_user_by_email(email)
+            except Exception as e:
+                raise_if_unavailable(e)
+                raise
             print(f"DEBUG: ユーザー検索結果 - user exists: {user is not None}")
             
             if not user:
@@ -154,6 +195,8 @@ class SupabaseDB:
                 print(f"DEBUG: パスワード検証エラー: {e}")
                 return None
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"認証エラー: {e}")
             print(f"DEBUG: 認証エラー: {e}")
@@ -161,33 +204,210 @@ class SupabaseDB:
     
     # ジャーナル関連
     @staticmethod
-    def create_journal(user_id: int, journal_data: JournalCreate) -> Dict[str, Any]:
-        """ジャーナルを作成"""
-        try:
-            response = supabase_admin.table('journals').insert({
+    @guarded("journals")
+    def create_journal(user_id: int, journal_data: JournalCreate, emotion: Optional[str] = None) -> Dict[str, Any]:
+        """ジャーナルを作成（感情タグは保存時に算出、直近の重複は既存のジャーナルを返す）"""
+        def insert() -> Optional[Dict[str, Any]]:
+            response = _table('journals').insert(with_emotion_tags({
                 'user_id': user_id,
                 'content': journal_data.content
-            }).execute()
-            return response.data[0] if response.data else None
+            }, emotion)).execute()
+            journal = response.data[0] if response.data else None
+            if journal:
+                SupabaseDB._index_journals([journal])
+            return journal
+        
+        try:
+            return journal_dedup_index.create(user_id, journal_data.content, insert)
         except Exception as e:
             logger.error(f"ジャーナル作成エラー: {e}")
             raise
     
     @staticmethod
+    @guarded("journals")
     def get_user_journals(user_id: int) -> List[Dict[str, Any]]:
         """ユーザーのジャーナル一覧を取得"""
         try:
-            response = supabase_admin.table('journals').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+            response = _table('journals').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
             return response.data
         except Exception as e:
             logger.error(f"ジャーナル取得エラー: {e}")
             raise
     
     @staticmethod
+    @guarded("journals", remember=True)
+    def get_recent_journals(user_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """直近のジャーナルを取得"""
+        try:
+            journals = _hot_path_read(lambda: postgres_hot_path.get_recent_journals(user_id, limit))
+            if journals is not _FALLBACK:
+                return journals
+            response = _table('journals').select(
+                'id, user_id, content, created_at, emotion, sentiment_score, crisis_detected'
+            ).eq('user_id', user_id).order('created_at', desc=True).limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"ジャーナル取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("stats")
+    def count_user_rows(table: str, user_id: int) -> int:
+        """ユーザーの行数を取得（行データは取得しない）"""
+        try:
+            response = _table(table).select('id', count='exact', head=True).eq('user_id', user_id).execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"件数取得エラー: {table} {e}")
+            raise
+    
+    @staticmethod
+    def _index_journals(journals: List[Dict[str, Any]]):
+        """作成したジャーナルを検索インデックスに反映（失敗しても書き込みは成功扱い）"""
+        try:
+            journal_search_index.add(journals)
+        except Exception as e:
+            logger.warning(f"ジャーナル検索インデックス更新エラー: {e}")
+    
+    @staticmethod
+    @guarded("journals")
+    def create_journals(user_id: int, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ジャーナルを一括作成（1回のリクエストで複数行を挿入）"""
+        try:
+            rows = [with_emotion_tags({'user_id': user_id, **entry}) for entry in entries]
+            # 一括挿入で省略した列（created_atなど）はNULLではなく列の既定値を使う
+            response = _table('journals').insert(rows, default_to_null=False).execute()
+            SupabaseDB._index_journals(response.data or [])
+            return response.data or []
+        except Exception as e:
+            logger.error(f"ジャーナル一括作成エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def get_user_journals_page(user_id: int, after_id: Optional[int] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """ユーザーのジャーナルをID順に1ページ取得（after_idより後）"""
+        try:
+            query = _table('journals').select('*').eq('user_id', user_id)
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            response = query.order('id').limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"ジャーナル取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def get_journal_emotions(
+        user_id: int,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        emotion: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """期間内のジャーナルの感情タグを取得（本文は取得しない）"""
+        try:
+            query = _table('journals').select(
+                'id, emotion, sentiment_score, crisis_detected, created_at'
+            ).eq('user_id', user_id)
+            if emotion:
+                query = query.eq('emotion', emotion)
+            if start:
+                query = query.gte('created_at', start)
+            if end:
+                query = query.lt('created_at', end)
+            response = query.order('created_at').execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"ジャーナル感情取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def get_untagged_journals_page(after_id: Optional[int] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """感情タグ未設定のジャーナルをID順に1ページ取得"""
+        try:
+            query = _table('journals').select('id, content').is_('emotion', 'null')
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            response = query.order('id').limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"ジャーナル取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def update_journal_emotion(journal_id: int, tags: Dict[str, Any]) -> bool:
+        """ジャーナルの感情タグを更新"""
+        try:
+            response = _table('journals').update(tags).eq('id', journal_id).execute()
+            return len(response.data) > 0
+        except Exception as e:
+            logger.error(f"ジャーナル感情更新エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def create_cbt_transcript(user_id: int, session_id: str, turns: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """CBTセッションのトランスクリプトを1件のジャーナルとして保存（セッションIDが無い対話の再送は既存の行を返す）"""
+        content = format_transcript(turns)
+        
+        def insert() -> Optional[Dict[str, Any]]:
+            response = _table('journals').insert(with_emotion_tags({
+                'user_id': user_id,
+                'content': content,
+                'session_id': session_id,
+                'turns': turns
+            }, dominant_emotion(turns))).execute()
+            journal = response.data[0] if response.data else None
+            if journal:
+                SupabaseDB._index_journals([journal])
+            return journal
+        
+        try:
+            if session_id is None:
+                return journal_dedup_index.create(user_id, content, insert)
+            return insert()
+        except Exception as e:
+            logger.error(f"CBTトランスクリプト保存エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
+    def get_cbt_transcripts(
+        user_id: int,
+        session_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """CBTセッションのトランスクリプトを新しい順に取得"""
+        try:
+            query = _table('journals').select(
+                'id, session_id, turns, emotion, created_at'
+            ).eq('user_id', user_id)
+            if session_id:
+                query = query.eq('session_id', session_id)
+            else:
+                query = query.not_.is_('session_id', 'null')
+            response = query.order('created_at', desc=True).range(offset, offset + limit - 1).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"CBTトランスクリプト取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("journals")
     def delete_journal(journal_id: int, user_id: int) -> bool:
         """ジャーナルを削除"""
         try:
-            response = supabase_admin.table('journals').delete().eq('id', journal_id).eq('user_id', user_id).execute()
+            response = _table('journals').delete().eq('id', journal_id).eq('user_id', user_id).execute()
+            if response.data:
+                journal_dedup_index.remove(user_id, journal_id)
+                try:
+                    journal_search_index.remove(journal_id)
+                except Exception as e:
+                    logger.warning(f"ジャーナル検索インデックス削除エラー: {e}")
             return len(response.data) > 0
         except Exception as e:
             logger.error(f"ジャーナル削除エラー: {e}")
@@ -195,10 +415,11 @@ class SupabaseDB:
     
     # 気分記録関連
     @staticmethod
+    @guarded("moods")
     def create_mood(user_id: int, mood_data: MoodCreate) -> Dict[str, Any]:
         """気分記録を作成"""
         try:
-            response = supabase_admin.table('moods').insert({
+            response = _table('moods').insert({
                 'user_id': user_id,
                 'mood': mood_data.mood,
                 'note': mood_data.note
@@ -209,20 +430,78 @@ class SupabaseDB:
             raise
     
     @staticmethod
+    @guarded("moods")
+    def create_moods(user_id: int, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """気分記録を一括作成（同じ重複防止キーの行は挿入しない）"""
+        try:
+            rows = [{'user_id': user_id, **entry} for entry in entries]
+            response = _table('moods').upsert(
+                rows,
+                on_conflict='user_id,idempotency_key',
+                ignore_duplicates=True,
+                # 省略した列（recorded_atなど）はNULLではなく列の既定値を使う
+                default_to_null=False
+            ).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"気分記録一括作成エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("moods")
+    def get_moods_by_idempotency_keys(user_id: int, keys: List[str]) -> List[Dict[str, Any]]:
+        """重複防止キーで記録済みの気分記録を取得"""
+        try:
+            if not keys:
+                return []
+            response = _table('moods').select('*').eq('user_id', user_id).in_('idempotency_key', keys).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"気分記録取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("moods")
     def get_user_moods(user_id: int) -> List[Dict[str, Any]]:
         """ユーザーの気分記録一覧を取得"""
         try:
-            response = supabase_admin.table('moods').select('*').eq('user_id', user_id).order('recorded_at', desc=True).execute()
+            response = _table('moods').select('*').eq('user_id', user_id).order('recorded_at', desc=True).execute()
             return response.data
         except Exception as e:
             logger.error(f"気分記録取得エラー: {e}")
             raise
     
     @staticmethod
+    @guarded("moods", remember=True)
+    def get_recent_moods(user_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """直近の気分記録を取得"""
+        try:
+            moods = _hot_path_read(lambda: postgres_hot_path.get_recent_moods(user_id, limit))
+            if moods is not _FALLBACK:
+                return moods
+            response = _table('moods').select('*').eq('user_id', user_id).order('recorded_at', desc=True).limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"気分記録取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("moods")
+    def get_mood_scores_since(user_id: int, since: str) -> List[Dict[str, Any]]:
+        """指定日時以降の気分スコアを取得（メモは取得しない）"""
+        try:
+            response = _table('moods').select('mood, recorded_at').eq('user_id', user_id).gte('recorded_at', since).order('recorded_at').execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"気分記録取得エラー: {e}")
+            raise
+    
+    @staticmethod
+    @guarded("moods")
     def delete_mood(mood_id: int, user_id: int) -> bool:
         """気分記録を削除"""
         try:
-            response = supabase_admin.table('moods').delete().eq('id', mood_id).eq('user_id', user_id).execute()
+            response = _table('moods').delete().eq('id', mood_id).eq('user_id', user_id).execute()
             deleted_count = len(response.data) if response.data else 0
             logger.info(f"気分記録削除: ID {mood_id}, 削除件数: {deleted_count}")
             return deleted_count > 0
@@ -232,31 +511,42 @@ class SupabaseDB:
     
     # 使用回数関連
     @staticmethod
+    @request_cached
+    @guarded("usage", remember=True)
     def get_usage_count(user_id: int, feature: str) -> Dict[str, Any]:
         """使用回数を取得"""
         try:
-            response = supabase_admin.table('usage_counts').select('*').eq('user_id', user_id).eq('feature_type', feature).execute()
+            usage = _hot_path_read(lambda: postgres_hot_path.get_usage_count(user_id, feature))
+            if usage is not _FALLBACK:
+                return usage
+            response = _table('usage_counts').select('*').eq('user_id', user_id).eq('feature_type', feature).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"使用回数取得エラー: {e}")
             raise
     
     @staticmethod
+    @invalidates_request_cache
+    @guarded("usage", fallback=usage_increment_queue.enqueue)
     def create_or_update_usage(user_id: int, feature: str, count: int = 1) -> Dict[str, Any]:
         """使用回数を作成または更新"""
         try:
+            if postgres_hot_path.enabled:
+                # 直接接続では1文のupsertで加算（二重加算を避けるため失敗時にPostgRESTで再実行しない）
+                return postgres_hot_path.increment_usage(user_id, feature, count)
+            
             # 既存のレコードを確認
             existing = SupabaseDB.get_usage_count(user_id, feature)
             
             if existing:
                 # 更新
-                response = supabase_admin.table('usage_counts').update({
+                response = _table('usage_counts').update({
                     'usage_count': existing['usage_count'] + count,
                     'last_used': 'now()'
                 }).eq('id', existing['id']).execute()
             else:
                 # 新規作成
-                response = supabase_admin.table('usage_counts').insert({
+                response = _table('usage_counts').insert({
                     'user_id': user_id,
                     'feature_type': feature,
                     'usage_count': count
@@ -269,10 +559,11 @@ class SupabaseDB:
     
     # AI分析関連
     @staticmethod
+    @guarded("analyses")
     def create_analysis(user_id: int, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
         """AI分析結果を作成"""
         try:
-            response = supabase_admin.table('analyses').insert({
+            response = _table('analyses').insert({
                 'user_id': user_id,
                 'analysis_type': analysis_data.get('analysis_type', 'general'),
                 'summary': analysis_data.get('summary', ''),
@@ -287,10 +578,11 @@ class SupabaseDB:
             raise
     
     @staticmethod
+    @guarded("analyses")
     def get_user_analyses(user_id: int) -> List[Dict[str, Any]]:
         """ユーザーの分析結果一覧を取得"""
         try:
-            response = supabase_admin.table('analyses').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+            response = _table('analyses').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
             return response.data
         except Exception as e:
             logger.error(f"分析結果取得エラー: {e}")
@@ -300,7 +592,7 @@ class SupabaseDB:
         """テーブル構造を取得"""
         try:
             # テーブルのカラム情報を取得
-            result = supabase_admin.table(table_name).select("*").limit(1).execute()
+            result = _table(table_name).select("*").limit(1).execute()
             
             # テーブル構造を確認
             logger.info(f"テーブル {table_name} の構造確認")
@@ -343,6 +635,7 @@ class SupabaseDB:
         
         return results 
 
+    @guarded("stats")
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
         """ユーザーの統計情報を取得"""
         try:
@@ -357,12 +650,16 @@ class SupabaseDB:
                 'last_activity': None
             }
             
+            # ジャーナルと気分記録を並行して取得
+            journals_result, moods_result = gather_calls(
+                lambda: _table('journals').select('id, content, created_at').eq('user_id', user_id).execute(),
+                lambda: _table('moods').select('id, mood, recorded_at').eq('user_id', user_id).execute()
+            )
+            
             # ジャーナル数
-            journals_result = supabase_admin.table('journals').select('id').eq('user_id', user_id).execute()
             stats['total_journals'] = len(journals_result.data) if journals_result.data else 0
             
             # 気分記録数
-            moods_result = supabase_admin.table('moods').select('id, mood').eq('user_id', user_id).execute()
             if moods_result.data:
                 stats['total_moods'] = len(moods_result.data)
                 # 平均気分スコアを計算
@@ -400,10 +697,12 @@ class SupabaseDB:
             logger.error(f"ユーザー統計取得エラー: {e}")
             raise
     
+    @invalidates_request_cache
+    @guarded("users")
     def update_user(self, user_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """ユーザー情報を更新"""
         try:
-            response = supabase_admin.table('users').update(update_data).eq('id', user_id).execute()
+            response = _table('users').update(update_data).eq('id', user_id).execute()
             if response.data:
                 user = response.data[0]
                 # パスワードをレスポンスから除外
@@ -414,10 +713,12 @@ class SupabaseDB:
             logger.error(f"ユーザー更新エラー: {e}")
             raise
     
+    @invalidates_request_cache
+    @guarded("users")
     def delete_user(self, user_id: int) -> bool:
         """ユーザーを削除"""
         try:
-            response = supabase_admin.table('users').delete().eq('id', user_id).execute()
+            response = _table('users').delete().eq('id', user_id).execute()
             return len(response.data) > 0
         except Exception as e:
             logger.error(f"ユーザー削除エラー: {e}")
@@ -425,10 +726,12 @@ class SupabaseDB:
     
     # プロフィール関連
     @staticmethod
+    @request_cached
+    @guarded("profiles", remember=True)
     def get_user_profile(user_id: int) -> Optional[Dict[str, Any]]:
         """ユーザーのプロフィールを取得"""
         try:
-            response = supabase_admin.table('profiles').select('*').eq('user_id', user_id).execute()
+            response = _table('profiles').select('*').eq('user_id', user_id).execute()
             if response.data:
                 return response.data[0]
             return None
@@ -437,25 +740,29 @@ class SupabaseDB:
             raise
     
     @staticmethod
-    def create_user_profile(user_id: int, profile_data: Dict[str, Any]) -> Dict[str, Any]:
-        """ユーザープロフィールを作成"""
+    @invalidates_request_cache
+    @guarded("profiles")
+    def create_user_profile(user_id: int, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ユーザープロフィールを作成（既に存在する場合はNone、存在確認と作成を1回で行う）"""
         try:
-            response = supabase_admin.table('profiles').insert({
+            response = _table('profiles').upsert({
                 'user_id': user_id,
                 'avatar_url': profile_data.get('avatar_url'),
                 'bio': profile_data.get('bio'),
                 'preferences': profile_data.get('preferences', {})
-            }).execute()
+            }, on_conflict='user_id', ignore_duplicates=True).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"プロフィール作成エラー: {e}")
             raise
     
     @staticmethod
+    @invalidates_request_cache
+    @guarded("profiles")
     def update_user_profile(user_id: int, profile_data: Dict[str, Any]) -> Dict[str, Any]:
         """ユーザープロフィールを更新"""
         try:
-            response = supabase_admin.table('profiles').update(profile_data).eq('user_id', user_id).execute()
+            response = _table('profiles').update(profile_data).eq('user_id', user_id).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"プロフィール更新エラー: {e}")
@@ -463,20 +770,24 @@ class SupabaseDB:
     
     # 機能制限関連
     @staticmethod
+    @request_cached
+    @guarded("feature_limits", remember=True)
     def get_feature_limits() -> List[Dict[str, Any]]:
         """機能制限一覧を取得"""
         try:
-            response = supabase_admin.table('feature_limits').select('*').execute()
+            response = _table('feature_limits').select('*').execute()
             return response.data
         except Exception as e:
             logger.error(f"機能制限取得エラー: {e}")
             raise
     
     @staticmethod
+    @request_cached
+    @guarded("feature_limits", remember=True)
     def get_feature_limit(feature_name: str) -> Optional[Dict[str, Any]]:
         """特定の機能制限を取得"""
         try:
-            response = supabase_admin.table('feature_limits').select('*').eq('feature_name', feature_name).execute()
+            response = _table('feature_limits').select('*').eq('feature_name', feature_name).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"機能制限取得エラー: {e}")
@@ -486,21 +797,22 @@ class SupabaseDB:
     def check_user_feature_access(user_id: int, feature_name: str) -> Dict[str, Any]:
         """ユーザーの機能アクセス権限をチェック"""
         try:
-            # ユーザーのプランタイプを取得
-            user = SupabaseDB.get_user_by_id(user_id)
+            # ユーザー・機能制限・現在の使用回数を並行して取得
+            user, feature_limit, usage = gather_calls(
+                lambda: SupabaseDB.get_user_by_id(user_id),
+                lambda: SupabaseDB.get_feature_limit(feature_name),
+                lambda: SupabaseDB.get_usage_count(user_id, feature_name)
+            )
             if not user:
                 return {"can_access": False, "reason": "User not found"}
             
             plan_type = user.get('plan_type', 'free')
             
-            # 機能制限を取得
-            feature_limit = SupabaseDB.get_feature_limit(feature_name)
             if not feature_limit:
                 return {"can_access": True, "reason": "No limits set"}
             
-            # 現在の使用回数を取得
-            usage = SupabaseDB.get_usage_count(user_id, feature_name)
             current_usage = usage.get('usage_count', 0) if usage else 0
+            current_usage += usage_increment_queue.pending_count(user_id, feature_name)
             
             # プランに応じた制限を取得
             if plan_type == 'premium':
@@ -524,16 +836,19 @@ class SupabaseDB:
     
     # 管理者機能
     @staticmethod
+    @guarded("admin")
     def get_all_users() -> List[Dict[str, Any]]:
         """すべてのユーザーを取得（管理者用）"""
         try:
-            response = supabase_admin.table('users').select('*').execute()
+            response = _table('users').select('*').execute()
             return response.data
         except Exception as e:
             logger.error(f"全ユーザー取得エラー: {e}")
             raise
     
     @staticmethod
+    @invalidates_request_cache
+    @guarded("admin")
     def update_user_role(user_id: int, role: str, updated_by: int, reason: str = "") -> Optional[Dict[str, Any]]:
         """ユーザーのロールを更新（管理者用）"""
         try:
@@ -543,7 +858,7 @@ class SupabaseDB:
                 'updated_at': datetime.now().isoformat()
             }
             
-            response = supabase_admin.table('users').update(update_data).eq('id', user_id).execute()
+            response = _table('users').update(update_data).eq('id', user_id).execute()
             
             if response.data:
                 # ロール変更履歴を記録（オプション）
@@ -556,16 +871,18 @@ class SupabaseDB:
             raise
     
     @staticmethod
+    @guarded("admin")
     def get_user_by_role(role: str) -> List[Dict[str, Any]]:
         """特定のロールを持つユーザーを取得"""
         try:
-            response = supabase_admin.table('users').select('*').eq('role', role).execute()
+            response = _table('users').select('*').eq('role', role).execute()
             return response.data
         except Exception as e:
             logger.error(f"ロール別ユーザー取得エラー: {e}")
             raise
     
     @staticmethod
+    @guarded("admin")
     def get_user_stats_by_role(role: str) -> Dict[str, Any]:
         """特定のロールを持つユーザーの統計を取得"""
         try:
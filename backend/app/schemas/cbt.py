@@ -31,6 +31,15 @@ class CBTSessionResponse(BaseModel):
     welcome_message: str = Field(..., description="歓迎メッセージ")
     timestamp: str = Field(..., description="セッション開始タイムスタンプ")
 
+class CBTSessionEndResponse(BaseModel):
+    """CBTセッション終了レスポンススキーマ"""
+    session_id: str = Field(..., description="セッションID")
+    message: str = Field(..., description="終了メッセージ")
+    summary: str = Field(..., description="セッション要約")
+    turn_count: int = Field(..., description="記録した対話数")
+    journal_id: Optional[int] = Field(None, description="保存したトランスクリプトのジャーナルID")
+    timestamp: str = Field(..., description="セッション終了タイムスタンプ")
+
 class CBTConversationHistory(BaseModel):
     """CBT対話履歴スキーマ"""
     session_id: str = Field(..., description="セッションID")
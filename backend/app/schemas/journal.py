@@ -38,6 +38,9 @@ class JournalResponse(BaseModel):
     user_id: int
     content: str
     created_at: datetime
+    emotion: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    crisis_detected: Optional[bool] = None
     
     class Config:
         from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class MoodCreate(BaseModel):
@@ -56,6 +56,17 @@ class MoodUpdate(BaseModel):
             raise ValueError('メモは1,000文字以下である必要があります')
         return v
 
+class MoodBatchItem(BaseModel):
+    """一括記録の1件分（値の検証はエンドポイントで行い、結果を項目ごとに返す）"""
+    mood: int = Field(..., description="気分スコア（1-5）")
+    note: Optional[str] = Field(None, description="メモ（1,000文字以下）")
+    recorded_at: Optional[datetime] = Field(None, description="記録日時（オフライン時の記録時刻）")
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=100, description="再送時の重複防止キー")
+
+class MoodBatchCreate(BaseModel):
+    """気分記録一括作成スキーマ"""
+    moods: List[MoodBatchItem] = Field(..., min_length=1, max_length=500, description="気分記録（最大500件）")
+
 class MoodListResponse(BaseModel):
     """気分記録一覧レスポンススキーマ"""
     moods: list[MoodResponse]
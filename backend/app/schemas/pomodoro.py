@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+
+class PomodoroSessionCreate(BaseModel):
+    """ポモドーロセッション作成スキーマ"""
+    settings: Optional[Dict[str, Any]] = Field(None, description="タイマー設定（省略時はデフォルト設定）")
+
+class PomodoroSessionAction(BaseModel):
+    """ポモドーロセッション操作スキーマ"""
+    session_id: str = Field(..., min_length=1, max_length=100, description="セッションID")
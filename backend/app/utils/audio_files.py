@@ -0,0 +1,86 @@
+"""
+音声ファイル配信ユーティリティ
+カタログに登録されたローカル音声ファイルをRange・キャッシュヘッダー付きで返す
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from dotenv import load_dotenv
+
+from app.utils.static_responses import etag_matches
+
+# 環境変数を読み込み
+load_dotenv()
+
+AUDIO_LIBRARY_DIR = os.getenv("AUDIO_LIBRARY_DIR", "static/audio")
+AUDIO_CACHE_MAX_AGE = int(os.getenv("AUDIO_CACHE_MAX_AGE", "2592000"))  # 30日
+
+AUDIO_MEDIA_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".m4a": "audio/mp4"
+}
+
+def build_audio_catalog(audio_urls, library_dir: str = AUDIO_LIBRARY_DIR) -> Dict[str, str]:
+    """audio_url（/audio/...）からローカルファイルパスへの対応表を作成"""
+    catalog = {}
+    for audio_url in audio_urls:
+        relative_path = audio_url.lstrip("/")
+        if relative_path.startswith("audio/"):
+            relative_path = relative_path[len("audio/"):]
+        catalog[relative_path] = os.path.join(library_dir, *relative_path.split("/"))
+    return catalog
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """ファイルの更新時刻とサイズからETagを生成"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def is_not_modified(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    """条件付きリクエストに対して304を返せるか判定"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+def audio_file_response(
+    path: str,
+    request: Request,
+    max_age: int = AUDIO_CACHE_MAX_AGE,
+    immutable: bool = False
+) -> Optional[Response]:
+    """音声ファイルのレスポンスを作成（ファイルが無い場合はNone）
+
+    Rangeリクエスト（206）はFileResponseが処理し、ASGIサーバーが
+    http.response.pathsend拡張に対応していればsendfileで送出される。
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    etag = make_etag(stat_result)
+    cache_control = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes"
+    }
+
+    if is_not_modified(request, etag, stat_result):
+        return Response(status_code=304, headers=headers)
+
+    media_type = AUDIO_MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
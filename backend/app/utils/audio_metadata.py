@@ -0,0 +1,229 @@
+"""
+音声メタデータインデックス
+音声ライブラリを事前に解析した長さ・ラウドネス・ループ位置を保持する
+"""
+
+import json
+import os
+import threading
+import wave
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable, Tuple
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+try:
+    import numpy as np
+except ImportError:  # NumPyが無い環境ではインデックス作成を無効化
+    np = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+AUDIO_LIBRARY_DIR = os.getenv("AUDIO_LIBRARY_DIR", "static/audio")
+AUDIO_INDEX_PATH = os.getenv("AUDIO_INDEX_PATH", os.path.join(AUDIO_LIBRARY_DIR, "index.json"))
+
+# ラウドネス正規化の目標値（EBU R128相当）と最大ゲイン
+TARGET_LOUDNESS = -23.0
+MAX_GAIN_DB = 12.0
+
+# 解析パラメータ
+BLOCK_SECONDS = 0.4          # ラウドネス測定ブロック長
+BLOCK_OVERLAP = 0.75         # ブロックの重なり
+ABSOLUTE_GATE = -70.0        # 絶対ゲート（LUFS）
+RELATIVE_GATE = -10.0        # 相対ゲート（LU）
+SILENCE_THRESHOLD_DB = -50.0 # ループ位置決定用の無音しきい値
+ENERGY_WINDOW_SECONDS = 0.05
+
+def read_wav_pcm(path: str) -> Tuple["np.ndarray", int]:
+    """16bit PCM WAVを読み込み、(フレーム数, チャンネル数)のfloat32配列とサンプルレートを返す"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"音源ファイルが見つかりません: {os.path.basename(path)}")
+
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"16bit PCM以外の音源には対応していません: {os.path.basename(path)}")
+        channels = wav.getnchannels()
+        sample_rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    return samples.reshape(-1, channels), sample_rate
+
+def measure_loudness(samples: "np.ndarray", sample_rate: int) -> float:
+    """ゲート付きブロック平均によるLUFS近似値を算出（Kフィルタは省略）"""
+    if len(samples) == 0:
+        # 空の音源は無音として扱う
+        return ABSOLUTE_GATE
+    block = int(BLOCK_SECONDS * sample_rate)
+    if len(samples) < block:
+        block = len(samples)
+    step = max(1, int(block * (1 - BLOCK_OVERLAP)))
+
+    # チャンネル合計の二乗値の累積和からブロックごとの平均二乗値を一括計算
+    power = np.sum(samples.astype(np.float64) ** 2, axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(power)))
+    starts = np.arange(0, len(power) - block + 1, step)
+    block_power = (cumulative[starts + block] - cumulative[starts]) / block
+    block_loudness = -0.691 + 10 * np.log10(np.maximum(block_power, 1e-12))
+
+    gated = block_power[block_loudness > ABSOLUTE_GATE]
+    if gated.size == 0:
+        return ABSOLUTE_GATE
+
+    relative_threshold = -0.691 + 10 * np.log10(np.mean(gated)) + RELATIVE_GATE
+    gated_loudness = -0.691 + 10 * np.log10(np.maximum(gated, 1e-12))
+    gated = gated[gated_loudness > relative_threshold]
+
+    return float(-0.691 + 10 * np.log10(np.mean(gated)))
+
+def find_loop_points(samples: "np.ndarray", sample_rate: int) -> Tuple[int, int]:
+    """前後の無音を除いたループ区間（ゼロクロス位置に補正）をフレーム単位で返す"""
+    mono = samples.mean(axis=1)
+    window = max(1, int(ENERGY_WINDOW_SECONDS * sample_rate))
+    frames = len(mono) // window
+    if frames == 0:
+        return 0, len(mono)
+
+    energy = np.sqrt(np.mean(mono[:frames * window].reshape(frames, window) ** 2, axis=1))
+    energy_db = 20 * np.log10(np.maximum(energy, 1e-9))
+    audible = np.flatnonzero(energy_db > SILENCE_THRESHOLD_DB)
+    if audible.size == 0:
+        return 0, len(mono)
+
+    loop_start = int(audible[0] * window)
+    loop_end = int(min(len(mono), (audible[-1] + 1) * window))
+
+    # クリックノイズを避けるため、近傍のゼロクロス位置（符号が変わった最初のサンプル）に合わせる
+    crossings = np.flatnonzero(np.diff(np.signbit(mono))) + 1
+    if crossings.size:
+        loop_start = int(crossings[np.searchsorted(crossings, loop_start).clip(0, crossings.size - 1)])
+        end_index = np.searchsorted(crossings, loop_end, side="right") - 1
+        if end_index >= 0 and crossings[end_index] > loop_start:
+            loop_end = int(crossings[end_index])
+
+    return loop_start, loop_end
+
+def analyze_audio_file(path: str) -> Dict[str, Any]:
+    """音声ファイルを解析してメタデータを返す"""
+    samples, sample_rate = read_wav_pcm(path)
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    rms = float(np.sqrt(np.mean(samples.astype(np.float64) ** 2))) if samples.size else 0.0
+    loop_start, loop_end = find_loop_points(samples, sample_rate)
+
+    return {
+        "duration": round(len(samples) / sample_rate, 3),
+        "sample_rate": sample_rate,
+        "channels": samples.shape[1],
+        "rms_db": round(20 * np.log10(max(rms, 1e-9)), 2),
+        "peak_db": round(20 * np.log10(max(peak, 1e-9)), 2),
+        "loudness": round(measure_loudness(samples, sample_rate), 2),
+        "loop_start": loop_start,
+        "loop_end": loop_end
+    }
+
+def build_audio_index(library_dir: str = AUDIO_LIBRARY_DIR) -> Dict[str, Any]:
+    """音声ライブラリを走査してインデックスを作成"""
+    if np is None:
+        raise RuntimeError("NumPyがインストールされていないため、インデックスを作成できません")
+
+    entries = {}
+    for root, _, files in os.walk(library_dir):
+        for filename in sorted(files):
+            if not filename.lower().endswith(".wav"):
+                continue
+            path = os.path.join(root, filename)
+            key = os.path.splitext(os.path.relpath(path, library_dir))[0].replace(os.sep, "/")
+            try:
+                entries[key] = analyze_audio_file(path)
+            except Exception as e:
+                logger.warning(f"音声ファイル解析エラー: {key}", e)
+
+    return {
+        "version": datetime.now().strftime("%Y%m%d%H%M%S"),
+        "target_loudness": TARGET_LOUDNESS,
+        "entries": entries
+    }
+
+def save_audio_index(index: Dict[str, Any], path: str = AUDIO_INDEX_PATH):
+    """インデックスをコンパクトなJSONとして保存"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def audio_key(audio_url: str) -> str:
+    """audio_url（/audio/sounds/rain.mp3）をインデックスキー（sounds/rain）に変換"""
+    relative_path = audio_url.lstrip("/")
+    if relative_path.startswith("audio/"):
+        relative_path = relative_path[len("audio/"):]
+    return os.path.splitext(relative_path)[0]
+
+class AudioMetadataIndex:
+    """音声メタデータインデックス（初回アクセス時に読み込み）"""
+
+    def __init__(self, path: str = AUDIO_INDEX_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._version = ""
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    @property
+    def version(self) -> str:
+        self.entries
+        return self._version
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """キーでメタデータを取得"""
+        return self.entries.get(key)
+
+    def get_gain(self, key: str) -> float:
+        """目標ラウドネスに揃えるための線形ゲインを取得"""
+        metadata = self.get(key)
+        if not metadata:
+            return 1.0
+        gain_db = min(MAX_GAIN_DB, TARGET_LOUDNESS - metadata["loudness"])
+        return float(10 ** (gain_db / 20))
+
+    def annotate(self, items: Iterable[Dict[str, Any]]):
+        """カタログ項目にdurationとラウドネス情報を反映"""
+        for item in items:
+            metadata = self.get(audio_key(item.get("audio_url", "")))
+            if not metadata:
+                continue
+            item["duration"] = int(round(metadata["duration"]))
+            item["loudness"] = metadata["loudness"]
+            item["gain"] = round(self.get_gain(audio_key(item["audio_url"])), 3)
+
+    def reload(self):
+        """インデックスを再読み込み"""
+        with self._lock:
+            self._entries = None
+        self.entries
+
+    def _load(self):
+        with self._lock:
+            if self._entries is not None:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                self._version = index.get("version", "")
+                self._entries = index.get("entries", {})
+                logger.info(f"音声メタデータインデックスを読み込みました: {len(self._entries)}件")
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logger.warning("音声メタデータインデックス読み込みエラー", e)
+                self._entries = {}
+
+# グローバルインデックスインスタンス
+audio_metadata_index = AudioMetadataIndex()
@@ -79,7 +79,13 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     # 循環インポートを避けるため、ここでSupabaseDBをインポート
     from app.database.supabase_db import SupabaseDB
-    user = SupabaseDB.get_user_by_id(int(user_id))
+    from app.database.resilience import raise_if_unavailable
+    try:
+        user = SupabaseDB.get_user_by_id(int(user_id))
+    except Exception as e:
+        # データベース障害はトークンの問題ではないため401ではなく503で応答
+        raise_if_unavailable(e)
+        raise
     if user is None:
         print(f"ユーザーが見つかりません: ID {user_id}")
         raise HTTPException(
@@ -0,0 +1,192 @@
+"""
+CBT対話トランスクリプト
+session_idごとに対話ターンをバッファし、セッション終了時またはアイドル時に1件のジャーナルとして保存する
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+# 環境変数を読み込み
+load_dotenv()
+
+CBT_SESSION_IDLE_TIMEOUT = int(os.getenv("CBT_SESSION_IDLE_TIMEOUT", "900"))  # 15分
+CBT_TRANSCRIPT_MAX_TURNS = int(os.getenv("CBT_TRANSCRIPT_MAX_TURNS", "50"))
+CBT_TRANSCRIPT_SWEEP_INTERVAL = int(os.getenv("CBT_TRANSCRIPT_SWEEP_INTERVAL", "60"))
+CBT_TRANSCRIPT_MAX_PERSIST_FAILURES = int(os.getenv("CBT_TRANSCRIPT_MAX_PERSIST_FAILURES", "5"))
+
+TRANSCRIPT_HEADER = "【CBT対話】"
+
+def format_transcript(turns: List[Dict[str, Any]]) -> str:
+    """ターンの一覧をジャーナル本文に整形"""
+    lines = [TRANSCRIPT_HEADER]
+    for turn in turns:
+        lines.append(f"ユーザー: {turn['message']}")
+        lines.append(f"AI: {turn['response']}")
+        lines.append(f"感情: {turn['emotion']}")
+    return "\n".join(lines)
+
+def dominant_emotion(turns: List[Dict[str, Any]]) -> Optional[str]:
+    """セッション中に最も多く検出された感情"""
+    emotions = Counter(turn["emotion"] for turn in turns if turn.get("emotion"))
+    return emotions.most_common(1)[0][0] if emotions else None
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> str:
+    """セッションの簡単な要約"""
+    if not turns:
+        return "記録された対話はありません。"
+    emotions = Counter(turn["emotion"] for turn in turns if turn.get("emotion"))
+    summary = f"{len(turns)}回の対話を記録しました。"
+    if emotions:
+        summary += "検出された感情: " + "、".join(f"{emotion}({count})" for emotion, count in emotions.most_common())
+    return summary
+
+class _SessionBuffer:
+    """保存前のセッション"""
+
+    __slots__ = ("session_id", "user_id", "turns", "started_at", "last_activity", "failures")
+
+    def __init__(self, session_id: str, user_id: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.turns: List[Dict[str, Any]] = []
+        self.started_at = datetime.now().isoformat()
+        self.last_activity = time.time()
+        self.failures = 0
+
+class CBTTranscriptBuffer:
+    """(user_id, session_id)をキーとする対話ターンのバッファ"""
+
+    def __init__(
+        self,
+        persist: Optional[Callable[[int, str, List[Dict[str, Any]]], Optional[Dict[str, Any]]]] = None,
+        idle_timeout: int = CBT_SESSION_IDLE_TIMEOUT,
+        max_turns: int = CBT_TRANSCRIPT_MAX_TURNS,
+        max_persist_failures: int = CBT_TRANSCRIPT_MAX_PERSIST_FAILURES
+    ):
+        self._persist = persist
+        self.idle_timeout = idle_timeout
+        self.max_turns = max_turns
+        self.max_persist_failures = max_persist_failures
+        # 別ユーザーが同じsession_idを使っても互いのバッファを上書きしない
+        self._sessions: Dict[Tuple[int, str], _SessionBuffer] = {}
+        self._lock = threading.Lock()
+
+    def persist(self, user_id: int, session_id: str, turns: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """トランスクリプトを保存（既定ではjournalsテーブルへ1行挿入）"""
+        if self._persist is not None:
+            return self._persist(user_id, session_id, turns)
+        from app.database.supabase_db import SupabaseDB
+        return SupabaseDB.create_cbt_transcript(user_id, session_id, turns)
+
+    def add_turn(self, user_id: int, session_id: str, message: str, response: str, emotion: str):
+        """ターンを追加（上限に達した場合はその時点までを保存）"""
+        turn = {
+            "message": message,
+            "response": response,
+            "emotion": emotion,
+            "timestamp": datetime.now().isoformat()
+        }
+        key = (user_id, session_id)
+        full = None
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = _SessionBuffer(session_id, user_id)
+            session.turns.append(turn)
+            session.last_activity = time.time()
+            if len(session.turns) >= self.max_turns:
+                full = self._sessions.pop(key)
+
+        if full is not None:
+            self._flush(full)
+
+    def get_turns(self, user_id: int, session_id: str) -> List[Dict[str, Any]]:
+        """未保存のターンを取得"""
+        with self._lock:
+            session = self._sessions.get((user_id, session_id))
+            return list(session.turns) if session is not None else []
+
+    def end_session(self, user_id: int, session_id: str) -> Dict[str, Any]:
+        """セッションを終了して保存"""
+        with self._lock:
+            session = self._sessions.pop((user_id, session_id), None)
+
+        if session is None:
+            return {"journal": None, "turns": []}
+        return {"journal": self._flush(session), "turns": session.turns}
+
+    def flush_idle(self, now: Optional[float] = None) -> int:
+        """アイドル時間を超えたセッションを保存し、保存件数を返す"""
+        now = now or time.time()
+        with self._lock:
+            idle = [
+                key for key, session in self._sessions.items()
+                if now - session.last_activity > self.idle_timeout
+            ]
+            sessions = [self._sessions.pop(key) for key in idle]
+
+        for session in sessions:
+            self._flush(session)
+        if sessions:
+            logger.info(f"アイドル状態のCBTセッションを保存: {len(sessions)}件")
+        return len(sessions)
+
+    def flush_all(self) -> int:
+        """すべてのセッションを保存（終了時用）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            self._flush(session)
+        return len(sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _flush(self, session: _SessionBuffer) -> Optional[Dict[str, Any]]:
+        if not session.turns:
+            return None
+        context = {"user_id": session.user_id, "session_id": session.session_id}
+        try:
+            return self.persist(session.user_id, session.session_id, session.turns)
+        except Exception as e:
+            logger.error("CBTトランスクリプト保存エラー", e, context)
+            session.failures += 1
+            if session.failures >= self.max_persist_failures:
+                # 保存できない状態が続く場合はメモリに溜め続けず破棄
+                logger.error(
+                    f"CBTトランスクリプトの保存に{session.failures}回失敗したため{len(session.turns)}件のターンを破棄しました",
+                    context=context
+                )
+                return None
+            # 保存に失敗したターンは次回の保存で再試行
+            key = (session.user_id, session.session_id)
+            with self._lock:
+                current = self._sessions.get(key)
+                if current is None:
+                    self._sessions[key] = session
+                else:
+                    current.turns[:0] = session.turns
+                    current.failures = max(current.failures, session.failures)
+            return None
+
+async def run_idle_flusher(buffer: "CBTTranscriptBuffer", interval: int = CBT_TRANSCRIPT_SWEEP_INTERVAL):
+    """アイドルセッションを定期的に保存するバックグラウンドタスク"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(buffer.flush_idle)
+        except Exception as e:
+            logger.error("CBTトランスクリプト定期保存エラー", e)
+
+# グローバルトランスクリプトバッファインスタンス
+cbt_transcript_buffer = CBTTranscriptBuffer()
@@ -0,0 +1,193 @@
+"""
+レスポンス圧縮ミドルウェア
+Accept-EncodingからBrotli・gzipを選択し、一定サイズ以上のレスポンスを圧縮する
+"""
+
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # brotliが無い環境ではgzipのみ
+    brotli = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# 圧縮済み・圧縮効果の無いコンテンツ
+EXCLUDED_CONTENT_TYPES = (
+    "audio/",
+    "video/",
+    "image/",
+    "application/zip",
+    "application/gzip",
+    "application/octet-stream",
+    "text/event-stream"
+)
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encodingヘッダーを{エンコーディング: q値}に変換"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+def select_encoding(header: str) -> Optional[str]:
+    """利用するエンコーディングを選択（同じq値ならBrotliを優先）"""
+    encodings = parse_accept_encoding(header)
+    wildcard = encodings.get("*", 0.0)
+    candidates = [("br", 2)] if brotli is not None else []
+    candidates.append(("gzip", 1))
+
+    best: Optional[Tuple[float, int, str]] = None
+    for name, priority in candidates:
+        quality = encodings.get(name, wildcard)
+        if quality > 0 and (best is None or (quality, priority) > best[:2]):
+            best = (quality, priority, name)
+    return best[2] if best else None
+
+class GzipCompressor:
+    """gzipのストリーム圧縮"""
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.compress(body)
+        return data + self._compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+class BrotliCompressor:
+    """Brotliのストリーム圧縮"""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+class CompressionMiddleware:
+    """Brotli・gzipのレスポンス圧縮（ASGIミドルウェア）"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        excluded_content_types: Tuple[str, ...] = EXCLUDED_CONTENT_TYPES
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_content_types = excluded_content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def create_compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    def is_compressible(self, headers: Headers) -> bool:
+        """圧縮対象のレスポンスか判定"""
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return bool(content_type) and not content_type.startswith(self.excluded_content_types)
+
+class _CompressionResponder:
+    """1リクエスト分の圧縮状態"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.initial_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # 最初の本文を見てからヘッダーを確定する
+            self.initial_message = message
+            self.passthrough = not self.middleware.is_compressible(Headers(raw=message["headers"]))
+            return
+
+        if message_type != "http.response.body":
+            # pathsendなどはそのまま送出
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.initial_message is not None:
+            await self._start(message, body, more_body)
+            return
+
+        if self.compressor is not None:
+            message["body"] = self.compressor.compress(body, more_body)
+        await self._send(message)
+
+    async def _start(self, message: Message, body: bytes, more_body: bool):
+        """最初の本文で圧縮するかを決め、ヘッダーとともに送出"""
+        if self.passthrough or (len(body) < self.middleware.minimum_size and not more_body):
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+
+        if self.encoding is not None:
+            self.compressor = self.middleware.create_compressor(self.encoding)
+            message["body"] = self.compressor.compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            # 表現が変わるためETagは弱い比較に変更
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+
+        await self._flush_start()
+        await self._send(message)
+
+    async def _flush_start(self):
+        if self.initial_message is not None:
+            initial_message, self.initial_message = self.initial_message, None
+            await self._send(initial_message)
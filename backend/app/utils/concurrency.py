@@ -0,0 +1,47 @@
+"""
+データ層の並行実行
+互いに依存しない同期DB呼び出しをスレッドプールで同時に実行し、リクエストのコンテキスト（contextvars）を引き継ぐ
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+from dotenv import load_dotenv
+
+# 環境変数を読み込み
+load_dotenv()
+
+DB_FANOUT_MAX_WORKERS = int(os.getenv("DB_FANOUT_MAX_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_FANOUT_MAX_WORKERS, thread_name_prefix="db-fanout")
+_worker = threading.local()
+
+def _run_in_context(context: contextvars.Context, call: Callable[[], Any]) -> Any:
+    _worker.active = True
+    try:
+        return context.run(call)
+    finally:
+        _worker.active = False
+
+def gather_calls(*calls: Callable[[], Any]) -> List[Any]:
+    """引数なしの呼び出しを並行実行し、結果を渡した順に返す（最初の例外を送出）"""
+    if len(calls) <= 1 or getattr(_worker, "active", False):
+        # 1件のみ、またはプール内からの入れ子呼び出し（デッドロック防止）は順に実行
+        return [call() for call in calls]
+
+    futures = [
+        _executor.submit(_run_in_context, contextvars.copy_context(), call)
+        for call in calls
+    ]
+    return [future.result() for future in futures]
+
+async def gather_calls_async(*calls: Callable[[], Any]) -> List[Any]:
+    """非同期エンドポイントから同期呼び出しを並行実行"""
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(_executor, _run_in_context, contextvars.copy_context(), call)
+        for call in calls
+    )))
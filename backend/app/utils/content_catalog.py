@@ -0,0 +1,166 @@
+"""
+コンテンツカタログエンジン
+瞑想セッション・サウンドを転置インデックスで高速に絞り込む
+"""
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Iterable
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+# 環境変数を読み込み
+load_dotenv()
+
+CONTENT_CATALOG_DIR = os.getenv("CONTENT_CATALOG_DIR", "data/catalog")
+
+# 時間帯バケット（秒、上限を含む。小数の長さも含め隙間なく分類する）
+DURATION_BUCKETS = (
+    ("short", 300),            # 5分以下
+    ("medium", 900),           # 5分超〜15分
+    ("long", None)             # 15分超
+)
+
+def get_duration_bucket(duration: Optional[float]) -> Optional[str]:
+    """長さ（秒）からバケット名を取得"""
+    if duration is None:
+        return None
+    for name, upper in DURATION_BUCKETS:
+        if upper is None or duration <= upper:
+            return name
+    return None
+
+def load_catalog_items(filename: str, catalog_dir: str = CONTENT_CATALOG_DIR) -> List[Dict[str, Any]]:
+    """データファイル（JSON配列または{"items": [...]}）からカタログ項目を読み込み"""
+    path = os.path.join(catalog_dir, filename)
+    if not os.path.exists(path):
+        return []
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = data.get("items", []) if isinstance(data, dict) else data
+        logger.info(f"カタログデータを読み込みました: {filename} ({len(items)}件)")
+        return items
+    except Exception as e:
+        logger.error(f"カタログデータ読み込みエラー: {filename}", e)
+        return []
+
+class ContentCatalog:
+    """転置インデックス付きの読み取り専用カタログ"""
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self.items: List[Dict[str, Any]] = list(items)
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self._category_index: Dict[str, List[int]] = {}
+        self._tag_index: Dict[str, List[int]] = {}
+        self._bucket_index: Dict[str, List[int]] = {}
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """カテゴリ・タグ・時間帯の転置インデックスと長さのソート済み配列を構築"""
+        with_duration = []
+
+        for position, item in enumerate(self.items):
+            if "id" in item:
+                self.by_id[item["id"]] = item
+            if item.get("category") is not None:
+                self._category_index.setdefault(item["category"], []).append(position)
+            for tag in item.get("tags", []):
+                postings = self._tag_index.setdefault(tag, [])
+                if not postings or postings[-1] != position:
+                    postings.append(position)
+            duration = item.get("duration")
+            if duration is not None:
+                with_duration.append((duration, position))
+                self._bucket_index.setdefault(get_duration_bucket(duration), []).append(position)
+
+        # 積集合用に各インデックスの集合版も保持
+        self._category_sets = {key: frozenset(postings) for key, postings in self._category_index.items()}
+        self._tag_sets = {key: frozenset(postings) for key, postings in self._tag_index.items()}
+        self._bucket_sets = {key: frozenset(postings) for key, postings in self._bucket_index.items()}
+        
+        # 二分探索用（長さ順）
+        with_duration.sort()
+        self._sorted_durations = [duration for duration, _ in with_duration]
+        self._positions_by_duration = [position for _, position in with_duration]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """IDで項目を取得"""
+        return self.by_id.get(item_id)
+
+    def categories(self) -> List[str]:
+        """カテゴリ一覧"""
+        return list(self._category_index.keys())
+
+    def tags(self) -> List[str]:
+        """タグ一覧"""
+        return list(self._tag_index.keys())
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        """カテゴリで絞り込み"""
+        return [self.items[position] for position in self._category_index.get(category, [])]
+
+    def by_duration(self, min_duration: Optional[int] = None, max_duration: Optional[int] = None) -> List[Dict[str, Any]]:
+        """長さの範囲で絞り込み（カタログ順）"""
+        return [self.items[position] for position in sorted(self._duration_range(min_duration, max_duration))]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        duration_bucket: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """複数条件で絞り込み（条件はAND、タグはすべて一致）"""
+        candidate_sets: List[frozenset] = []
+
+        if category is not None:
+            candidate_sets.append(self._category_sets.get(category, frozenset()))
+        for tag in tags or []:
+            candidate_sets.append(self._tag_sets.get(tag, frozenset()))
+        if duration_bucket is not None:
+            candidate_sets.append(self._bucket_sets.get(duration_bucket, frozenset()))
+        has_duration_range = min_duration is not None or max_duration is not None
+
+        if candidate_sets:
+            # 小さい集合から積集合をとる
+            candidate_sets.sort(key=len)
+            positions = candidate_sets[0]
+            for candidates in candidate_sets[1:]:
+                if not positions:
+                    break
+                positions = positions & candidates
+            # 長さの範囲は絞り込み後の候補に対して判定
+            if has_duration_range:
+                positions = [
+                    position for position in positions
+                    if self._in_duration_range(self.items[position].get("duration"), min_duration, max_duration)
+                ]
+            ordered = sorted(positions)
+        elif has_duration_range:
+            ordered = sorted(self._duration_range(min_duration, max_duration))
+        else:
+            ordered = range(len(self.items))
+
+        end = offset + limit if limit is not None else None
+        return [self.items[position] for position in ordered[offset:end]]
+
+    @staticmethod
+    def _in_duration_range(duration: Optional[int], min_duration: Optional[int], max_duration: Optional[int]) -> bool:
+        if duration is None:
+            return False
+        return (min_duration is None or duration >= min_duration) and (max_duration is None or duration <= max_duration)
+
+    def _duration_range(self, min_duration: Optional[int], max_duration: Optional[int]) -> List[int]:
+        start = bisect_left(self._sorted_durations, min_duration) if min_duration is not None else 0
+        end = bisect_right(self._sorted_durations, max_duration) if max_duration is not None else len(self._sorted_durations)
+        return self._positions_by_duration[start:end]
@@ -0,0 +1,160 @@
+"""
+ダッシュボード集計
+直近のジャーナル・気分記録、気分の推移、件数、使用回数を並行して取得し、ユーザーごとに短時間キャッシュする
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from app.database.supabase_db import SupabaseDB
+from app.utils.concurrency import gather_calls_async
+from app.utils.usage_limits import get_current_usage, get_usage_limit
+
+# 環境変数を読み込み
+load_dotenv()
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+DASHBOARD_RECENT_LIMIT = int(os.getenv("DASHBOARD_RECENT_LIMIT", "5"))
+DASHBOARD_TREND_DAYS = int(os.getenv("DASHBOARD_TREND_DAYS", "30"))
+
+PREVIEW_CHARS = 200
+USAGE_FEATURES = ("journal", "mood", "ai_analysis")
+
+# 推移の判定に使う前半・後半の平均の差
+TREND_THRESHOLD = 0.3
+
+class DashboardCache:
+    """ユーザーごとのTTL付きキャッシュ（同時リクエストは1回の集計を共有）"""
+
+    def __init__(self, ttl: int = DASHBOARD_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[int, tuple] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    async def get_or_load(self, user_id: int, load: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """キャッシュがあれば返し、無ければloadで集計して保存"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.time():
+                return entry[1]
+            pending = self._pending.get(user_id)
+
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # 集計中のリクエストがキャンセルされた場合は改めて集計する
+                return await self.get_or_load(user_id, load)
+
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._pending[user_id] = future
+        try:
+            value = await load()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # 待機中のリクエストが無い場合の未取得警告を防ぐ
+                future.exception()
+            else:
+                # キャンセル時も待機中のリクエストを解放する
+                future.cancel()
+            raise
+        else:
+            with self._lock:
+                self._entries[user_id] = (time.time() + self.ttl, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._pending.get(user_id) is future:
+                    del self._pending[user_id]
+
+    def invalidate(self, user_id: int):
+        """ユーザーのキャッシュを破棄（記録の作成・削除時）"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+def usage_summary(user_id: int, feature: str, plan_type: str) -> Dict[str, Any]:
+    """機能ごとの使用回数・上限・残り回数・使用率"""
+    limit = get_usage_limit(plan_type, feature)
+    current_usage = get_current_usage(user_id, feature)
+    return {
+        "can_use": current_usage < limit,
+        "current_usage": current_usage,
+        "limit": limit,
+        "remaining": max(0, limit - current_usage),
+        "percentage": round(current_usage / limit * 100, 1) if limit else 100.0,
+        "plan_type": plan_type
+    }
+
+def build_mood_trend(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """日ごとの平均気分と、期間の前半と後半の比較による傾向"""
+    by_day: Dict[str, List[int]] = defaultdict(list)
+    for row in rows:
+        if row.get("recorded_at") and row.get("mood") is not None:
+            by_day[str(row["recorded_at"])[:10]].append(row["mood"])
+
+    daily = [
+        {"date": date, "average": round(sum(scores) / len(scores), 2), "count": len(scores)}
+        for date, scores in sorted(by_day.items())
+    ]
+    scores = [row["mood"] for row in rows if row.get("mood") is not None]
+
+    direction = "stable"
+    if len(daily) >= 2:
+        middle = len(daily) // 2
+        first = sum(day["average"] for day in daily[:middle]) / middle
+        second = sum(day["average"] for day in daily[middle:]) / (len(daily) - middle)
+        if second - first >= TREND_THRESHOLD:
+            direction = "improving"
+        elif first - second >= TREND_THRESHOLD:
+            direction = "declining"
+
+    return {
+        "days": DASHBOARD_TREND_DAYS,
+        "daily": daily,
+        "average": round(sum(scores) / len(scores), 2) if scores else None,
+        "direction": direction
+    }
+
+def _preview(journal: Dict[str, Any]) -> Dict[str, Any]:
+    content = journal.get("content") or ""
+    return {**journal, "content": content[:PREVIEW_CHARS], "truncated": len(content) > PREVIEW_CHARS}
+
+async def build_dashboard_summary(user_id: int, plan_type: str, limit: int = DASHBOARD_RECENT_LIMIT) -> Dict[str, Any]:
+    """ダッシュボードの各項目を並行して取得"""
+    since = (datetime.now() - timedelta(days=DASHBOARD_TREND_DAYS)).isoformat()
+
+    journals, moods, trend_rows, journal_count, mood_count, *usage = await gather_calls_async(
+        lambda: SupabaseDB.get_recent_journals(user_id, limit),
+        lambda: SupabaseDB.get_recent_moods(user_id, limit),
+        lambda: SupabaseDB.get_mood_scores_since(user_id, since),
+        lambda: SupabaseDB.count_user_rows("journals", user_id),
+        lambda: SupabaseDB.count_user_rows("moods", user_id),
+        *(partial(usage_summary, user_id, feature, plan_type) for feature in USAGE_FEATURES)
+    )
+
+    return {
+        "user_id": user_id,
+        "plan_type": plan_type,
+        "recent_journals": [_preview(journal) for journal in journals],
+        "recent_moods": moods,
+        "mood_trend": build_mood_trend(trend_rows),
+        "counts": {"journals": journal_count, "moods": mood_count},
+        "usage": dict(zip(USAGE_FEATURES, usage)),
+        "generated_at": datetime.now().isoformat()
+    }
+
+# グローバルダッシュボードキャッシュインスタンス
+dashboard_cache = DashboardCache()
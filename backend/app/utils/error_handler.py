@@ -41,11 +41,21 @@ class ResourceNotFoundError(CareBotError):
     def __init__(self, message: str = "リソースが見つかりません", details: Dict[str, Any] = None):
         super().__init__(message, "NOT_FOUND_ERROR", details)
 
+class ConflictError(CareBotError):
+    """競合エラー"""
+    def __init__(self, message: str = "リソースが競合しています", details: Dict[str, Any] = None):
+        super().__init__(message, "CONFLICT_ERROR", details)
+
 class ExternalServiceError(CareBotError):
     """外部サービスエラー"""
     def __init__(self, message: str = "外部サービスでエラーが発生しました", details: Dict[str, Any] = None):
         super().__init__(message, "EXTERNAL_SERVICE_ERROR", details)
 
+class ServiceUnavailableError(CareBotError):
+    """一時的な利用不可エラー（データベース障害時の遮断など）"""
+    def __init__(self, message: str = "サービスが一時的に利用できません", details: Dict[str, Any] = None):
+        super().__init__(message, "SERVICE_UNAVAILABLE_ERROR", details)
+
 def handle_carebot_error(error: CareBotError, request: Request) -> HTTPException:
     """CareBotエラーをHTTPExceptionに変換"""
     # エラーログを記録
@@ -64,7 +74,9 @@ def handle_carebot_error(error: CareBotError, request: Request) -> HTTPException
         "DB_ERROR": 500,
         "USAGE_LIMIT_ERROR": 429,
         "NOT_FOUND_ERROR": 404,
-        "EXTERNAL_SERVICE_ERROR": 502
+        "CONFLICT_ERROR": 409,
+        "EXTERNAL_SERVICE_ERROR": 502,
+        "SERVICE_UNAVAILABLE_ERROR": 503
     }
     
     status_code = status_code_map.get(error.error_code, 500)
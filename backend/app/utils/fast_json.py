@@ -0,0 +1,40 @@
+"""
+高速JSONレスポンス
+orjsonがインストールされていればorjsonでシリアライズし、無ければ標準のJSONResponseと同じ動作をする
+"""
+
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjsonが無い環境では標準のjsonを使用
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _default(obj: Any) -> Any:
+    """orjsonが直接扱えない型の変換"""
+    if np is not None and isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"JSONに変換できない型です: {type(obj).__name__}")
+
+# datetime・NumPy配列・文字列以外のキーに対応
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+class FastJSONResponse(JSONResponse):
+    """orjsonでシリアライズするJSONResponse（datetime・NumPy対応）
+
+    ルートの戻り値はFastAPIがjsonable_encoderで変換してから渡すため、
+    変換を省略したい場合はこのクラスのインスタンスを直接返す。
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
@@ -0,0 +1,187 @@
+"""
+HTTPクライアント設定
+Supabase（PostgREST）などへの通信に使うhttpxクライアントを作成する。
+HTTP/2・keep-aliveの接続プール・接続/読み取りタイムアウトを設定し、冪等な読み取り（GET/HEAD）は
+ジッター付き指数バックオフで再試行する。接続プールの使用状況はhttp_pool_stats()で取得できる。
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+try:
+    import h2
+except ImportError:  # h2が無い環境ではHTTP/1.1で接続
+    h2 = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+# HTTP接続設定
+HTTP2_ENABLED = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("SUPABASE_HTTP_READ_TIMEOUT", "10"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("SUPABASE_HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("SUPABASE_HTTP_POOL_TIMEOUT", "2"))
+HTTP_RETRIES = int(os.getenv("SUPABASE_HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("SUPABASE_HTTP_RETRY_BACKOFF", "0.1"))
+HTTP_RETRY_MAX_BACKOFF = float(os.getenv("SUPABASE_HTTP_RETRY_MAX_BACKOFF", "2"))
+
+# 再試行の対象（書き込みは二重実行になるため再試行しない）
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+def backoff_delay(attempt: int, base: float = HTTP_RETRY_BACKOFF, maximum: float = HTTP_RETRY_MAX_BACKOFF) -> float:
+    """attempt回目（0始まり）の再試行までの待ち時間（フルジッター）"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+class RetryTransport(httpx.BaseTransport):
+    """接続プール付きのトランスポート（冪等な読み取りの再試行と使用状況の計測）"""
+
+    def __init__(
+        self,
+        http2: bool = HTTP2_ENABLED,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        retries: int = HTTP_RETRIES
+    ):
+        if http2 and h2 is None:
+            logger.warning("h2がインストールされていないため、HTTP/1.1で接続します")
+            http2 = False
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.retries = retries
+        self._transport = httpx.HTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.pool_timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _send(self, request: httpx.Request) -> httpx.Response:
+        """1回送信（レスポンスヘッダーの受信までを実行中として数える）"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return self._transport.handle_request(request)
+        except httpx.TransportError as e:
+            with self._lock:
+                self.failures += 1
+                if isinstance(e, httpx.PoolTimeout):
+                    self.pool_timeouts += 1
+                elif isinstance(e, httpx.TimeoutException):
+                    self.timeouts += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        retryable = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = self._send(request)
+            except httpx.PoolTimeout:
+                # 接続プールが枯渇している場合は再試行で待ち行列を伸ばさない
+                raise
+            except httpx.TransportError as e:
+                if not retryable or attempt >= self.retries:
+                    raise
+                logger.warning(f"HTTPリクエストを再試行します: {request.method} {request.url.path} ({type(e).__name__})")
+            else:
+                if not (retryable and response.status_code in RETRY_STATUS_CODES and attempt < self.retries):
+                    return response
+                response.close()
+                logger.warning(f"HTTPリクエストを再試行します: {request.method} {request.url.path} (ステータス: {response.status_code})")
+
+            with self._lock:
+                self.retried += 1
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """接続プールの使用状況"""
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(pool.connections) if pool is not None else []
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            return {
+                "http2": self.http2,
+                "connections": len(connections),
+                "idle_connections": idle,
+                "max_connections": self.max_connections,
+                "utilization": round((len(connections) - idle) / self.max_connections, 3) if self.max_connections else 0.0,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "retries": self.retried,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "pool_timeouts": self.pool_timeouts
+            }
+
+    def close(self):
+        self._transport.close()
+
+# 名前ごとのトランスポート（使用状況の取得用）
+_transports: Dict[str, RetryTransport] = {}
+_clients: List[httpx.Client] = []
+_registry_lock = threading.Lock()
+
+def create_http_client(name: str, base_url: str = "", headers: Optional[Dict[str, str]] = None) -> httpx.Client:
+    """設定済みのトランスポートを使うhttpxクライアントを作成"""
+    transport = RetryTransport()
+    client = httpx.Client(
+        base_url=base_url,
+        headers=headers,
+        transport=transport,
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT
+        ),
+        follow_redirects=True
+    )
+    with _registry_lock:
+        _transports[name] = transport
+        _clients.append(client)
+    return client
+
+def http_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """作成済みクライアントの接続プールの使用状況"""
+    with _registry_lock:
+        transports = dict(_transports)
+    return {name: transport.stats() for name, transport in transports.items()}
+
+def close_http_clients():
+    """作成済みのクライアントをすべて閉じる"""
+    with _registry_lock:
+        clients = list(_clients)
+        _clients.clear()
+        _transports.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,218 @@
+"""
+ジャーナル重複検出
+文字シングルのMinHash署名とLSHバケットで、一定時間内の完全一致・類似ジャーナルを検出する
+"""
+
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from app.utils.error_handler import ConflictError
+
+try:
+    import numpy as np
+except ImportError:  # NumPyが無い環境では純Pythonで署名を計算
+    np = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+# 重複時の動作: collapse（既存のジャーナルを返す）/ reject（エラー）/ off
+JOURNAL_DEDUP_MODE = os.getenv("JOURNAL_DEDUP_MODE", "collapse")
+JOURNAL_DEDUP_WINDOW = int(os.getenv("JOURNAL_DEDUP_WINDOW", "3600"))  # 1時間
+JOURNAL_DEDUP_THRESHOLD = float(os.getenv("JOURNAL_DEDUP_THRESHOLD", "0.9"))
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# 係数・ハッシュ値とも2^31未満に収め、積がint64に収まるようにする
+MERSENNE_PRIME = (1 << 31) - 1
+
+# 署名の再現性のため固定シードでハッシュ関数の係数を生成
+_random = random.Random(1412)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+if np is not None:
+    _COEFFICIENTS_A = np.array([a for a, _ in PERMUTATIONS], dtype=np.int64)[:, None]
+    _COEFFICIENTS_B = np.array([b for _, b in PERMUTATIONS], dtype=np.int64)[:, None]
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+class JournalSignature:
+    """ジャーナル本文の完全一致ハッシュとMinHash署名"""
+
+    __slots__ = ("content_hash", "minhash", "bands")
+
+    def __init__(self, content: str):
+        normalized = normalize_content(content)
+        self.content_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        self.minhash = minhash_signature(shingles(normalized))
+        self.bands = [
+            (band, hash(tuple(self.minhash[band * LSH_ROWS:(band + 1) * LSH_ROWS])))
+            for band in range(LSH_BANDS)
+        ]
+
+    def similarity(self, other: "JournalSignature") -> float:
+        """署名の一致率（Jaccard係数の推定値）"""
+        return sum(1 for a, b in zip(self.minhash, other.minhash) if a == b) / NUM_PERMUTATIONS
+
+def normalize_content(content: str) -> str:
+    """表記ゆれと空白の違いを吸収"""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", content).lower()).strip()
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """文字単位のシングル（n-gram）集合"""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash_signature(shingle_set: set) -> List[int]:
+    """シングル集合のMinHash署名"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little") % MERSENNE_PRIME
+        for shingle in shingle_set
+    ]
+    if np is not None:
+        # 全ハッシュ関数を一括で計算
+        values = np.array(hashes, dtype=np.int64)
+        return ((_COEFFICIENTS_A * values + _COEFFICIENTS_B) % MERSENNE_PRIME).min(axis=1).tolist()
+    return [
+        min((a * value + b) % MERSENNE_PRIME for value in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+class _UserEntries:
+    """ユーザーごとの直近ジャーナルのインデックス"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Deque[Tuple[float, JournalSignature, Dict[str, Any]]] = deque()
+        self.by_hash: Dict[str, Dict[str, Any]] = {}
+        self.by_id: Dict[Any, JournalSignature] = {}
+        self.buckets: Dict[Tuple[int, int], List[Tuple[JournalSignature, Dict[str, Any]]]] = {}
+
+class JournalDedupIndex:
+    """直近ジャーナルの重複検出インデックス（ユーザー単位・時間窓付き）"""
+
+    def __init__(
+        self,
+        window: int = JOURNAL_DEDUP_WINDOW,
+        threshold: float = JOURNAL_DEDUP_THRESHOLD,
+        mode: str = JOURNAL_DEDUP_MODE
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.mode = mode
+        self._users: Dict[int, _UserEntries] = {}
+        self._users_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def guard(self, user_id: int) -> threading.Lock:
+        """同一ユーザーの確認〜登録を直列化するためのロック"""
+        return self._get_user(user_id).lock
+
+    def find_duplicate(self, user_id: int, signature: JournalSignature) -> Optional[Dict[str, Any]]:
+        """時間窓内の完全一致または類似ジャーナルを返す"""
+        user = self._get_user(user_id)
+        self._evict(user)
+
+        journal = user.by_hash.get(signature.content_hash)
+        if journal is not None:
+            return journal
+
+        # 同じバンドに入った候補のみ類似度を確認
+        checked = set()
+        for band in signature.bands:
+            for candidate, journal in user.buckets.get(band, []):
+                if id(candidate) in checked:
+                    continue
+                checked.add(id(candidate))
+                if signature.similarity(candidate) >= self.threshold:
+                    return journal
+        return None
+
+    def add(self, user_id: int, signature: JournalSignature, journal: Dict[str, Any]):
+        """作成したジャーナルを登録"""
+        user = self._get_user(user_id)
+        user.entries.append((time.time(), signature, journal))
+        user.by_hash[signature.content_hash] = journal
+        if journal.get("id") is not None:
+            user.by_id[journal["id"]] = signature
+        for band in signature.bands:
+            user.buckets.setdefault(band, []).append((signature, journal))
+
+    def remove(self, user_id: int, journal_id: Any):
+        """削除されたジャーナルを登録から外す"""
+        user = self._get_user(user_id)
+        with user.lock:
+            signature = user.by_id.get(journal_id)
+            if signature is None:
+                return
+            for entry in user.entries:
+                if entry[1] is signature:
+                    user.entries.remove(entry)
+                    self._drop(user, signature, entry[2])
+                    break
+
+    def create(self, user_id: int, content: str, insert: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """重複を確認してからinsertを実行（collapseでは既存のジャーナルを返す）"""
+        if not self.enabled:
+            return insert()
+
+        signature = JournalSignature(content)
+        with self.guard(user_id):
+            duplicate = self.find_duplicate(user_id, signature)
+            if duplicate is not None:
+                if self.mode == "reject":
+                    raise ConflictError(
+                        "同じ内容のジャーナルが既に記録されています",
+                        {"duplicate_of": duplicate.get("id")}
+                    )
+                return {**duplicate, "duplicate": True}
+
+            journal = insert()
+            if journal:
+                self.add(user_id, signature, journal)
+            return journal
+
+    def _evict(self, user: _UserEntries):
+        """時間窓を過ぎたエントリを削除"""
+        cutoff = time.time() - self.window
+        while user.entries and user.entries[0][0] < cutoff:
+            _, signature, journal = user.entries.popleft()
+            self._drop(user, signature, journal)
+
+    def _drop(self, user: _UserEntries, signature: JournalSignature, journal: Dict[str, Any]):
+        """エントリのハッシュ・ID・バケットへの登録を削除"""
+        if user.by_hash.get(signature.content_hash) is journal:
+            del user.by_hash[signature.content_hash]
+        if user.by_id.get(journal.get("id")) is signature:
+            del user.by_id[journal["id"]]
+        for band in signature.bands:
+            bucket = [entry for entry in user.buckets.get(band, []) if entry[0] is not signature]
+            if bucket:
+                user.buckets[band] = bucket
+            else:
+                user.buckets.pop(band, None)
+
+    def _get_user(self, user_id: int) -> _UserEntries:
+        with self._users_lock:
+            return self._users.setdefault(user_id, _UserEntries())
+
+# グローバル重複検出インスタンス
+journal_dedup_index = JournalDedupIndex()
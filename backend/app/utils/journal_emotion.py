@@ -0,0 +1,109 @@
+"""
+ジャーナル感情タグ付け
+ジャーナル保存時に一度だけ感情・危機キーワードを解析し、集計用のラベルを作成する
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.ai_engine import LightweightAIEngine
+
+# 対話エンジンと同じキーワード定義を使用
+_keyword_source = LightweightAIEngine()
+EMOTION_KEYWORDS = {
+    emotion: sorted(set(keywords)) for emotion, keywords in _keyword_source.emotion_keywords.items()
+}
+CRISIS_KEYWORDS = sorted(set(_keyword_source.crisis_keywords))
+
+# 感情ごとの極性（感情スコアの算出用）
+EMOTION_POLARITY = {
+    "喜び": 1.0,
+    "不安": -1.0,
+    "怒り": -1.0,
+    "悲しみ": -1.0,
+    "疲労": -0.5
+}
+
+UNKNOWN_EMOTION = "不明"
+CRISIS_EMOTION = "危機的状況"
+
+TIMELINE_INTERVALS = ("day", "week", "month")
+
+def analyze_journal_emotion(content: str) -> Dict[str, Any]:
+    """ジャーナル本文から感情ラベル・キーワード一致数・感情スコア・危機フラグを算出"""
+    text = content.lower()
+
+    scores = {}
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in text)
+        if score > 0:
+            scores[emotion] = score
+
+    crisis_detected = any(keyword in text for keyword in CRISIS_KEYWORDS)
+
+    if crisis_detected:
+        emotion = CRISIS_EMOTION
+    elif scores:
+        emotion = max(scores.items(), key=lambda item: item[1])[0]
+    else:
+        emotion = UNKNOWN_EMOTION
+
+    # 一致数で重み付けした極性の平均（-1.0〜1.0）
+    total = sum(scores.values())
+    sentiment_score = (
+        round(sum(EMOTION_POLARITY.get(name, 0.0) * score for name, score in scores.items()) / total, 3)
+        if total else 0.0
+    )
+    if crisis_detected:
+        sentiment_score = -1.0
+
+    return {
+        "emotion": emotion,
+        "emotion_scores": scores,
+        "sentiment_score": sentiment_score,
+        "crisis_detected": crisis_detected
+    }
+
+def _bucket_start(created_at: str, interval: str) -> str:
+    """作成日時を集計単位の開始日に丸める"""
+    date = datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).date()
+    if interval == "week":
+        date = date.fromordinal(date.toordinal() - date.weekday())
+    elif interval == "month":
+        date = date.replace(day=1)
+    return date.isoformat()
+
+def build_emotion_timeline(rows: Iterable[Dict[str, Any]], interval: str = "day") -> List[Dict[str, Any]]:
+    """感情ラベルを期間ごとに集計（件数・感情別件数・平均感情スコア・危機件数）"""
+    buckets: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"count": 0, "emotions": defaultdict(int), "sentiment_total": 0.0, "crisis_count": 0}
+    )
+
+    for row in rows:
+        if not row.get("created_at"):
+            continue
+        bucket = buckets[_bucket_start(row["created_at"], interval)]
+        bucket["count"] += 1
+        bucket["emotions"][row.get("emotion") or UNKNOWN_EMOTION] += 1
+        bucket["sentiment_total"] += row.get("sentiment_score") or 0.0
+        if row.get("crisis_detected"):
+            bucket["crisis_count"] += 1
+
+    return [
+        {
+            "period_start": period_start,
+            "count": bucket["count"],
+            "emotions": dict(bucket["emotions"]),
+            "average_sentiment": round(bucket["sentiment_total"] / bucket["count"], 3),
+            "crisis_count": bucket["crisis_count"]
+        }
+        for period_start, bucket in sorted(buckets.items())
+    ]
+
+def with_emotion_tags(entry: Dict[str, Any], emotion: Optional[str] = None) -> Dict[str, Any]:
+    """挿入する行に感情タグを付与（emotionが指定された場合はラベルのみ上書き）"""
+    tags = analyze_journal_emotion(entry["content"])
+    if emotion:
+        tags["emotion"] = emotion
+    return {**entry, **tags}
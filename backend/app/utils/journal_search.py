@@ -0,0 +1,254 @@
+"""
+ジャーナル全文検索
+日本語向けのバイグラム転置インデックス（SQLite FTS5）でジャーナルを検索する
+"""
+
+import html
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+# 環境変数を読み込み
+load_dotenv()
+
+JOURNAL_SEARCH_DB_PATH = os.getenv("JOURNAL_SEARCH_DB_PATH", "data/journal_search.db")
+JOURNAL_SEARCH_PAGE_SIZE = int(os.getenv("JOURNAL_SEARCH_PAGE_SIZE", "500"))
+JOURNAL_SEARCH_SYNC_INDEX_LIMIT = int(os.getenv("JOURNAL_SEARCH_SYNC_INDEX_LIMIT", "2000"))
+
+SNIPPET_CHARS = 40
+MAX_QUERY_TERMS = 10
+
+# 文字・数字の連続（句読点や空白で区切る）
+WORD_PATTERN = re.compile(r"\w+")
+
+def normalize_text(text: str) -> str:
+    """全角・半角や大文字・小文字の違いを吸収"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+def to_bigrams(text: str) -> List[str]:
+    """テキストをバイグラムのトークン列に変換
+
+    各語の末尾の1文字も加えるため、1文字の検索語は前方一致でどの位置にも一致する。
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall(normalize_text(text)):
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return tokens
+
+def build_match_query(query: str) -> Optional[str]:
+    """検索語（空白区切りはAND）をFTS5のMATCH式に変換"""
+    clauses = []
+    for word in WORD_PATTERN.findall(normalize_text(query))[:MAX_QUERY_TERMS]:
+        if len(word) == 1:
+            clauses.append(f'"{word}"*')
+        else:
+            # 連続するバイグラムのフレーズ＝部分文字列一致
+            clauses.append('"' + " ".join(word[i:i + 2] for i in range(len(word) - 1)) + '"')
+    if not clauses:
+        return None
+    return "grams:(" + " AND ".join(clauses) + ")"
+
+def highlight(content: str, query: str) -> Tuple[str, List[List[int]]]:
+    """検索語の出現位置と、前後を切り出して<mark>で囲んだスニペットを返す"""
+    terms = sorted({term for term in query.split() if term}, key=len, reverse=True)
+    if not terms:
+        return html.escape(content[:SNIPPET_CHARS * 2]), []
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    matches = [[match.start(), match.end()] for match in pattern.finditer(content)]
+    if not matches:
+        return html.escape(content[:SNIPPET_CHARS * 2]), []
+
+    start = max(0, matches[0][0] - SNIPPET_CHARS)
+    end = min(len(content), matches[0][1] + SNIPPET_CHARS)
+    parts = ["…" if start > 0 else ""]
+    position = start
+    for match_start, match_end in matches:
+        if match_start < position or match_end > end:
+            continue
+        parts.append(html.escape(content[position:match_start]))
+        parts.append(f"<mark>{html.escape(content[match_start:match_end])}</mark>")
+        position = match_end
+    parts.append(html.escape(content[position:end]))
+    parts.append("…" if end < len(content) else "")
+    return "".join(parts), matches
+
+class JournalSearchIndex:
+    """ユーザーごとのジャーナル検索インデックス"""
+
+    def __init__(self, path: str = JOURNAL_SEARCH_DB_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._backfilling: Set[int] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS journal_docs (
+                    journal_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS indexed_users (
+                    user_id INTEGER PRIMARY KEY,
+                    last_journal_id INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+                    user_key, grams, tokenize = 'unicode61 remove_diacritics 0'
+                );
+            """)
+            # 取り込み位置の列が無い既存のインデックスは列を追加（次回検索時に全件を取り込み直す）
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(indexed_users)")}
+            if "last_journal_id" not in columns:
+                conn.execute("ALTER TABLE indexed_users ADD COLUMN last_journal_id INTEGER NOT NULL DEFAULT 0")
+                conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, journals: Iterable[Dict[str, Any]]):
+        """ジャーナルをインデックスに追加（同じIDは置き換え）"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for journal in journals:
+                    journal_id = journal["id"]
+                    conn.execute("DELETE FROM journal_fts WHERE rowid = ?", (journal_id,))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO journal_docs (journal_id, user_id, content, created_at) VALUES (?, ?, ?, ?)",
+                        (journal_id, journal["user_id"], journal["content"], str(journal.get("created_at") or ""))
+                    )
+                    conn.execute(
+                        "INSERT INTO journal_fts (rowid, user_key, grams) VALUES (?, ?, ?)",
+                        (journal_id, f"u{journal['user_id']}", " ".join(to_bigrams(journal["content"])))
+                    )
+
+    def remove(self, journal_id: int):
+        """ジャーナルをインデックスから削除"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM journal_fts WHERE rowid = ?", (journal_id,))
+                conn.execute("DELETE FROM journal_docs WHERE journal_id = ?", (journal_id,))
+
+    def _indexed_up_to(self, user_id: int) -> int:
+        """取り込み済みのジャーナルIDの最大値"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT last_journal_id FROM indexed_users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row["last_journal_id"] if row else 0
+
+    def _index_since(self, user_id: int, after_id: int, limit: Optional[int] = None) -> Tuple[int, bool]:
+        """after_idより後のジャーナルをID順に取り込み、取り込み位置を進める（limit件で打ち切った場合はFalse）"""
+        from app.database.supabase_db import SupabaseDB
+
+        count = 0
+        while True:
+            page = SupabaseDB.get_user_journals_page(user_id, after_id, JOURNAL_SEARCH_PAGE_SIZE)
+            if page:
+                self.add(page)
+                after_id = page[-1]["id"]
+                count += len(page)
+                with self._lock:
+                    conn = self._connect()
+                    with conn:
+                        conn.execute(
+                            "INSERT INTO indexed_users (user_id, last_journal_id) VALUES (?, ?) "
+                            "ON CONFLICT(user_id) DO UPDATE SET last_journal_id = MAX(last_journal_id, excluded.last_journal_id)",
+                            (user_id, after_id)
+                        )
+            if len(page) < JOURNAL_SEARCH_PAGE_SIZE:
+                return count, True
+            if limit is not None and count >= limit:
+                return count, False
+
+    def _backfill(self, user_id: int):
+        """残りのジャーナルをバックグラウンドで取り込む"""
+        try:
+            count, _ = self._index_since(user_id, self._indexed_up_to(user_id))
+            logger.info(f"ジャーナル検索インデックスの取り込みが完了しました: user_id={user_id} ({count}件)")
+        except Exception as e:
+            logger.error(f"ジャーナル検索インデックスの取り込みエラー: user_id={user_id}", e)
+        finally:
+            with self._lock:
+                self._backfilling.discard(user_id)
+
+    def ensure_user_indexed(self, user_id: int) -> bool:
+        """前回の取り込み以降のジャーナルを検索前に取り込む（取り込みが完了していればTrue）
+
+        他のワーカーでの作成やインデックス更新の失敗で取りこぼした分もここで補う。
+        件数が多い場合（初回の全履歴など）は上限まで取り込み、残りはバックグラウンドで続ける。
+        """
+        with self._lock:
+            if user_id in self._backfilling:
+                return False
+
+        count, complete = self._index_since(user_id, self._indexed_up_to(user_id), JOURNAL_SEARCH_SYNC_INDEX_LIMIT)
+        if count:
+            logger.info(f"ジャーナル検索インデックスに取り込みました: user_id={user_id} ({count}件)")
+        if complete:
+            return True
+
+        with self._lock:
+            if user_id in self._backfilling:
+                return False
+            self._backfilling.add(user_id)
+        threading.Thread(target=self._backfill, args=(user_id,), name=f"journal-index-{user_id}", daemon=True).start()
+        return False
+
+    def search(self, user_id: int, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """スコア順に検索し、ハイライト付きの結果を返す"""
+        match_query = build_match_query(query)
+        if match_query is None:
+            return {"results": [], "total_count": 0}
+
+        match_query = f'user_key:"u{user_id}" AND {match_query}'
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute(
+                "SELECT COUNT(*) FROM journal_fts WHERE journal_fts MATCH ?", (match_query,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                """
+                SELECT d.journal_id, d.user_id, d.content, d.created_at, bm25(journal_fts, 0.0, 1.0) AS score
+                FROM journal_fts
+                JOIN journal_docs d ON d.journal_id = journal_fts.rowid
+                WHERE journal_fts MATCH ?
+                ORDER BY score, d.created_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (match_query, limit, offset)
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            snippet, matches = highlight(row["content"], query)
+            results.append({
+                "id": row["journal_id"],
+                "user_id": row["user_id"],
+                "content": row["content"],
+                "created_at": row["created_at"],
+                # bm25は小さいほど関連度が高いため符号を反転
+                "score": round(-row["score"], 4),
+                "snippet": snippet,
+                "highlights": matches
+            })
+
+        return {"results": results, "total_count": total}
+
+# グローバル検索インデックスインスタンス
+journal_search_index = JournalSearchIndex()
@@ -0,0 +1,108 @@
+"""
+ジャーナルの一括インポート・エクスポート
+NDJSONを行単位で読み込み、DBはページ単位で読み出すため履歴の量に関係なくメモリ使用量は一定
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+from app.database.supabase_db import SupabaseDB
+
+# 環境変数を読み込み
+load_dotenv()
+
+JOURNAL_IMPORT_BATCH_SIZE = int(os.getenv("JOURNAL_IMPORT_BATCH_SIZE", "500"))
+JOURNAL_EXPORT_PAGE_SIZE = int(os.getenv("JOURNAL_EXPORT_PAGE_SIZE", "500"))
+JOURNAL_IMPORT_MAX_LINE_BYTES = int(os.getenv("JOURNAL_IMPORT_MAX_LINE_BYTES", "65536"))
+JOURNAL_IMPORT_MAX_ERRORS = 100
+
+EXPORT_FIELDS = ["id", "content", "created_at"]
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = JOURNAL_IMPORT_MAX_LINE_BYTES
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """受信したバイト列を行に分割し、空行を除いて(行番号, 行)を順に返す（長すぎる行は読み捨ててNoneを返す）"""
+    buffer = b""
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if oversized or len(line) > max_line_bytes:
+                oversized = False
+                yield line_number, None
+            elif line.strip():
+                yield line_number, line
+        # 改行が来るまでの行は上限を超えた時点で破棄（残りは次の改行まで読み捨てる）
+        if len(buffer) > max_line_bytes:
+            oversized = True
+            buffer = b""
+    if oversized:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, buffer
+
+def parse_import_line(line: Optional[bytes], validate_content: Callable[[str], bool]) -> Dict[str, Any]:
+    """1行分のNDJSONをジャーナル行に変換（不正な場合はValueError）"""
+    if line is None:
+        raise ValueError(f"1行は{JOURNAL_IMPORT_MAX_LINE_BYTES}バイト以下である必要があります")
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError("JSONとして解析できません")
+    if not isinstance(record, dict):
+        raise ValueError("各行はJSONオブジェクトである必要があります")
+
+    content = record.get("content")
+    if not isinstance(content, str) or not validate_content(content):
+        raise ValueError("ジャーナル内容は10文字以上10,000文字以下である必要があります")
+
+    entry = {"content": content}
+    created_at = record.get("created_at")
+    if created_at is not None:
+        try:
+            entry["created_at"] = datetime.fromisoformat(str(created_at)).isoformat()
+        except ValueError:
+            raise ValueError("created_atはISO 8601形式である必要があります")
+    return entry
+
+def iter_user_journals(user_id: int, page_size: int = JOURNAL_EXPORT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """ユーザーのジャーナルをID順にページングしながら返す"""
+    after_id: Optional[int] = None
+    while True:
+        page = SupabaseDB.get_user_journals_page(user_id, after_id, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
+
+def export_ndjson(journals: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """ジャーナルをNDJSONとして1行ずつ出力"""
+    for journal in journals:
+        record = {field: journal.get(field) for field in EXPORT_FIELDS}
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+def export_csv(journals: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """ジャーナルをCSV（Excel向けにBOM付きUTF-8）として1行ずつ出力"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data.encode("utf-8")
+
+    writer.writerow(EXPORT_FIELDS)
+    yield "\ufeff".encode("utf-8") + flush()
+    for journal in journals:
+        writer.writerow([journal.get(field) for field in EXPORT_FIELDS])
+        yield flush()
@@ -3,6 +3,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import random
 from app.database.supabase_db import SupabaseDB
+from app.utils.audio_metadata import audio_metadata_index
+from app.utils.content_catalog import ContentCatalog, load_catalog_items
 
 class MeditationGuide:
     """瞑想・マインドフルネスガイドシステム"""
@@ -66,6 +68,16 @@ class MeditationGuide:
             }
         }
         
+        # データファイルの追加セッションを読み込み
+        for session in load_catalog_items("meditation_sessions.json"):
+            self.meditation_sessions[session.get("key", session["id"])] = session
+        
+        # 解析済みの長さ・ラウドネスを反映
+        audio_metadata_index.annotate(self.meditation_sessions.values())
+        
+        # 絞り込み用のインデックス
+        self.catalog = ContentCatalog(self.meditation_sessions.values())
+        
         # カテゴリ別推奨
         self.category_recommendations = {
             "beginner": ["breathing", "focus", "gratitude"],
@@ -90,17 +102,32 @@ class MeditationGuide:
     
     def get_sessions_by_category(self, category: str) -> List[Dict[str, Any]]:
         """カテゴリ別に瞑想セッションを取得"""
-        return [
-            session for session in self.meditation_sessions.values()
-            if session["category"] == category
-        ]
+        return self.catalog.by_category(category)
     
     def get_sessions_by_duration(self, max_duration: int) -> List[Dict[str, Any]]:
         """時間制限で瞑想セッションを取得"""
-        return [
-            session for session in self.meditation_sessions.values()
-            if session["duration"] <= max_duration
-        ]
+        return self.catalog.by_duration(max_duration=max_duration)
+    
+    def search_sessions(
+        self,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        duration_bucket: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """複数条件で瞑想セッションを検索"""
+        return self.catalog.query(
+            category=category,
+            tags=tags,
+            min_duration=min_duration,
+            max_duration=max_duration,
+            duration_bucket=duration_bucket,
+            limit=limit,
+            offset=offset
+        )
     
     def get_personalized_recommendations(self, user_id: int, context: str = None) -> List[Dict[str, Any]]:
         """パーソナライズされた推奨セッションを取得"""
@@ -0,0 +1,346 @@
+"""
+ポモドーロセッションストア
+session_idをキーにサーバー側でセッション状態を保持する
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+# 環境変数を読み込み
+load_dotenv()
+
+# セッションストア設定
+POMODORO_SESSION_TTL = int(os.getenv("POMODORO_SESSION_TTL", "14400"))  # 4時間
+POMODORO_SESSION_BACKEND = os.getenv("POMODORO_SESSION_BACKEND", "memory")  # "memory" or "file"
+POMODORO_SESSION_DIR = os.getenv("POMODORO_SESSION_DIR", "data/pomodoro_sessions")
+POMODORO_WAIT_TIMEOUT = int(os.getenv("POMODORO_WAIT_TIMEOUT", "25"))  # ロングポーリングの最大待機秒数
+POMODORO_WAIT_POLL_INTERVAL = float(os.getenv("POMODORO_WAIT_POLL_INTERVAL", "1"))  # 共有バックエンドで他プロセスの変更を確認する間隔
+
+class PomodoroSessionState:
+    """ポモドーロセッションの状態（__slots__で省メモリ化）"""
+
+    FIELDS = (
+        "session_id",
+        "user_id",
+        "settings",
+        "current_state",
+        "current_cycle",
+        "total_cycles",
+        "total_focus_time",
+        "total_break_time",
+        "total_pause_time",
+        "total_duration",
+        "start_time",
+        "end_time",
+        "pause_time",
+        "resume_time",
+        "created_at",
+        "status",
+        "events",
+        "event_count",
+        "phase_started_at",
+        "phase_active_time",
+        "segment_started_at",
+        "paused_from"
+    )
+
+    __slots__ = FIELDS + ("last_access",)
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+        self.last_access = fields.get("last_access") or time.time()
+
+    @classmethod
+    def from_dict(cls, session_data: Dict[str, Any]) -> "PomodoroSessionState":
+        """辞書から状態を生成"""
+        return cls(**session_data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """APIレスポンス用の辞書に変換"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def update(self, session_data: Dict[str, Any]):
+        """辞書の内容で状態を更新"""
+        for name in self.FIELDS:
+            if name in session_data:
+                setattr(self, name, session_data[name])
+
+    def touch(self):
+        """最終アクセス時刻を更新"""
+        self.last_access = time.time()
+
+    def is_expired(self, ttl: int, now: Optional[float] = None) -> bool:
+        """有効期限切れかどうか"""
+        return ((now or time.time()) - self.last_access) > ttl
+
+class SessionBackend:
+    """セッション永続化バックエンドの基底クラス"""
+
+    # 複数プロセスから同じセッションを読み書きするか（Trueの場合は取得時にversionで変更を確認）
+    shared = False
+
+    def version(self, session_id: str) -> Optional[Any]:
+        """保存されているセッションのバージョン（存在しない場合はNone）"""
+        return None
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """セッションを読み込み"""
+        return None
+
+    def save(self, session_data: Dict[str, Any]):
+        """セッションを保存"""
+        pass
+
+    def delete(self, session_id: str):
+        """セッションを削除"""
+        pass
+
+class MemorySessionBackend(SessionBackend):
+    """プロセス内メモリのみ（永続化なし）"""
+    pass
+
+class FileSessionBackend(SessionBackend):
+    """JSONファイルによる永続化（再起動後も復元可能、複数ワーカーで共有）"""
+
+    shared = True
+
+    def __init__(self, directory: str = POMODORO_SESSION_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        # パス操作を防ぐためファイル名に使えない文字を除去
+        safe_id = "".join(c for c in session_id if c.isalnum() or c in "_-")
+        return os.path.join(self.directory, f"{safe_id}.json")
+
+    def version(self, session_id: str) -> Optional[Any]:
+        # 保存はos.replaceで置き換えるため、inodeと更新時刻の組で変更を検知できる
+        try:
+            stat = os.stat(self._path(session_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"ポモドーロセッション読み込みエラー: {session_id}", e)
+            return None
+
+    def save(self, session_data: Dict[str, Any]):
+        path = self._path(session_data["session_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session_data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+class PomodoroSessionStore:
+    """session_idをキーとするポモドーロセッションのレジストリ"""
+
+    def __init__(self, backend: Optional[SessionBackend] = None, ttl: int = POMODORO_SESSION_TTL):
+        self.backend = backend or MemorySessionBackend()
+        self.ttl = ttl
+        self._sessions: Dict[str, PomodoroSessionState] = {}
+        self._user_sessions: Dict[int, str] = {}
+        # 共有バックエンドで最後に読み書きしたバージョン（session_id -> version）
+        self._versions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = max(1, ttl // 10)
+        self._last_sweep = time.time()
+        # 状態変更を待つロングポーリング（session_id -> (イベントループ, Future)）
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._waiters_lock = threading.Lock()
+
+    def create(self, session_data: Dict[str, Any]) -> PomodoroSessionState:
+        """セッションを登録（ユーザーごとにアクティブなセッションは1つ）"""
+        state = PomodoroSessionState.from_dict(session_data)
+        with self._lock:
+            self._maybe_sweep()
+            previous_id = self._user_sessions.get(state.user_id)
+            if previous_id and previous_id != state.session_id:
+                self._discard(previous_id)
+                logger.info(f"既存のポモドーロセッションを破棄: {previous_id}")
+            self._sessions[state.session_id] = state
+            self._user_sessions[state.user_id] = state.session_id
+        self._save(state)
+        self.notify(state.session_id)
+        return state
+
+    def get(self, session_id: str) -> Optional[PomodoroSessionState]:
+        """セッションを取得（期限切れの場合はNone）"""
+        with self._lock:
+            self._maybe_sweep()
+            state = self._sessions.get(session_id)
+            if state is not None and self.backend.shared:
+                # 他のワーカーで変更・削除されていれば読み直す
+                version = self.backend.version(session_id)
+                if version is None:
+                    self._forget(session_id)
+                    return None
+                if version != self._versions.get(session_id):
+                    state = self._restore(session_id)
+            if state is None:
+                state = self._restore(session_id)
+            if state is None:
+                return None
+            if state.is_expired(self.ttl):
+                self._discard(session_id)
+                return None
+            state.touch()
+            return state
+
+    def get_active_for_user(self, user_id: int) -> Optional[PomodoroSessionState]:
+        """ユーザーのアクティブなセッションを取得"""
+        with self._lock:
+            session_id = self._user_sessions.get(user_id)
+        return self.get(session_id) if session_id else None
+
+    def save(self, state: PomodoroSessionState):
+        """状態の変更を永続化バックエンドに反映"""
+        state.touch()
+        self._save(state)
+        self.notify(state.session_id)
+
+    def remove(self, session_id: str):
+        """セッションを削除"""
+        with self._lock:
+            self._discard(session_id)
+        self.notify(session_id)
+
+    def watch(self, session_id: str) -> asyncio.Future:
+        """次の状態変更で完了するFutureを登録（イベントループ内から呼び出す）"""
+        future = asyncio.get_running_loop().create_future()
+        with self._waiters_lock:
+            self._waiters.setdefault(session_id, []).append((future.get_loop(), future))
+        return future
+
+    async def wait(self, session_id: str, change: asyncio.Future, timeout: float):
+        """watchのFutureが完了するかtimeout秒経過するまで待機
+        共有バックエンドでは他のワーカーでの保存も通知されないため、バージョンを定期的に確認する
+        """
+        deadline = time.monotonic() + timeout
+        interval = POMODORO_WAIT_POLL_INTERVAL if self.backend.shared else timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(asyncio.shield(change), min(interval, remaining))
+                return
+            except asyncio.TimeoutError:
+                if self.backend.shared and self._changed_elsewhere(session_id):
+                    return
+
+    def unwatch(self, session_id: str, future: asyncio.Future):
+        """待機を解除"""
+        with self._waiters_lock:
+            waiters = [waiter for waiter in self._waiters.get(session_id, []) if waiter[1] is not future]
+            if waiters:
+                self._waiters[session_id] = waiters
+            else:
+                self._waiters.pop(session_id, None)
+
+    def notify(self, session_id: str):
+        """状態変更を待機中のリクエストに通知（どのスレッドからでも呼び出し可能）"""
+        with self._waiters_lock:
+            waiters = self._waiters.pop(session_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def evict_expired(self) -> int:
+        """期限切れセッションを削除し、削除件数を返す"""
+        with self._lock:
+            return self._evict_expired()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _persisted(self, state: PomodoroSessionState) -> Dict[str, Any]:
+        data = state.to_dict()
+        data["last_access"] = state.last_access
+        return data
+
+    def _save(self, state: PomodoroSessionState):
+        self.backend.save(self._persisted(state))
+        if self.backend.shared:
+            version = self.backend.version(state.session_id)
+            with self._lock:
+                self._versions[state.session_id] = version
+
+    def _changed_elsewhere(self, session_id: str) -> bool:
+        version = self.backend.version(session_id)
+        with self._lock:
+            return version != self._versions.get(session_id)
+
+    def _restore(self, session_id: str) -> Optional[PomodoroSessionState]:
+        version = self.backend.version(session_id) if self.backend.shared else None
+        data = self.backend.load(session_id)
+        if not data:
+            self._forget(session_id)
+            return None
+        state = PomodoroSessionState.from_dict(data)
+        self._sessions[session_id] = state
+        self._versions[session_id] = version
+        if state.status == "active":
+            self._user_sessions.setdefault(state.user_id, session_id)
+        return state
+
+    def _forget(self, session_id: str):
+        """このプロセスのキャッシュからのみ削除"""
+        state = self._sessions.pop(session_id, None)
+        self._versions.pop(session_id, None)
+        if state is not None and self._user_sessions.get(state.user_id) == session_id:
+            del self._user_sessions[state.user_id]
+
+    def _discard(self, session_id: str):
+        self._forget(session_id)
+        self.backend.delete(session_id)
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep >= self._sweep_interval:
+            self._evict_expired(now)
+
+    def _evict_expired(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        self._last_sweep = now
+        expired: List[str] = [
+            session_id for session_id, state in self._sessions.items()
+            if state.is_expired(self.ttl, now)
+        ]
+        for session_id in expired:
+            self._discard(session_id)
+        if expired:
+            logger.info(f"期限切れポモドーロセッションを削除: {len(expired)}件")
+        return len(expired)
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+def create_session_store() -> PomodoroSessionStore:
+    """設定に応じたバックエンドでストアを作成"""
+    if POMODORO_SESSION_BACKEND == "file":
+        return PomodoroSessionStore(FileSessionBackend())
+    return PomodoroSessionStore(MemorySessionBackend())
+
+# グローバルストアインスタンス
+pomodoro_store = create_session_store()
@@ -1,12 +1,24 @@
 import json
+import os
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import random
+from dotenv import load_dotenv
 from app.database.supabase_db import SupabaseDB
 
+# 環境変数を読み込み
+load_dotenv()
+
+# セッションに保持する直近のイベント数（バージョンはevent_countで数える）
+POMODORO_MAX_EVENTS = int(os.getenv("POMODORO_MAX_EVENTS", "20"))
+
 class PomodoroTimer:
     """ポモドーロタイマーシステム"""
     
+    # 時間を計測する状態
+    ACTIVE_STATES = ("focus", "break", "long_break")
+    
     def __init__(self):
         # デフォルト設定
         self.default_settings = {
@@ -42,28 +54,43 @@ class PomodoroTimer:
             "total_cycles": 0,
             "total_focus_time": 0,
             "total_break_time": 0,
+            "total_pause_time": 0,
             "start_time": None,
             "end_time": None,
             "pause_time": None,
             "resume_time": None,
             "created_at": datetime.now().isoformat(),
-            "status": "active"
+            "status": "active",
+            # イベントログと累計計算用の状態
+            "events": [],
+            "event_count": 0,              # これまでのイベント数（スケジュールのバージョン）
+            "phase_started_at": None,      # 現在のフェーズの開始時刻（epoch秒）
+            "phase_active_time": 0,        # 現在のフェーズの経過時間（一時停止を除く）
+            "segment_started_at": None,    # 現在の区間（実行中/一時停止中）の開始時刻
+            "paused_from": None            # 一時停止前の状態
         }
         
         return session_data
     
     def start_focus_session(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """集中セッションを開始"""
+        now = time.time()
+        self._close_segment(session_data, now)
+        
         session_data["current_state"] = self.session_states["focus"]
         session_data["current_cycle"] += 1
         session_data["start_time"] = datetime.now().isoformat()
         session_data["pause_time"] = None
         session_data["resume_time"] = None
+        self._start_phase(session_data, now)
         
         return session_data
     
     def start_break_session(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """休憩セッションを開始"""
+        now = time.time()
+        self._close_segment(session_data, now)
+        
         # 長い休憩かどうかを判定
         if session_data["current_cycle"] % session_data["settings"]["cycles_before_long_break"] == 0:
             session_data["current_state"] = self.session_states["long_break"]
@@ -73,34 +100,44 @@ class PomodoroTimer:
         session_data["start_time"] = datetime.now().isoformat()
         session_data["pause_time"] = None
         session_data["resume_time"] = None
+        self._start_phase(session_data, now)
         
         return session_data
     
     def pause_session(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """セッションを一時停止"""
-        if session_data["current_state"] in [self.session_states["focus"], self.session_states["break"], self.session_states["long_break"]]:
+        if session_data["current_state"] in self.ACTIVE_STATES:
+            now = time.time()
+            self._close_segment(session_data, now)
+            
+            session_data["paused_from"] = session_data["current_state"]
             session_data["current_state"] = self.session_states["paused"]
             session_data["pause_time"] = datetime.now().isoformat()
+            session_data["resume_time"] = None
+            self._record_event(session_data, "pause", now)
         
         return session_data
     
     def resume_session(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """セッションを再開"""
         if session_data["current_state"] == self.session_states["paused"]:
-            # 元の状態に戻す
-            if session_data["current_cycle"] % session_data["settings"]["cycles_before_long_break"] == 0:
-                session_data["current_state"] = self.session_states["long_break"]
-            elif session_data["current_cycle"] % 2 == 1:  # 奇数サイクルは休憩
-                session_data["current_state"] = self.session_states["break"]
-            else:
-                session_data["current_state"] = self.session_states["focus"]
+            now = time.time()
+            self._close_segment(session_data, now)
             
+            # 一時停止前の状態に戻す
+            session_data["current_state"] = session_data.get("paused_from") or self.session_states["focus"]
+            session_data["paused_from"] = None
             session_data["resume_time"] = datetime.now().isoformat()
+            self._record_event(session_data, "resume", now)
         
         return session_data
     
     def complete_session(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """セッションを完了"""
+        now = time.time()
+        self._close_segment(session_data, now)
+        self._record_event(session_data, "complete", now)
+        
         session_data["end_time"] = datetime.now().isoformat()
         session_data["status"] = "completed"
         
@@ -114,7 +151,7 @@ class PomodoroTimer:
     
     def get_session_progress(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """セッションの進行状況を取得"""
-        if not session_data["start_time"]:
+        if not session_data.get("phase_started_at"):
             return {
                 "state": session_data["current_state"],
                 "cycle": session_data["current_cycle"],
@@ -123,28 +160,12 @@ class PomodoroTimer:
                 "progress_percentage": 0
             }
         
-        start_time = datetime.fromisoformat(session_data["start_time"])
-        current_time = datetime.now()
-        
-        # 一時停止時間を考慮
-        pause_duration = 0
-        if session_data["pause_time"] and session_data["resume_time"]:
-            pause_start = datetime.fromisoformat(session_data["pause_time"])
-            pause_end = datetime.fromisoformat(session_data["resume_time"])
-            pause_duration = (pause_end - pause_start).total_seconds()
-        elif session_data["pause_time"] and not session_data["resume_time"]:
-            pause_start = datetime.fromisoformat(session_data["pause_time"])
-            pause_duration = (current_time - pause_start).total_seconds()
+        # 累計値と現在の区間から経過時間を算出（O(1)）
+        elapsed_time = session_data["phase_active_time"]
+        if session_data["current_state"] in self.ACTIVE_STATES:
+            elapsed_time += time.time() - session_data["segment_started_at"]
         
-        elapsed_time = (current_time - start_time).total_seconds() - pause_duration
-        
-        # 現在のセッションの目標時間を取得
-        if session_data["current_state"] == self.session_states["focus"]:
-            target_duration = session_data["settings"]["focus_duration"]
-        elif session_data["current_state"] == self.session_states["long_break"]:
-            target_duration = session_data["settings"]["long_break_duration"]
-        else:
-            target_duration = session_data["settings"]["break_duration"]
+        target_duration = self._get_target_duration(session_data)
         
         remaining_time = max(0, target_duration - elapsed_time)
         progress_percentage = min(100, (elapsed_time / target_duration) * 100) if target_duration > 0 else 0
@@ -155,36 +176,140 @@ class PomodoroTimer:
             "elapsed_time": int(elapsed_time),
             "remaining_time": int(remaining_time),
             "progress_percentage": round(progress_percentage, 1),
-            "target_duration": target_duration
+            "target_duration": target_duration,
+            **self.get_session_totals(session_data)
         }
     
-    def _calculate_session_stats(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
-        """セッション統計を計算"""
-        if not session_data["start_time"] or not session_data["end_time"]:
-            return session_data
+    def get_schedule(self, session_data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """クライアントが進行状況を計算するための予定（状態遷移時点の値、時刻はepoch秒）
+
+        経過時間 = phase_active_time + (running なら サーバー時刻 - segment_started_at)。
+        サーバー時刻はクライアントの時計に server_time との差を加えて求める。
+        """
+        now = now or time.time()
+        phase_started_at = session_data.get("phase_started_at")
+        segment_started_at = session_data.get("segment_started_at")
+        phase_active_time = session_data.get("phase_active_time") or 0
+        running = (
+            phase_started_at is not None
+            and session_data["status"] == "active"
+            and session_data["current_state"] in self.ACTIVE_STATES
+        )
+        target_duration = self._get_target_duration(session_data) if phase_started_at is not None else 0
+        
+        return {
+            "version": self._event_count(session_data),
+            "state": session_data["current_state"],
+            "paused_from": session_data.get("paused_from"),
+            "cycle": session_data["current_cycle"],
+            "running": running,
+            "phase_started_at": phase_started_at,
+            "segment_started_at": segment_started_at,
+            "phase_active_time": phase_active_time,
+            # 現在のフェーズで区間開始までに一時停止していた時間
+            "phase_pause_time": round(max(0.0, segment_started_at - phase_started_at - phase_active_time), 3)
+            if phase_started_at is not None and segment_started_at is not None else 0,
+            "target_duration": target_duration,
+            "ends_at": round(segment_started_at + target_duration - phase_active_time, 3) if running else None,
+            "totals": {
+                "total_focus_time": session_data.get("total_focus_time", 0),
+                "total_break_time": session_data.get("total_break_time", 0),
+                "total_pause_time": session_data.get("total_pause_time", 0)
+            },
+            "server_time": round(now, 3)
+        }
+    
+    def get_session_totals(self, session_data: Dict[str, Any]) -> Dict[str, int]:
+        """現在時点の集中・休憩・一時停止の累計時間を取得"""
+        totals = {
+            "total_focus_time": session_data.get("total_focus_time", 0),
+            "total_break_time": session_data.get("total_break_time", 0),
+            "total_pause_time": session_data.get("total_pause_time", 0)
+        }
         
-        start_time = datetime.fromisoformat(session_data["start_time"])
-        end_time = datetime.fromisoformat(session_data["end_time"])
+        if session_data.get("segment_started_at") and session_data["status"] == "active":
+            key = self._total_key(session_data["current_state"])
+            if key:
+                totals[key] += time.time() - session_data["segment_started_at"]
         
-        # 一時停止時間を考慮
-        pause_duration = 0
-        if session_data["pause_time"] and session_data["resume_time"]:
-            pause_start = datetime.fromisoformat(session_data["pause_time"])
-            pause_end = datetime.fromisoformat(session_data["resume_time"])
-            pause_duration = (pause_end - pause_start).total_seconds()
+        return {key: int(value) for key, value in totals.items()}
+    
+    def _get_target_duration(self, session_data: Dict[str, Any]) -> int:
+        """現在のフェーズの目標時間を取得"""
+        state = session_data["current_state"]
+        if state == self.session_states["paused"]:
+            state = session_data.get("paused_from")
         
-        total_duration = (end_time - start_time).total_seconds() - pause_duration
+        if state == self.session_states["focus"]:
+            return session_data["settings"]["focus_duration"]
+        elif state == self.session_states["long_break"]:
+            return session_data["settings"]["long_break_duration"]
+        else:
+            return session_data["settings"]["break_duration"]
+    
+    def _total_key(self, state: str) -> Optional[str]:
+        """状態に対応する累計フィールド名"""
+        if state == self.session_states["focus"]:
+            return "total_focus_time"
+        if state in (self.session_states["break"], self.session_states["long_break"]):
+            return "total_break_time"
+        if state == self.session_states["paused"]:
+            return "total_pause_time"
+        return None
+    
+    def _close_segment(self, session_data: Dict[str, Any], now: float):
+        """現在の区間を締めて累計時間に加算"""
+        segment_started_at = session_data.get("segment_started_at")
+        if segment_started_at is None or session_data["status"] != "active":
+            return
         
-        # 集中時間と休憩時間を推定
-        focus_cycles = (session_data["current_cycle"] + 1) // 2
-        break_cycles = session_data["current_cycle"] // 2
+        duration = max(0.0, now - segment_started_at)
+        key = self._total_key(session_data["current_state"])
+        if key:
+            session_data[key] = round(session_data.get(key, 0) + duration, 3)
+        if session_data["current_state"] in self.ACTIVE_STATES:
+            session_data["phase_active_time"] = round(session_data["phase_active_time"] + duration, 3)
         
-        estimated_focus_time = focus_cycles * session_data["settings"]["focus_duration"]
-        estimated_break_time = break_cycles * session_data["settings"]["break_duration"]
+        session_data["segment_started_at"] = now
+    
+    def _start_phase(self, session_data: Dict[str, Any], now: float):
+        """新しいフェーズ（集中・休憩）を開始"""
+        event_type = "start" if not self._event_count(session_data) else "phase_change"
+        session_data["phase_started_at"] = now
+        session_data["phase_active_time"] = 0
+        session_data["segment_started_at"] = now
+        session_data["paused_from"] = None
+        self._record_event(session_data, event_type, now)
+    
+    def _record_event(self, session_data: Dict[str, Any], event_type: str, now: float):
+        """イベントログに追記（直近POMODORO_MAX_EVENTS件のみ保持）"""
+        session_data["event_count"] = self._event_count(session_data) + 1
+        session_data["events"].append({
+            "type": event_type,
+            "state": session_data["current_state"],
+            "cycle": session_data["current_cycle"],
+            "at": round(now, 3)
+        })
+        if len(session_data["events"]) > POMODORO_MAX_EVENTS:
+            del session_data["events"][:-POMODORO_MAX_EVENTS]
+    
+    @staticmethod
+    def _event_count(session_data: Dict[str, Any]) -> int:
+        # event_countが無い（以前に保存された）セッションはイベント数で代用
+        count = session_data.get("event_count")
+        return count if count is not None else len(session_data.get("events") or [])
+    
+    def _calculate_session_stats(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """セッション統計を計算"""
+        if not session_data["start_time"] or not session_data["end_time"]:
+            return session_data
         
-        session_data["total_focus_time"] = int(estimated_focus_time)
-        session_data["total_break_time"] = int(estimated_break_time)
-        session_data["total_duration"] = int(total_duration)
+        # イベントごとに加算した累計値をそのまま使用（推定なし）
+        session_data["total_focus_time"] = int(session_data.get("total_focus_time", 0))
+        session_data["total_break_time"] = int(session_data.get("total_break_time", 0))
+        session_data["total_pause_time"] = int(session_data.get("total_pause_time", 0))
+        session_data["total_duration"] = session_data["total_focus_time"] + session_data["total_break_time"]
+        session_data["total_cycles"] = session_data["current_cycle"]
         
         return session_data
     
@@ -195,7 +320,7 @@ class PomodoroTimer:
             journal_data = {
                 "user_id": session_data["user_id"],
                 "title": f"ポモドーロセッション - {session_data['current_cycle']}サイクル完了",
-                "content": f"ポモドーロセッションを完了しました。\n\n完了サイクル: {session_data['current_cycle']}回\n総集中時間: {session_data.get('total_focus_time', 0)}秒\n総休憩時間: {session_data.get('total_break_time', 0)}秒\n総時間: {session_data.get('total_duration', 0)}秒\n開始時間: {session_data['start_time']}\n終了時間: {session_data['end_time']}",
+                "content": f"ポモドーロセッションを完了しました。\n\n完了サイクル: {session_data['current_cycle']}回\n総集中時間: {session_data.get('total_focus_time', 0)}秒\n総休憩時間: {session_data.get('total_break_time', 0)}秒\n一時停止時間: {session_data.get('total_pause_time', 0)}秒\n総時間: {session_data.get('total_duration', 0)}秒\n開始時間: {session_data['start_time']}\n終了時間: {session_data['end_time']}",
                 "session_type": "pomodoro",
                 "session_id": session_data["session_id"]
             }
@@ -233,6 +358,13 @@ class PomodoroTimer:
                     except:
                         pass
                 
+                if '総休憩時間:' in content:
+                    try:
+                        break_time = int(content.split('総休憩時間:')[1].split('秒')[0].strip())
+                        total_break_time += break_time
+                    except:
+                        pass
+                
                 if '完了サイクル:' in content:
                     try:
                         cycles = int(content.split('完了サイクル:')[1].split('回')[0].strip())
@@ -3,6 +3,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import random
 from app.database.supabase_db import SupabaseDB
+from app.utils.audio_metadata import audio_metadata_index
+from app.utils.content_catalog import ContentCatalog, load_catalog_items
 
 class RelaxationSounds:
     """リラックスサウンドシステム"""
@@ -108,6 +110,17 @@ class RelaxationSounds:
             }
         }
         
+        # データファイルの追加サウンドを読み込み
+        for sound in load_catalog_items("sounds.json"):
+            self.sounds.setdefault(sound["category"], {})[sound["id"]] = sound
+        
+        # 解析済みの長さ・ラウドネスを反映
+        for category_sounds in self.sounds.values():
+            audio_metadata_index.annotate(category_sounds.values())
+        
+        # 絞り込み用のインデックス
+        self.catalog = ContentCatalog(self.get_all_sounds())
+        
         # プリセットサウンドスケープ
         self.presets = {
             "sleep": {
@@ -153,14 +166,21 @@ class RelaxationSounds:
     
     def get_sounds_by_category(self, category: str) -> List[Dict[str, Any]]:
         """カテゴリ別にサウンドを取得"""
-        return list(self.sounds.get(category, {}).values())
+        return self.catalog.by_category(category)
     
     def get_sound_by_id(self, sound_id: str) -> Optional[Dict[str, Any]]:
         """IDでサウンドを取得"""
-        for category_sounds in self.sounds.values():
-            if sound_id in category_sounds:
-                return category_sounds[sound_id]
-        return None
+        return self.catalog.get(sound_id)
+    
+    def search_sounds(
+        self,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """複数条件でサウンドを検索"""
+        return self.catalog.query(category=category, tags=tags, limit=limit, offset=offset)
     
     def get_presets(self) -> Dict[str, Any]:
         """プリセットサウンドスケープを取得"""
@@ -0,0 +1,91 @@
+"""
+リクエスト単位の読み取りキャッシュ（アイデンティティマップ）
+同じリクエスト内で同じ引数のDB読み取りを1回にまとめ、レスポンス時に破棄する
+"""
+
+import contextvars
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_MISSING = object()
+
+class _RequestCache:
+    """1リクエスト分のキャッシュ（並行実行中のスレッドから共有される）"""
+
+    __slots__ = ("entries", "lock", "hits", "misses")
+
+    def __init__(self):
+        self.entries: Dict[Tuple, Any] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+_current: contextvars.ContextVar[Optional[_RequestCache]] = contextvars.ContextVar("request_cache", default=None)
+
+def request_cached(func: Callable) -> Callable:
+    """リクエスト内で同じ引数の呼び出し結果を再利用するデコレータ（リクエスト外では何もしない）"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _current.get()
+        if cache is None:
+            return func(*args, **kwargs)
+
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with cache.lock:
+            value = cache.entries.get(key, _MISSING)
+            if value is not _MISSING:
+                cache.hits += 1
+                return value
+
+        value = func(*args, **kwargs)
+        with cache.lock:
+            cache.misses += 1
+            cache.entries[key] = value
+        return value
+
+    return wrapper
+
+def invalidates_request_cache(func: Callable) -> Callable:
+    """書き込み後にリクエスト内のキャッシュを破棄するデコレータ"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            clear_request_cache()
+
+    return wrapper
+
+def clear_request_cache():
+    """現在のリクエストのキャッシュを破棄"""
+    cache = _current.get()
+    if cache is not None:
+        with cache.lock:
+            cache.entries.clear()
+
+def request_cache_stats() -> Optional[Dict[str, int]]:
+    """現在のリクエストのヒット数・ミス数"""
+    cache = _current.get()
+    if cache is None:
+        return None
+    return {"hits": cache.hits, "misses": cache.misses}
+
+class RequestCacheMiddleware:
+    """リクエストごとにキャッシュを用意し、レスポンス後に破棄するASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _current.set(_RequestCache())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
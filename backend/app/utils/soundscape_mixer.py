@@ -0,0 +1,228 @@
+"""
+サウンドスケープミキサー
+複数のサウンドを1本のループ音声（WAV）にミックスし、ディスクにキャッシュする
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import wave
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+from app.utils.audio_metadata import audio_metadata_index, read_wav_pcm
+
+try:
+    import numpy as np
+except ImportError:  # NumPyが無い環境ではミックス機能を無効化
+    np = None
+
+# 環境変数を読み込み
+load_dotenv()
+
+# ミキサー設定
+AUDIO_LIBRARY_DIR = os.getenv("AUDIO_LIBRARY_DIR", "static/audio")
+SOUNDSCAPE_CACHE_DIR = os.getenv("SOUNDSCAPE_CACHE_DIR", "cache/soundscapes")
+SOUNDSCAPE_MIX_SECONDS = int(os.getenv("SOUNDSCAPE_MIX_SECONDS", "60"))
+SOUNDSCAPE_CACHE_MAX_BYTES = int(os.getenv("SOUNDSCAPE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # 超えた分は古い順に削除
+
+MIX_SAMPLE_RATE = 44100
+MIX_CHANNELS = 2
+MIX_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class SoundscapeMixer:
+    """サウンドスケープのPCMミックスとキャッシュ管理"""
+
+    def __init__(
+        self,
+        library_dir: str = AUDIO_LIBRARY_DIR,
+        cache_dir: str = SOUNDSCAPE_CACHE_DIR,
+        mix_seconds: int = SOUNDSCAPE_MIX_SECONDS,
+        cache_max_bytes: int = SOUNDSCAPE_CACHE_MAX_BYTES
+    ):
+        self.library_dir = library_dir
+        self.cache_dir = cache_dir
+        self.mix_seconds = mix_seconds
+        self.cache_max_bytes = cache_max_bytes
+        # 生成中のミックスごとのロックと待機数（生成後に削除）
+        self._locks: Dict[str, list] = {}
+        self._locks_guard = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """ミックス機能が利用可能か（NumPyの有無）"""
+        return np is not None
+
+    def get_mix_id(self, sounds: List[Dict[str, Any]]) -> str:
+        """(sound_id, volume)の組み合わせからキャッシュキーを生成"""
+        # 並び順に依存しないようにソートし、ボリュームは2桁に丸める
+        normalized = sorted((sound["id"], round(float(sound["volume"]), 2)) for sound in sounds)
+        # メタデータインデックスが更新された場合は別のミックスとして扱う
+        payload = json.dumps(
+            [normalized, self.mix_seconds, MIX_SAMPLE_RATE, audio_metadata_index.version],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_mix_path(self, mix_id: str) -> Optional[str]:
+        """キャッシュ済みミックスのパスを取得（存在しない場合はNone）"""
+        if not MIX_ID_PATTERN.match(mix_id):
+            return None
+        path = self._cache_path(mix_id)
+        return path if self._touch(path) else None
+
+    def mix(self, sounds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """サウンドをミックスしてキャッシュに保存（キャッシュ済みなら再利用）"""
+        if not self.is_available():
+            raise RuntimeError("NumPyがインストールされていないため、ミックス機能は利用できません")
+        if not sounds:
+            raise ValueError("ミックスするサウンドがありません")
+
+        mix_id = self.get_mix_id(sounds)
+        path = self._cache_path(mix_id)
+
+        if self._touch(path):
+            return {"mix_id": mix_id, "path": path, "cached": True, "duration": self.mix_seconds}
+
+        # 同じミックスの同時生成を防ぐ
+        with self._mix_lock(mix_id):
+            if not os.path.exists(path):
+                samples = self._render(sounds)
+                self._write_wav(path, samples)
+                logger.info(f"サウンドスケープをミックスしました: {mix_id} ({len(sounds)}トラック)")
+                self._evict(keep=path)
+
+        return {"mix_id": mix_id, "path": path, "cached": False, "duration": self.mix_seconds}
+
+    def _touch(self, path: str) -> bool:
+        """キャッシュの最終利用時刻（mtime）を更新（存在しない場合はFalse）"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _evict(self, keep: Optional[str] = None) -> int:
+        """キャッシュの合計サイズが上限を超えた分を最終利用の古い順に削除"""
+        with self._evict_lock:
+            entries = []
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if entry.is_file() and entry.name.endswith(".wav"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                return 0
+
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.cache_max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            if removed:
+                logger.info(f"サウンドスケープのキャッシュを削除しました: {removed}件")
+            return removed
+
+    def _render(self, sounds: List[Dict[str, Any]]) -> "np.ndarray":
+        """各トラックをループ・音量調整して合成"""
+        frames = self.mix_seconds * MIX_SAMPLE_RATE
+        mix = np.zeros((frames, MIX_CHANNELS), dtype=np.float32)
+
+        for sound in sounds:
+            track = self._load_pcm(self._source_path(sound["id"]))
+            metadata = audio_metadata_index.get(f"sounds/{sound['id']}")
+            
+            # インデックスのループ区間を使用（前後の無音を除去）
+            if metadata and metadata.get("sample_rate") == MIX_SAMPLE_RATE:
+                loop = track[metadata["loop_start"]:metadata["loop_end"]]
+                if len(loop) > 0:
+                    track = loop
+            
+            # ミックス長に合わせてループ
+            repeats = -(-frames // len(track))
+            looped = np.tile(track, (repeats, 1))[:frames]
+            
+            # ラウドネスを揃えてから指定ボリュームを適用
+            gain = audio_metadata_index.get_gain(f"sounds/{sound['id']}")
+            mix += looped * np.float32(gain * sound["volume"])
+
+        # クリッピングを避けるためピークで正規化
+        peak = float(np.max(np.abs(mix))) if mix.size else 0.0
+        if peak > 1.0:
+            mix /= peak
+
+        return mix
+
+    def _load_pcm(self, path: str) -> "np.ndarray":
+        """WAVを読み込み、ミックス用のステレオ・44.1kHz配列に変換"""
+        samples, sample_rate = read_wav_pcm(path)
+        channels = samples.shape[1]
+
+        # チャンネル数をステレオに揃える
+        if channels == 1:
+            samples = np.repeat(samples, MIX_CHANNELS, axis=1)
+        elif channels > MIX_CHANNELS:
+            samples = samples[:, :MIX_CHANNELS]
+
+        # サンプルレートを揃える（線形補間）
+        if sample_rate != MIX_SAMPLE_RATE and len(samples) > 1:
+            target_length = int(len(samples) * MIX_SAMPLE_RATE / sample_rate)
+            source_positions = np.arange(len(samples), dtype=np.float64)
+            target_positions = np.linspace(0, len(samples) - 1, target_length)
+            samples = np.stack(
+                [np.interp(target_positions, source_positions, samples[:, ch]) for ch in range(MIX_CHANNELS)],
+                axis=1
+            ).astype(np.float32)
+
+        if len(samples) == 0:
+            raise ValueError(f"音源ファイルが空です: {os.path.basename(path)}")
+
+        return samples
+
+    def _write_wav(self, path: str, samples: "np.ndarray"):
+        """float32配列を16bit PCM WAVとして書き出し"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+        tmp_path = f"{path}.tmp"
+        with wave.open(tmp_path, "wb") as wav:
+            wav.setnchannels(MIX_CHANNELS)
+            wav.setsampwidth(2)
+            wav.setframerate(MIX_SAMPLE_RATE)
+            wav.writeframes(pcm.tobytes())
+        os.replace(tmp_path, path)
+
+    def _source_path(self, sound_id: str) -> str:
+        return os.path.join(self.library_dir, "sounds", f"{sound_id}.wav")
+
+    def _cache_path(self, mix_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{mix_id}.wav")
+
+    @contextmanager
+    def _mix_lock(self, mix_id: str):
+        with self._locks_guard:
+            entry = self._locks.setdefault(mix_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[mix_id]
+
+# グローバルミキサーインスタンス
+soundscape_mixer = SoundscapeMixer()
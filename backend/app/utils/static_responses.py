@@ -0,0 +1,48 @@
+"""
+静的レスポンスユーティリティ
+内容が変わらないJSONレスポンスを起動時にシリアライズし、ETagで再検証する
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from dotenv import load_dotenv
+
+# 環境変数を読み込み
+load_dotenv()
+
+STATIC_RESPONSE_MAX_AGE = int(os.getenv("STATIC_RESPONSE_MAX_AGE", "300"))  # 5分
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-MatchヘッダーがETagに一致するか判定（弱いETagも許容）"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+class PrecomputedResponse:
+    """事前シリアライズ済みのJSONレスポンス"""
+
+    def __init__(self, content: Any, max_age: int = STATIC_RESPONSE_MAX_AGE):
+        # JSONResponseと同じ形式でシリアライズ
+        self.body = json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={max_age}"
+        }
+
+    def respond(self, request: Request) -> Response:
+        """リクエストに応じて本文または304を返す"""
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
@@ -2,6 +2,8 @@ from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.database.supabase_db import SupabaseDB
+from app.database.resilience import usage_increment_queue
+from app.utils.concurrency import gather_calls
 
 # プラン別使用回数制限
 USAGE_LIMITS = {
@@ -30,19 +32,23 @@ def get_usage_limit(plan_type: str, feature: str) -> int:
     return USAGE_LIMITS.get(plan_type, USAGE_LIMITS["free"]).get(feature, 0)
 
 def get_current_usage(user_id: int, feature: str) -> int:
-    """現在の使用回数を取得"""
+    """現在の使用回数を取得（データベース障害で保留中の加算を含む）"""
     usage_record = SupabaseDB.get_usage_count(user_id, feature)
-    return usage_record['usage_count'] if usage_record else 0
+    current_usage = usage_record['usage_count'] if usage_record else 0
+    return current_usage + usage_increment_queue.pending_count(user_id, feature)
 
 def can_use_feature(user_id: int, feature: str) -> dict:
     """機能を使用できるかチェック"""
-    user = SupabaseDB.get_user_by_id(user_id)
+    # ユーザーと使用回数を並行して取得
+    user, current_usage = gather_calls(
+        lambda: SupabaseDB.get_user_by_id(user_id),
+        lambda: get_current_usage(user_id, feature)
+    )
     if not user:
         return {"can_use": False, "current_usage": 0, "limit": 0, "plan_type": "free"}
     
     plan_type = user.get('plan_type', 'free')
     limit = get_usage_limit(plan_type, feature)
-    current_usage = get_current_usage(user_id, feature)
     
     return {
         "can_use": current_usage < limit,
@@ -51,6 +57,6 @@ def can_use_feature(user_id: int, feature: str) -> dict:
         "plan_type": plan_type
     }
 
-def increment_usage(user_id: int, feature: str):
+def increment_usage(user_id: int, feature: str, count: int = 1):
     """使用回数を増加"""
-    SupabaseDB.create_or_update_usage(user_id, feature, 1) 
\ No newline at end of file
+    SupabaseDB.create_or_update_usage(user_id, feature, count) 
\ No newline at end of file
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ジャーナル感情タグのバックフィルスクリプト
+感情タグ列の追加前に作成されたジャーナルを一度だけ解析してタグを保存する
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# 環境変数を読み込み
+load_dotenv()
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.supabase_db import SupabaseDB
+from app.utils.journal_emotion import analyze_journal_emotion
+
+PAGE_SIZE = 500
+
+def main():
+    """未タグ付けのジャーナルを解析して更新"""
+    print("=== ジャーナル感情タグ バックフィル ===")
+
+    updated = 0
+    after_id = None
+    while True:
+        page = SupabaseDB.get_untagged_journals_page(after_id, PAGE_SIZE)
+        for journal in page:
+            SupabaseDB.update_journal_emotion(journal["id"], analyze_journal_emotion(journal["content"]))
+            updated += 1
+        if len(page) < PAGE_SIZE:
+            break
+        after_id = page[-1]["id"]
+        print(f"  {updated}件更新...")
+
+    print(f"✅ {updated}件のジャーナルにタグ付けしました")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
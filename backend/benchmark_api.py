@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+APIベンチマークスクリプト
+データバックエンドをプロセス内のmemory/sqlite（クエリごとに遅延を注入）に切り替えてmain.appを起動し、
+ログイン・ジャーナル・気分記録・CBT対話・ダッシュボードの混合ワークロードを固定の同時実行数で実行する。
+ルートごとのスループットとp50/p95/p99を出力し、--jsonで保存した結果を--compareで比較できる。
+
+使用例:
+    python benchmark_api.py --concurrency 20 --requests 2000 --latency-ms 20 --json results/base.json
+    python benchmark_api.py --compare results/base.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# プロジェクトのルートディレクトリをPythonパスに追加（ログ出力先もbackend基準）
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+PASSWORD = "Benchmark123"
+
+# ワークロードの構成（ルート名: 重み）
+WORKLOAD_MIX = {
+    "POST /auth/login": 2,
+    "GET /journals/": 8,
+    "POST /journals/": 12,
+    "DELETE /journals/{id}": 4,
+    "GET /moods/": 6,
+    "POST /moods/": 12,
+    "POST /moods/batch": 4,
+    "POST /cbt/conversation": 20,
+    "GET /dashboard/summary": 20,
+    "GET /usage/status": 6
+}
+
+SAMPLE_SENTENCES = [
+    "今日は朝から雨が降っていて、少し気分が落ち込んでいました。",
+    "仕事で小さなミスをしてしまい、上司に相談しました。",
+    "夕方に散歩をしたら、思ったより気持ちが軽くなりました。",
+    "友人と久しぶりに電話で話して、安心しました。",
+    "明日のプレゼンが不安で、なかなか眠れそうにありません。",
+    "瞑想を10分間続けたら、呼吸が落ち着いてきました。",
+    "最近は疲れがたまっていて、週末はゆっくり休みたいです。",
+    "家族と夕食を食べて、楽しい時間を過ごせました。"
+]
+
+# ========================================
+# データバックエンド
+# ========================================
+
+def create_latency_backend(name: str, latency_ms: float, jitter_ms: float, seed: int):
+    """インプロセスのバックエンド（memory/sqlite）を作成し、各クエリにSupabaseへの往復相当の遅延を注入"""
+    from app.database.backends import DataBackend, create_data_backend
+
+    class LatencyBackend(DataBackend):
+        """クエリごとに遅延を注入し、実行回数を数えるラッパー"""
+
+        def __init__(self, backend: DataBackend):
+            self.backend = backend
+            self.name = backend.name
+            self.latency = latency_ms / 1000
+            self.jitter = jitter_ms / 1000
+            self.query_count = 0
+            self._lock = threading.Lock()
+            self._random = random.Random(seed)
+
+        def execute(self, query):
+            with self._lock:
+                self.query_count += 1
+                delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            if delay > 0:
+                time.sleep(delay)
+            return self.backend.execute(query)
+
+        def close(self):
+            self.backend.close()
+
+    return LatencyBackend(create_data_backend(name))
+
+def seed_data(backend, users: int, history: int, bcrypt_rounds: int, seed: int) -> List[Dict[str, Any]]:
+    """ベンチマーク用のユーザーと過去の記録を作成（遅延なし）"""
+    import bcrypt
+
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=bcrypt_rounds)).decode("utf-8")
+    base = datetime.now() - timedelta(days=60)
+    accounts = []
+
+    for index in range(users):
+        user = backend.table("users").insert({
+            "email": f"bench{index}@example.com",
+            "name": f"bench{index}",
+            "password": password_hash,
+            "plan_type": "premium"
+        }).execute().data[0]
+        accounts.append({"id": user["id"], "email": user["email"]})
+        if not history:
+            continue
+
+        created = [(base + timedelta(minutes=rng.randint(0, 60 * 24 * 60))).isoformat() for _ in range(history)]
+        backend.table("journals").insert([
+            {
+                "user_id": user["id"],
+                "content": "".join(rng.choices(SAMPLE_SENTENCES, k=rng.randint(2, 8))),
+                "created_at": created_at
+            }
+            for created_at in created
+        ]).execute()
+        backend.table("moods").insert([
+            {"user_id": user["id"], "mood": rng.randint(1, 5), "recorded_at": created_at}
+            for created_at in created
+        ]).execute()
+
+    return accounts
+
+# ========================================
+# ワークロード
+# ========================================
+
+class VirtualUser:
+    """1ユーザー分のセッション（トークン・CBTセッション・作成したジャーナル）"""
+
+    def __init__(self, account: Dict[str, Any], rng: random.Random):
+        self.account = account
+        self.rng = rng
+        self.token: Optional[str] = None
+        self.cbt_session_id: Optional[str] = None
+        self.journal_ids: List[int] = []
+        self.sequence = 0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def next_text(self) -> str:
+        self.sequence += 1
+        return f"{''.join(self.rng.choices(SAMPLE_SENTENCES, k=self.rng.randint(2, 6)))}（{self.account['id']}-{self.sequence}）"
+
+async def run_operation(client, user: VirtualUser, route: str):
+    """ルートに対応するリクエストを送信"""
+    if route == "POST /auth/login":
+        response = await client.post("/api/auth/login", json={"email": user.account["email"], "password": PASSWORD})
+        if response.status_code == 200:
+            user.token = response.json()["access_token"]
+        return response
+    if route == "GET /journals/":
+        return await client.get("/api/journals/", headers=user.headers)
+    if route == "POST /journals/":
+        response = await client.post("/api/journals/", json={"content": user.next_text()}, headers=user.headers)
+        if response.status_code == 200:
+            user.journal_ids.append(response.json()["id"])
+        return response
+    if route == "DELETE /journals/{id}":
+        if not user.journal_ids:
+            return await run_operation(client, user, "POST /journals/")
+        return await client.delete(f"/api/journals/{user.journal_ids.pop()}", headers=user.headers)
+    if route == "GET /moods/":
+        return await client.get("/api/moods/", headers=user.headers)
+    if route == "POST /moods/":
+        return await client.post("/api/moods/", json={"mood": user.rng.randint(1, 5), "note": user.next_text()}, headers=user.headers)
+    if route == "POST /moods/batch":
+        items = [
+            {"mood": user.rng.randint(1, 5), "note": user.next_text(), "idempotency_key": f"{user.account['id']}-{user.sequence}-{index}"}
+            for index in range(5)
+        ]
+        return await client.post("/api/moods/batch", json={"moods": items}, headers=user.headers)
+    if route == "POST /cbt/conversation":
+        return await client.post(
+            "/api/cbt/conversation",
+            json={"message": user.next_text(), "session_id": user.cbt_session_id},
+            headers=user.headers
+        )
+    if route == "GET /dashboard/summary":
+        return await client.get("/api/dashboard/summary", headers=user.headers)
+    if route == "GET /usage/status":
+        return await client.get("/api/usage/status", headers=user.headers)
+    raise ValueError(f"未知のルート: {route}")
+
+async def run_workload(app, accounts: List[Dict[str, Any]], args) -> Tuple[List[Tuple[str, int, float]], float]:
+    """固定の同時実行数でワークロードを実行し、(ルート, ステータス, 秒)の一覧と所要時間を返す"""
+    import httpx
+
+    routes = list(WORKLOAD_MIX.keys())
+    weights = list(WORKLOAD_MIX.values())
+    samples: List[Tuple[str, int, float]] = []
+    remaining = {"warmup": args.warmup, "requests": args.requests}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        users = [VirtualUser(accounts[index % len(accounts)], random.Random(args.seed + index)) for index in range(args.concurrency)]
+
+        # ログインとCBTセッション開始（計測対象外）
+        for user in users:
+            await run_operation(client, user, "POST /auth/login")
+            response = await client.post("/api/cbt/session", json={}, headers=user.headers)
+            user.cbt_session_id = response.json().get("session_id")
+
+        async def worker(user: VirtualUser):
+            while True:
+                if remaining["warmup"] > 0:
+                    remaining["warmup"] -= 1
+                    record = False
+                elif remaining["requests"] > 0:
+                    remaining["requests"] -= 1
+                    record = True
+                else:
+                    return
+                route = user.rng.choices(routes, weights=weights)[0]
+                started = time.perf_counter()
+                response = await run_operation(client, user, route)
+                elapsed = time.perf_counter() - started
+                if record:
+                    samples.append((route, response.status_code, elapsed))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        duration = time.perf_counter() - started
+
+    return samples, duration
+
+# ========================================
+# 集計・出力
+# ========================================
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """最近傍法によるパーセンタイル"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(samples: List[Tuple[str, int, float]], duration: float) -> Dict[str, Any]:
+    """ルートごと・全体のスループットとレイテンシを集計（ミリ秒）"""
+    by_route: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    for route, status, elapsed in samples:
+        by_route[route].append((status, elapsed))
+
+    def stats(entries: List[Tuple[int, float]]) -> Dict[str, Any]:
+        latencies = sorted(elapsed * 1000 for _, elapsed in entries)
+        return {
+            "count": len(entries),
+            "errors": sum(1 for status, _ in entries if status >= 400),
+            "throughput": round(len(entries) / duration, 2) if duration else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0
+        }
+
+    return {
+        "duration_s": round(duration, 3),
+        "total": stats([(status, elapsed) for _, status, elapsed in samples]),
+        "routes": {route: stats(entries) for route, entries in sorted(by_route.items())}
+    }
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    """結果を表形式で出力（baselineがあれば差分も表示）"""
+    header = f"{'ルート':<26}{'件数':>7}{'エラー':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp95':>9}"
+    print(header)
+    print("-" * (len(header) + 8))
+
+    rows = list(result["routes"].items()) + [("合計", result["total"])]
+    for route, stats in rows:
+        line = (
+            f"{route:<26}{stats['count']:>7}{stats['errors']:>7}{stats['throughput']:>9.1f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+        )
+        if baseline:
+            before = baseline["total"] if route == "合計" else baseline["routes"].get(route)
+            if before:
+                line += f"{_delta(stats['p50_ms'], before['p50_ms']):>9}{_delta(stats['p95_ms'], before['p95_ms']):>9}"
+        print(line)
+
+    print(f"\n所要時間: {result['duration_s']}秒 / DBクエリ: {result['query_count']}回 "
+          f"({result['query_count'] / max(1, result['total']['count']):.1f}回/リクエスト)")
+
+def _delta(current: float, before: float) -> str:
+    if not before:
+        return "-"
+    return f"{(current - before) / before * 100:+.0f}%"
+
+def git_commit() -> Optional[str]:
+    """結果に記録するコミットID"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CareBot AI APIベンチマーク（インプロセスのデータバックエンド使用）")
+    parser.add_argument("--concurrency", type=int, default=10, help="同時実行数（仮想ユーザー数）")
+    parser.add_argument("--requests", type=int, default=1000, help="計測するリクエスト数")
+    parser.add_argument("--warmup", type=int, default=100, help="計測前に実行するリクエスト数")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory", help="データバックエンド")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="DBクエリ1回あたりの遅延（ミリ秒）")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="遅延のゆらぎ（±ミリ秒）")
+    parser.add_argument("--users", type=int, default=0, help="作成するユーザー数（0の場合は同時実行数と同じ）")
+    parser.add_argument("--history", type=int, default=200, help="ユーザーごとの既存のジャーナル・気分記録の件数")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="パスワードハッシュのコスト")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--compare", help="比較するベースラインのJSON")
+    parser.add_argument("--log-level", default="WARNING", help="アプリのログレベル")
+    return parser.parse_args()
+
+def main():
+    """ベンチマークを実行"""
+    args = parse_args()
+    os.chdir(BACKEND_DIR)
+    os.makedirs("logs", exist_ok=True)
+
+    # 実サービス・既存のデータに触れない設定（データは一時ディレクトリに作成）
+    data_dir = tempfile.mkdtemp(prefix="carebot_bench_")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["DB_BACKEND"] = args.backend
+    os.environ["SQLITE_DB_PATH"] = os.path.join(data_dir, "carebot.sqlite3")
+    os.environ["JOURNAL_SEARCH_DB_PATH"] = os.path.join(data_dir, "journal_search.db")
+
+    from app.database.backends import set_data_backend
+    backend = create_latency_backend(args.backend, args.latency_ms, args.jitter_ms, args.seed)
+    set_data_backend(backend)
+
+    print("=== CareBot AI APIベンチマーク ===")
+    print(f"同時実行数: {args.concurrency} / リクエスト数: {args.requests} (ウォームアップ {args.warmup}) / "
+          f"DB: {args.backend} 遅延 {args.latency_ms}±{args.jitter_ms}ms")
+
+    # アプリ内のデバッグ用printは結果の表示を妨げるため抑制
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+        accounts = seed_data(backend.backend, args.users or args.concurrency, args.history, args.bcrypt_rounds, args.seed)
+        samples, duration = asyncio.run(run_workload(app_main.app, accounts, args))
+
+    result = summarize(samples, duration)
+    result["query_count"] = backend.query_count
+    result["commit"] = git_commit()
+    result["config"] = {key: value for key, value in vars(args).items() if key not in ("json", "compare")}
+    result["timestamp"] = datetime.now().isoformat()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"ベースライン: {baseline.get('commit')} ({baseline.get('timestamp')})")
+
+    print()
+    print_report(result, baseline)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を保存しました: {args.json}")
+
+    return result["total"]["errors"] == 0
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
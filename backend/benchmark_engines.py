@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+インプロセスエンジンのマイクロベンチマークスクリプト
+LightweightAIEngine・CBTAnalyzer・AIAnalyzer・PomodoroTimer・MeditationGuide・RelaxationSoundsの
+リクエスト処理中に呼ばれる処理を計測し、保存済みのベースラインと比較して閾値を超える劣化があれば失敗する。
+計測値（繰り返し計測の中央値）は、計測の合間に実行する固定の計算処理（キャリブレーション）の中央値との比で比較するため、
+実行環境の速度差や実行中の負荷変動の影響を受けにくい。1μs前後の小さなケースの揺れは劣化とみなさない（--noise-floor-us）。
+
+使用例:
+    python benchmark_engines.py                    # ベースラインと比較（劣化があれば終了コード1）
+    python benchmark_engines.py --save-baseline    # 現在の計測値をベースラインとして保存
+    python benchmark_engines.py --filter pomodoro --threshold 0.5
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmark_baselines", "engines.json")
+DEFAULT_THRESHOLD = 0.25  # 25%以上遅くなった場合を劣化とみなす
+DEFAULT_NOISE_FLOOR_US = 1.0  # 増加分がこれ未満の場合は計測の揺れとみなす
+
+SAMPLE_SENTENCES = [
+    "今日は朝から雨が降っていて、少し気分が落ち込んでいました。",
+    "仕事で小さなミスをしてしまい、上司に相談しました。",
+    "夕方に散歩をしたら、思ったより気持ちが軽くなりました。",
+    "友人と久しぶりに電話で話して、安心しました。",
+    "明日のプレゼンが不安で、なかなか眠れそうにありません。",
+    "瞑想を10分間続けたら、呼吸が落ち着いてきました。",
+    "最近は疲れがたまっていて、週末はゆっくり休みたいです。",
+    "家族と夕食を食べて、楽しい時間を過ごせました。"
+]
+
+SHORT_TEXT = "明日のプレゼンが不安で眠れません。"
+LONG_TEXT = "".join(random.Random(0).choices(SAMPLE_SENTENCES, k=150))  # 約4,000文字
+
+def calibrate() -> float:
+    """実行環境の速度の基準となる固定の計算処理（1回あたりの秒数）"""
+    def work():
+        table = {}
+        for i in range(2000):
+            table[f"key{i % 97}"] = table.get(f"key{i % 97}", 0) + i
+        return sorted(table.values())
+    return timeit.timeit(work, number=20) / 20
+
+def build_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """計測対象（名前, 引数なしの呼び出し）の一覧"""
+    # 推奨処理が参照する気分記録はインメモリのバックエンドに用意
+    from app.database.backends import MemoryBackend, set_data_backend
+    backend = MemoryBackend()
+    set_data_backend(backend)
+    now = datetime.now()
+    backend.table("moods").insert([
+        {"user_id": 1, "mood": day % 5 + 1, "recorded_at": (now - timedelta(days=day)).isoformat()}
+        for day in range(30)
+    ]).execute()
+
+    from app.utils.ai_engine import LightweightAIEngine
+    from app.utils.cbt_analyzer import CBTAnalyzer
+    from app.utils.ai_analyzer import AIAnalyzer
+    from app.utils.pomodoro_timer import PomodoroTimer
+    from app.utils.meditation_guide import MeditationGuide
+    from app.utils.relaxation_sounds import RelaxationSounds
+
+    ai_engine = LightweightAIEngine()
+    cbt_analyzer = CBTAnalyzer()
+    ai_analyzer = AIAnalyzer()
+    pomodoro_timer = PomodoroTimer()
+    meditation_guide = MeditationGuide()
+    relaxation_sounds = RelaxationSounds()
+
+    def cbt_conversation(message: str):
+        session = cbt_analyzer.start_cbt_session(1, message)
+        for _ in range(8):
+            session = cbt_analyzer.continue_cbt_session(session, message)
+        return session
+
+    def pomodoro_cycle():
+        session = pomodoro_timer.create_session(1)
+        session = pomodoro_timer.start_focus_session(session)
+        session = pomodoro_timer.pause_session(session)
+        session = pomodoro_timer.resume_session(session)
+        return pomodoro_timer.start_break_session(session)
+
+    running_session = pomodoro_timer.start_focus_session(pomodoro_timer.create_session(1))
+    sound_ids = [sound["id"] for sound in relaxation_sounds.get_all_sounds()][:4]
+
+    return [
+        # LightweightAIEngine（感情・危機検出と対話コンテキストの更新）
+        ("ai_engine.detect_crisis[short]", lambda: ai_engine._detect_crisis(SHORT_TEXT)),
+        ("ai_engine.detect_crisis[long]", lambda: ai_engine._detect_crisis(LONG_TEXT)),
+        ("ai_engine.analyze_emotion[short]", lambda: ai_engine._analyze_emotion(SHORT_TEXT)),
+        ("ai_engine.analyze_emotion[long]", lambda: ai_engine._analyze_emotion(LONG_TEXT)),
+        ("ai_engine.process_message[short]", lambda: ai_engine.process_message(SHORT_TEXT, 1)),
+        ("ai_engine.process_message[long]", lambda: ai_engine.process_message(LONG_TEXT, 1)),
+        ("ai_engine.conversation_summary", ai_engine.get_conversation_summary),
+        # CBTAnalyzer
+        ("cbt.detect_crisis[short]", lambda: cbt_analyzer.detect_crisis(SHORT_TEXT)),
+        ("cbt.detect_crisis[long]", lambda: cbt_analyzer.detect_crisis(LONG_TEXT)),
+        ("cbt.detect_emotion[short]", lambda: cbt_analyzer._detect_emotion(SHORT_TEXT)),
+        ("cbt.detect_emotion[long]", lambda: cbt_analyzer._detect_emotion(LONG_TEXT)),
+        ("cbt.conversation_8_turns[short]", lambda: cbt_conversation(SHORT_TEXT)),
+        ("cbt.conversation_8_turns[long]", lambda: cbt_conversation(LONG_TEXT)),
+        # AIAnalyzer
+        ("ai_analyzer.analyze_combined", lambda: ai_analyzer.analyze_combined([1, 2, 3], [1, 2, 3])),
+        # PomodoroTimer
+        ("pomodoro.cycle", pomodoro_cycle),
+        ("pomodoro.session_progress", lambda: pomodoro_timer.get_session_progress(running_session)),
+        ("pomodoro.schedule", lambda: pomodoro_timer.get_schedule(running_session)),
+        # MeditationGuide（カタログ検索と推奨）
+        ("meditation.by_category", lambda: meditation_guide.get_sessions_by_category("beginner")),
+        ("meditation.search", lambda: meditation_guide.search_sessions(tags=["呼吸"], max_duration=900, limit=10)),
+        ("meditation.recommendations", lambda: meditation_guide.get_personalized_recommendations(1, "stress")),
+        # RelaxationSounds（カタログ検索・推奨・サウンドスケープ作成）
+        ("sounds.search", lambda: relaxation_sounds.search_sounds(category="nature", tags=["リラックス"], limit=10)),
+        ("sounds.recommended", lambda: relaxation_sounds.get_recommended_sounds("sleep", 2)),
+        ("sounds.custom_soundscape", lambda: relaxation_sounds.create_custom_soundscape(sound_ids, [0.4, 0.6, 0.8, 1.2])),
+    ]
+
+def measure(call: Callable[[], Any], min_time: float, repeat: int) -> Tuple[float, float]:
+    """(1回あたりの秒数, 計測の合間に実行したキャリブレーションの秒数)をrepeat回計測した中央値"""
+    number = 1
+    # 1回の計測がmin_time以上になるように回数を調整（小さなケースほど回数が増える）
+    while True:
+        elapsed = timeit.timeit(call, number=number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    samples, calibrations = [], []
+    for _ in range(repeat):
+        calibrations.append(calibrate())
+        samples.append(timeit.timeit(call, number=number) / number)
+    return statistics.median(samples), statistics.median(calibrations)
+
+def run(args, baseline: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """全ケースを計測"""
+    random.seed(args.seed)
+    cases = {name: call for name, call in build_cases() if not args.filter or args.filter in name}
+
+    measured = {name: measure(call, args.min_time, args.repeat) for name, call in cases.items()}
+    # 実行環境の速度は全ケースの合間に実行したキャリブレーションの中央値で代表させる
+    calibration = statistics.median(local for _, local in measured.values()) if measured else calibrate()
+    timings = {name: (seconds, seconds / calibration) for name, (seconds, _) in measured.items()}
+
+    # 劣化と判定したケースは再計測し、一時的な負荷の影響を受けないよう再計測時のキャリブレーションとの比で判定
+    noise_floor = args.noise_floor_us * 1e-6 / calibration
+    for _ in range(args.retries):
+        slow = [
+            name for name, (_, relative) in timings.items()
+            if is_regression(name, relative, baseline, args.threshold, noise_floor)
+        ]
+        if not slow:
+            break
+        for name in slow:
+            seconds, local = measure(cases[name], args.min_time, args.repeat)
+            timings[name] = min(timings[name], (seconds, seconds / local), key=lambda timing: timing[1])
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "calibration_us": round(calibration * 1e6, 3),
+        "cases": {
+            name: {"us": round(seconds * 1e6, 3), "relative": round(relative, 6)}
+            for name, (seconds, relative) in timings.items()
+        }
+    }
+
+def change_ratio(name: str, relative: float, baseline: Optional[Dict[str, Any]]) -> Optional[float]:
+    """ベースラインからの変化率（ベースラインに無いケースはNone）"""
+    before = baseline.get("cases", {}).get(name) if baseline else None
+    if before is None:
+        return None
+    return relative / before["relative"] - 1
+
+def is_regression(
+    name: str,
+    relative: float,
+    baseline: Optional[Dict[str, Any]],
+    threshold: float,
+    noise_floor: float
+) -> bool:
+    """閾値を超えて遅くなり、かつ増加分がノイズの下限（キャリブレーション比）以上か"""
+    change = change_ratio(name, relative, baseline)
+    if change is None or change <= threshold:
+        return False
+    return relative - baseline["cases"][name]["relative"] >= noise_floor
+
+def compare(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], threshold: float, noise_floor_us: float) -> List[str]:
+    """結果を表示し、閾値を超えて遅くなったケース名を返す"""
+    regressions = []
+    noise_floor = noise_floor_us / result["calibration_us"]
+    print(f"{'ケース':<38}{'μs/回':>12}{'基準μs':>12}{'変化':>9}")
+    print("-" * 74)
+    for name, current in result["cases"].items():
+        change = change_ratio(name, current["relative"], baseline)
+        if change is None:
+            print(f"{name:<38}{current['us']:>12.2f}{'-':>12}{'新規':>9}")
+            continue
+        mark = ""
+        if is_regression(name, current["relative"], baseline, threshold, noise_floor):
+            regressions.append(name)
+            mark = "  ⚠️"
+        print(f"{name:<38}{current['us']:>12.2f}{baseline['cases'][name]['us']:>12.2f}{change * 100:>+8.0f}%{mark}")
+    return regressions
+
+def git_commit() -> Optional[str]:
+    """結果に記録するコミットID"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CareBot AI エンジンのマイクロベンチマーク")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="ベースラインのJSON")
+    parser.add_argument("--save-baseline", action="store_true", help="計測結果をベースラインとして保存")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="劣化とみなす変化率（0.25 = 25%%）")
+    parser.add_argument("--filter", help="名前に指定文字列を含むケースのみ計測")
+    parser.add_argument("--noise-floor-us", type=float, default=DEFAULT_NOISE_FLOOR_US, help="劣化とみなす最小の増加量（μs）")
+    parser.add_argument("--min-time", type=float, default=0.05, help="1回の計測の最小秒数")
+    parser.add_argument("--repeat", type=int, default=9, help="計測の繰り返し回数（中央値を採用）")
+    parser.add_argument("--retries", type=int, default=3, help="閾値を超えたケースを再計測する回数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--json", help="計測結果を保存するパス")
+    return parser.parse_args()
+
+def main():
+    """ベンチマークを実行"""
+    args = parse_args()
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["DB_BACKEND"] = "memory"
+
+    print("=== CareBot AI エンジン ベンチマーク ===")
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"ベースライン: {baseline.get('commit')} ({baseline.get('timestamp')}) / 閾値: +{args.threshold * 100:.0f}%（{args.noise_floor_us}μs未満の増加は除く）")
+
+    started = time.perf_counter()
+    result = run(args, baseline)
+    print(f"キャリブレーション: {result['calibration_us']:.1f} μs / 計測時間: {time.perf_counter() - started:.1f}秒")
+    print()
+
+    regressions = compare(result, baseline, args.threshold, args.noise_floor_us)
+
+    for path in filter(None, [args.json, args.baseline if args.save_baseline else None]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を保存しました: {path}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)}件のケースが閾値を超えて遅くなっています: {', '.join(regressions)}")
+        return False
+    print("\n✅ 劣化は検出されませんでした")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+JSONシリアライズのベンチマークスクリプト
+標準のJSONResponseとFastJSONResponse（orjson）をジャーナル一覧相当のデータで比較する
+"""
+
+import os
+import sys
+import random
+import timeit
+from datetime import datetime, timedelta
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.utils.fast_json import FastJSONResponse, orjson
+
+SAMPLE_SENTENCES = [
+    "今日は朝から雨が降っていて、少し気分が落ち込んでいました。",
+    "仕事で小さなミスをしてしまい、上司に相談しました。",
+    "夕方に散歩をしたら、思ったより気持ちが軽くなりました。",
+    "友人と久しぶりに電話で話して、安心しました。",
+    "明日のプレゼンが不安で、なかなか眠れそうにありません。",
+    "瞑想を10分間続けたら、呼吸が落ち着いてきました。"
+]
+
+def build_journals(count: int) -> list:
+    """ジャーナル一覧のレスポンスに近いデータを作成"""
+    random.seed(0)
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    return [
+        {
+            "id": i,
+            "user_id": 1,
+            "content": "".join(random.choices(SAMPLE_SENTENCES, k=random.randint(3, 12))),
+            "mood": random.randint(1, 5),
+            "tags": random.sample(["仕事", "睡眠", "家族", "運動", "不安", "感謝"], 2),
+            "created_at": base + timedelta(hours=i * 7)
+        }
+        for i in range(count)
+    ]
+
+def benchmark(count: int, number: int):
+    """件数ごとに各方式の1回あたりの時間を計測"""
+    payload = {"journals": build_journals(count), "total_count": count}
+    encoded = jsonable_encoder(payload)
+
+    cases = {
+        # FastAPIの通常経路（jsonable_encoder + 各レスポンスクラス）
+        "JSONResponse": lambda: JSONResponse(jsonable_encoder(payload)),
+        "FastJSONResponse": lambda: FastJSONResponse(jsonable_encoder(payload)),
+        # エンコード済みデータのシリアライズのみ
+        "JSONResponse (renderのみ)": lambda: JSONResponse(encoded),
+        "FastJSONResponse (renderのみ)": lambda: FastJSONResponse(encoded),
+        # jsonable_encoderを省略して直接返す場合
+        "FastJSONResponse (直接返却)": lambda: FastJSONResponse(payload)
+    }
+
+    size = len(JSONResponse(encoded).body)
+    print(f"\n--- ジャーナル{count}件 ({size / 1024:.1f} KB) ---")
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=number, repeat=3)) / number
+        print(f"  {name:<32} {seconds * 1000:8.3f} ms")
+
+def main():
+    """ベンチマークを実行"""
+    print("=== JSONシリアライズ ベンチマーク ===")
+    if orjson is None:
+        print("⚠️ orjsonがインストールされていないため、FastJSONResponseは標準実装で動作します")
+    else:
+        print(f"orjson {orjson.__version__}")
+
+    for count, number in ((10, 2000), (100, 200), (1000, 20)):
+        benchmark(count, number)
+
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL直接接続ベンチマークスクリプト
+ホットパスのクエリ（ユーザー取得・使用回数の取得/加算・直近のジャーナル/気分）を
+PostgREST経由とasyncpgの接続プール経由で同じ同時実行数で実行し、p50/p95/p99とスループットを比較する。
+SUPABASE_URL・SUPABASE_SERVICE_ROLE_KEY・POSTGRES_DSNが必要（DB_BACKEND=supabase）。
+
+使用例:
+    python benchmark_postgres.py --user-id 1 --concurrency 20 --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.postgres_pool import postgres_hot_path
+from app.database.supabase_db import SupabaseDB, _table
+
+# 計測用の使用回数（計測後に削除）
+BENCHMARK_FEATURE = "benchmark"
+
+def build_operations(user_id: int) -> Dict[str, Callable[[], object]]:
+    return {
+        "get_user_by_id": lambda: SupabaseDB.get_user_by_id(user_id),
+        "get_usage_count": lambda: SupabaseDB.get_usage_count(user_id, BENCHMARK_FEATURE),
+        "create_or_update_usage": lambda: SupabaseDB.create_or_update_usage(user_id, BENCHMARK_FEATURE),
+        "get_recent_journals": lambda: SupabaseDB.get_recent_journals(user_id, 5),
+        "get_recent_moods": lambda: SupabaseDB.get_recent_moods(user_id, 5),
+    }
+
+def percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+def measure(operation: Callable[[], object], concurrency: int, requests: int, warmup: int) -> Dict[str, float]:
+    """同時実行数concurrencyでoperationをrequests回実行"""
+    def timed(_):
+        start = time.perf_counter()
+        operation()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(warmup)))
+        start = time.perf_counter()
+        latencies = list(executor.map(timed, range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "rps": requests / elapsed,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]]):
+    print(f"{'クエリ':<24} {'経路':<10} {'req/s':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for name, paths in results.items():
+        for path, result in paths.items():
+            print(f"{name:<24} {path:<10} {result['rps']:>9.1f} {result['p50']:>9.2f} {result['p95']:>9.2f} {result['p99']:>9.2f}")
+        if len(paths) == 2:
+            speedup = paths["postgrest"]["p50"] / paths["asyncpg"]["p50"]
+            print(f"{'':<24} {'p50比':<10} {speedup:>9.2f}x")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CareBot AI PostgREST経由とPostgreSQL直接接続の比較")
+    parser.add_argument("--user-id", type=int, required=True, help="計測に使う既存ユーザーのID")
+    parser.add_argument("--concurrency", type=int, default=20, help="同時実行数")
+    parser.add_argument("--requests", type=int, default=500, help="クエリごとの実行回数")
+    parser.add_argument("--warmup", type=int, default=50, help="計測前の実行回数")
+    parser.add_argument("--filter", help="名前に指定文字列を含むクエリのみ計測")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not postgres_hot_path.enabled:
+        print("❌ PostgreSQL直接接続が無効です（POSTGRES_DSN・asyncpg・DB_BACKEND=supabaseを確認してください）")
+        sys.exit(1)
+
+    operations = build_operations(args.user_id)
+    if args.filter:
+        operations = {name: op for name, op in operations.items() if args.filter in name}
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    pool_stats = None
+    try:
+        for name, operation in operations.items():
+            results[name] = {}
+            for path, active in (("postgrest", False), ("asyncpg", True)):
+                postgres_hot_path.active = active
+                results[name][path] = measure(operation, args.concurrency, args.requests, args.warmup)
+        pool_stats = postgres_hot_path.stats()
+    finally:
+        postgres_hot_path.active = True
+        _table("usage_counts").delete().eq("user_id", args.user_id).eq("feature_type", BENCHMARK_FEATURE).execute()
+        postgres_hot_path.close()
+
+    print_results(results)
+    print(f"\n接続プール: {pool_stats}")
+
+if __name__ == "__main__":
+    main()
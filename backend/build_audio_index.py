@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+音声メタデータインデックス作成スクリプト
+音声ライブラリを一度だけ解析し、長さ・ラウドネス・ループ位置を保存する
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# 環境変数を読み込み
+load_dotenv()
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.audio_metadata import (
+    AUDIO_LIBRARY_DIR, AUDIO_INDEX_PATH, build_audio_index, save_audio_index
+)
+
+def main():
+    """インデックスを作成して保存"""
+    library_dir = sys.argv[1] if len(sys.argv) > 1 else AUDIO_LIBRARY_DIR
+    index_path = sys.argv[2] if len(sys.argv) > 2 else AUDIO_INDEX_PATH
+
+    print(f"=== 音声メタデータインデックス作成 ===")
+    print(f"音声ライブラリ: {library_dir}")
+
+    if not os.path.isdir(library_dir):
+        print(f"❌ 音声ライブラリが見つかりません: {library_dir}")
+        return False
+
+    index = build_audio_index(library_dir)
+    for key, metadata in index["entries"].items():
+        print(
+            f"  {key}: {metadata['duration']}秒, "
+            f"ラウドネス {metadata['loudness']} LUFS, "
+            f"ループ {metadata['loop_start']}-{metadata['loop_end']}"
+        )
+
+    save_audio_index(index, index_path)
+    print(f"✅ {len(index['entries'])}件を保存しました: {index_path}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
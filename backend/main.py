@@ -1,26 +1,38 @@
 import os
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from dotenv import load_dotenv
 
 from app.api.api import api_router
+from app.api.endpoints import audio
 from app.database.rls_policies import rls_manager
+from app.database.backends import DB_BACKEND, get_data_backend
+from app.database.postgres_pool import postgres_hot_path
+from app.database.resilience import db_circuit_breaker, resilience_stats, run_usage_replayer, usage_increment_queue
+from app.database.supabase_db import SupabaseDB
 from app.utils.logger import logger
+from app.utils.http_client import close_http_clients, http_pool_stats
+from app.utils.compression import CompressionMiddleware
+from app.utils.request_cache import RequestCacheMiddleware
+from app.utils.cbt_transcripts import cbt_transcript_buffer, run_idle_flusher
 from app.utils.error_handler import create_error_response, CareBotError
 
 # 環境変数の読み込み
 load_dotenv()
 
-# 必須環境変数のチェック
-required_env_vars = [
-    "SUPABASE_URL",
-    "SUPABASE_KEY",
-    "SUPABASE_SERVICE_KEY",
-    "JWT_SECRET_KEY"
-]
+# 必須環境変数のチェック（Supabase以外のバックエンドではSupabaseの設定は不要）
+required_env_vars = ["JWT_SECRET_KEY"]
+if DB_BACKEND == "supabase":
+    required_env_vars = [
+        "SUPABASE_URL",
+        "SUPABASE_KEY",
+        "SUPABASE_SERVICE_KEY"
+    ] + required_env_vars
 
 missing_vars = [var for var in required_env_vars if not os.getenv(var)]
 if missing_vars:
@@ -34,16 +46,17 @@ DEBUG = ENVIRONMENT != "production"
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
     # 起動時の処理
-    logger.info(f"CareBot AI アプリケーションを起動中... (環境: {ENVIRONMENT})")
+    logger.info(f"CareBot AI アプリケーションを起動中... (環境: {ENVIRONMENT}, データバックエンド: {DB_BACKEND})")
 
     try:
-        # RLSポリシーの設定
-        logger.info("RLSポリシーを設定中...")
-        rls_manager.setup_all_policies()
+        if DB_BACKEND == "supabase":
+            # RLSポリシーの設定
+            logger.info("RLSポリシーを設定中...")
+            rls_manager.setup_all_policies()
 
-        # ポリシーの検証
-        verification_results = rls_manager.verify_policies()
-        logger.info(f"RLSポリシー検証結果: {verification_results}")
+            # ポリシーの検証
+            verification_results = rls_manager.verify_policies()
+            logger.info(f"RLSポリシー検証結果: {verification_results}")
 
         logger.info("CareBot AI アプリケーションが正常に起動しました")
 
@@ -54,10 +67,27 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("開発環境のため、エラーを無視して起動を続行します")
 
+    # アイドル状態のCBTセッションを定期的に保存
+    transcript_flusher = asyncio.create_task(run_idle_flusher(cbt_transcript_buffer))
+    # データベース障害で保留した使用回数を復旧後に反映
+    usage_replayer = asyncio.create_task(run_usage_replayer(SupabaseDB.create_or_update_usage))
+
     yield
 
     # 終了時の処理
     logger.info("CareBot AI アプリケーションを終了中...")
+    transcript_flusher.cancel()
+    usage_replayer.cancel()
+    flushed = await asyncio.to_thread(cbt_transcript_buffer.flush_all)
+    if flushed:
+        logger.info(f"未保存のCBTセッションを保存しました: {flushed}件")
+    if len(usage_increment_queue):
+        await asyncio.to_thread(usage_increment_queue.replay, SupabaseDB.create_or_update_usage)
+        if len(usage_increment_queue):
+            logger.warning(f"反映できなかった使用回数の加算があります: {len(usage_increment_queue)}件")
+    await asyncio.to_thread(postgres_hot_path.close)
+    get_data_backend().close()
+    close_http_clients()
 
 # FastAPIアプリケーションの作成
 app = FastAPI(
@@ -92,16 +122,23 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# レスポンス圧縮（Brotli・gzip、音声ファイルなどは対象外）
+app.add_middleware(CompressionMiddleware)
+
+# リクエスト内の同一DB読み取りをまとめる（レスポンス後に破棄）
+app.add_middleware(RequestCacheMiddleware)
+
 # グローバルエラーハンドラー
 @app.exception_handler(CareBotError)
 async def carebot_exception_handler(request: Request, exc: CareBotError):
     """CareBotカスタムエラーハンドラー"""
-    return create_error_response(exc, request)
+    # 依存関係（get_current_userなど）から送出されたエラーもステータスコード付きのレスポンスにする
+    return await http_exception_handler(request, create_error_response(exc, request))
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """一般的なエラーハンドラー"""
-    return create_error_response(exc, request)
+    return await http_exception_handler(request, create_error_response(exc, request))
 
 # リクエストログミドルウェア
 @app.middleware("http")
@@ -127,6 +164,9 @@ async def log_requests(request: Request, call_next):
 # APIルーターの追加
 app.include_router(api_router, prefix="/api")
 
+# 音声ファイル配信（カタログのaudio_urlと同じパスで提供）
+app.include_router(audio.router, prefix="/audio", tags=["audio"])
+
 # ヘルスチェックエンドポイント
 @app.get("/health")
 async def health_check():
@@ -134,15 +174,27 @@ async def health_check():
     try:
         logger.info("ヘルスチェック実行")
         return {
-            "status": "healthy",
+            "status": "degraded" if db_circuit_breaker.is_open else "healthy",
             "message": "CareBot AI API is running",
             "version": "1.0.0",
-            "environment": ENVIRONMENT
+            "environment": ENVIRONMENT,
+            "database": get_data_backend().name,
+            "circuit_breaker": db_circuit_breaker.state
         }
     except Exception as e:
         logger.error("ヘルスチェックエラー", e)
         raise HTTPException(status_code=500, detail="Service unhealthy")
 
+# 接続プールの使用状況
+@app.get("/health/pools")
+async def pool_stats():
+    """Supabase（HTTP）・PostgreSQL直接接続の接続プールとデータ層のバルクヘッドの使用状況"""
+    return {
+        "http": http_pool_stats(),
+        "postgres": postgres_hot_path.stats(),
+        "database": resilience_stats()
+    }
+
 # ルートエンドポイント
 @app.get("/")
 async def root():
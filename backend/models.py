@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, Float, Boolean, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -21,6 +21,7 @@ class Profile(Base):
     avatar_url = Column(String)
     bio = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (UniqueConstraint("user_id", name="profiles_user_id_key"),)
 
 class Journal(Base):
     __tablename__ = "journals"
@@ -28,6 +29,17 @@ class Journal(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    emotion = Column(String)
+    emotion_scores = Column(JSON)
+    sentiment_score = Column(Float)
+    crisis_detected = Column(Boolean, default=False)
+    session_id = Column(String)
+    turns = Column(JSON)
+    __table_args__ = (
+        Index("idx_journals_user_created", "user_id", "created_at"),
+        Index("idx_journals_user_session", "user_id", "session_id"),
+        Index("idx_journals_user_emotion_created", "user_id", "emotion", "created_at"),
+    )
 
 class Mood(Base):
     __tablename__ = "moods"
@@ -36,6 +48,8 @@ class Mood(Base):
     mood = Column(Integer, nullable=False)
     note = Column(Text)
     recorded_at = Column(DateTime, default=datetime.utcnow)
+    idempotency_key = Column(String)
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key", name="moods_user_idempotency_key"),)
 
 class UsageCount(Base):
     __tablename__ = "usage_counts"
@@ -44,6 +58,8 @@ class UsageCount(Base):
     feature_type = Column(String, nullable=False)
     usage_count = Column(Integer, default=0)
     reset_date = Column(DateTime, default=datetime.utcnow)
+    last_used = Column(DateTime)
+    __table_args__ = (UniqueConstraint("user_id", "feature_type", name="usage_counts_user_feature_key"),)
 
 class FeatureLimit(Base):
     __tablename__ = "feature_limits"
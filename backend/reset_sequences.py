@@ -7,9 +7,10 @@
 import os
 import sys
 from dotenv import load_dotenv
-import requests
 import json
 
+from app.utils.http_client import create_http_client
+
 # 環境変数を読み込み
 load_dotenv()
 
@@ -62,7 +63,8 @@ def reset_sequences():
         
         # まず、exec_sql関数が存在するかチェック
         check_url = f"{supabase_url}/rest/v1/rpc"
-        response = requests.get(check_url, headers=headers)
+        with create_http_client("reset_sequences") as client:
+            response = client.get(check_url, headers=headers)
         
         if response.status_code == 200:
             functions = response.json()